@@ -1,7 +1,41 @@
 """AI adapters for different language models."""
 
+from typing import TYPE_CHECKING, Any
+
 from .base import AiAdapter
-from .gpt_adapter import GptAdapter
-from .claude_adapter import ClaudeAdapter
 
-__all__ = ["AiAdapter", "GptAdapter", "ClaudeAdapter"]
+if TYPE_CHECKING:
+    from .adapter_pool import AdapterPool
+    from .claude_adapter import ClaudeAdapter
+    from .gpt_adapter import GptAdapter
+    from .hedged_adapter import HedgedAdapter
+    from .simulated_adapter import SimulatedAdapter
+
+__all__ = [
+    "AiAdapter",
+    "AdapterPool",
+    "GptAdapter",
+    "ClaudeAdapter",
+    "HedgedAdapter",
+    "SimulatedAdapter",
+]
+
+# Adapters by name, imported on first access so that using one adapter
+# does not load the module of the other
+_ADAPTER_MODULES = {
+    "GptAdapter": ".gpt_adapter",
+    "ClaudeAdapter": ".claude_adapter",
+    "SimulatedAdapter": ".simulated_adapter",
+    "AdapterPool": ".adapter_pool",
+    "HedgedAdapter": ".hedged_adapter",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _ADAPTER_MODULES:
+        from importlib import import_module
+
+        adapter = getattr(import_module(_ADAPTER_MODULES[name], __name__), name)
+        globals()[name] = adapter
+        return adapter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
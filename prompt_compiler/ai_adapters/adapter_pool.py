@@ -0,0 +1,94 @@
+import itertools
+import math
+from typing import Any, Dict, Iterator, List, Sequence, Union
+
+from .base import AiAdapter
+from ..utils.rate_limiter import estimate_tokens
+
+
+class AdapterPool(AiAdapter):
+    """
+    Adapter spreading requests across adapters of one model, e.g. one per
+    API key.
+
+    Requests go to the adapters in turn. An adapter whose rate limiter would
+    make the request wait is passed over while another one has room, so with
+    a rate limiter per key the pool's throughput is the sum of the keys'
+    quotas. Batches go to the first adapter, since a batch can only be
+    queried with the key that submitted it.
+    """
+
+    def __init__(self, adapters: Sequence[AiAdapter]):
+        """
+        Initialize adapter pool.
+
+        Args:
+            adapters: Adapters to spread requests across
+
+        Raises:
+            ValueError: If no adapters are given
+        """
+        if not adapters:
+            raise ValueError("An adapter pool needs at least one adapter")
+        self.adapters = list(adapters)
+        self.model = getattr(self.adapters[0], "model", None)
+        self._turns = itertools.count()
+
+    @property
+    def adapter_name(self) -> str:
+        """Name of the pooled adapters, so pooling does not change cache keys."""
+        return self.adapters[0].adapter_name
+
+    def select(self, prompt: str, **kwargs) -> AiAdapter:
+        """
+        Choose the adapter for a request.
+
+        Args:
+            prompt: The prompt to send
+            **kwargs: Request parameters; max_tokens counts against token
+                budgets
+
+        Returns:
+            The next adapter in turn with room in its rate limits, or the
+            one whose rate limits free up first
+        """
+        tokens = estimate_tokens(prompt, kwargs.get("max_tokens", 0))
+        start = next(self._turns)
+        selected, shortest_wait = self.adapters[0], math.inf
+        for i in range(len(self.adapters)):
+            adapter = self.adapters[(start + i) % len(self.adapters)]
+            rate_limiter = getattr(adapter, "rate_limiter", None)
+            wait = rate_limiter.wait_time(tokens) if rate_limiter else 0.0
+            if not wait:
+                return adapter
+            if wait < shortest_wait:
+                selected, shortest_wait = adapter, wait
+        return selected
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """Generate code with the selected adapter."""
+        return self.select(prompt, **kwargs).generate(prompt, **kwargs)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Asynchronously generate code with the selected adapter."""
+        return await self.select(prompt, **kwargs).agenerate(prompt, **kwargs)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream code from the selected adapter."""
+        yield from self.select(prompt, **kwargs).stream(prompt, **kwargs)
+
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit requests to the first adapter's batch API."""
+        return self.adapters[0].submit_batch(requests)
+
+    def batch_status(self, batch_id: str) -> str:
+        """Get the status of a batch from the first adapter."""
+        return self.adapters[0].batch_status(batch_id)
+
+    def batch_results(self, batch_id: str) -> Dict[str, Union[str, Exception]]:
+        """Get the results of a batch from the first adapter."""
+        return self.adapters[0].batch_results(batch_id)
+
+    def validate_response(self, response: str) -> bool:
+        """Validate a response as the pooled adapters do."""
+        return self.adapters[0].validate_response(response)
@@ -1,9 +1,16 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Union
 
 
 class AiAdapter(ABC):
     """Base class for AI model adapters."""
 
+    @property
+    def adapter_name(self) -> str:
+        """Name of the adapter in cache keys, the class name by default."""
+        return type(self).__name__
+
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
         """
@@ -18,6 +25,73 @@ class AiAdapter(ABC):
         """
         pass
 
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Asynchronously generate code using the AI model.
+
+        The default implementation runs `generate` in a worker thread so
+        that adapters without a native async client still work from an
+        event loop. Adapters backed by an async SDK should override it.
+
+        Args:
+            prompt: The prompt to send to the AI model
+            **kwargs: Additional model-specific parameters
+
+        Returns:
+            Generated code as string
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Generate code using the AI model, yielding the response in chunks.
+
+        The default implementation yields the whole `generate` response as a
+        single chunk. Adapters backed by a streaming API should override it.
+
+        Args:
+            prompt: The prompt to send to the AI model
+            **kwargs: Additional model-specific parameters
+
+        Yields:
+            Consecutive pieces of the generated response
+        """
+        yield self.generate(prompt, **kwargs)
+
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """
+        Submit requests to the provider's batch API.
+
+        Args:
+            requests: Dictionaries with a unique "custom_id", the "prompt" and
+                any parameters accepted by `generate`
+
+        Returns:
+            Provider batch ID
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batches")
+
+    def batch_status(self, batch_id: str) -> str:
+        """
+        Get the status of a submitted batch.
+
+        Returns:
+            "in_progress"; "completed"; "ended" if it stopped before every
+            request was processed, e.g. expired or cancelled, with results
+            for those that were; or "failed" if it has no results
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batches")
+
+    def batch_results(self, batch_id: str) -> Dict[str, Union[str, Exception]]:
+        """
+        Get the results of a completed or ended batch.
+
+        Returns:
+            Mapping of each request's custom_id to the generated response, or
+            to the error that request failed with
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batches")
+
     @abstractmethod
     def validate_response(self, response: str) -> bool:
         """
@@ -1,34 +1,209 @@
-from anthropic import Anthropic
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional, Union
 from .base import AiAdapter
+from .http_pool import get_async_http_client, get_http_client
+from ..instrumentation import instrumentation
+from ..exceptions import AIAdapterError, RateLimitError, TransientAIError
+from ..utils.retry import parse_retry_after
+from ..utils.rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
+
+if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
 
 
 class ClaudeAdapter(AiAdapter):
     """Adapter for Anthropic's Claude models."""
 
-    def __init__(self, api_key: str, model: str = "claude-3-opus-20240229"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-3-opus-20240229",
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+    ):
         """
         Initialize Claude adapter.
 
         Args:
             api_key: Anthropic API key
             model: Claude model to use (default: claude-3-opus-20240229)
+            rate_limiter: Rate limiter to use (default: shared limiter for model)
+            base_url: API endpoint, e.g. of a proxy (default: Anthropic's)
         """
         self.api_key = api_key
         self.model = model
-        self.client = Anthropic(api_key=api_key)
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or get_rate_limiter(model)
+        # Clients are created on first use, so the SDK is only imported by
+        # runs that call the API
+        self._client: Optional["Anthropic"] = None
+        self._async_client: Optional["AsyncAnthropic"] = None
+
+    @property
+    def client(self) -> "Anthropic":
+        """Anthropic client, created on first use."""
+        if self._client is None:
+            from anthropic import Anthropic
+
+            # Retries are handled by CodeGenerator's RetryPolicy, and
+            # connections are pooled across adapters
+            self._client = Anthropic(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=get_http_client(),
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> "AsyncAnthropic":
+        """Async Anthropic client, created on first use."""
+        if self._async_client is None:
+            from anthropic import AsyncAnthropic
+
+            self._async_client = AsyncAnthropic(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=get_async_http_client(),
+            )
+        return self._async_client
+
+    def _request_params(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Build message creation parameters for a prompt."""
+        params = {
+            "model": self.model,
+            "max_tokens": kwargs.get("max_tokens", 2000),
+            "temperature": kwargs.get("temperature", 0.7),
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if kwargs.get("system_prompt"):
+            params["system"] = kwargs["system_prompt"]
+        return params
+
+    def _record_usage(self, usage: Any, reserved_tokens: int) -> None:
+        """
+        Report the token counts of a response to the instrumentation.
+
+        Tokens reserved for the request but not used by it are refunded to
+        the rate limiter.
+        """
+        if usage is None:
+            return
+        if instrumentation.enabled:
+            instrumentation.record_usage(
+                self.model, usage.input_tokens, usage.output_tokens
+            )
+        self.rate_limiter.refund(
+            reserved_tokens - usage.input_tokens - usage.output_tokens
+        )
+
+    def _convert_error(self, error: Exception) -> AIAdapterError:
+        """Convert an SDK error into an adapter error."""
+        import anthropic
+
+        if isinstance(error, anthropic.RateLimitError):
+            retry_after = parse_retry_after(error.response.headers)
+            return RateLimitError(self.model, retry_after, error)
+        if isinstance(error, anthropic.APIConnectionError):
+            return TransientAIError(str(error), self.model, error)
+        if isinstance(error, anthropic.APIStatusError) and (
+            error.status_code >= 500 or error.status_code in (408, 409, 529)
+        ):
+            return TransientAIError(str(error), self.model, error)
+        if isinstance(error, anthropic.AnthropicError):
+            return AIAdapterError(str(error), self.model, error)
+        return AIAdapterError(f"Unexpected error: {str(error)}", self.model, error)
 
     def generate(self, prompt: str, **kwargs) -> str:
         """Generate code using Claude."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        self.rate_limiter.acquire(reserved_tokens)
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=kwargs.get("max_tokens", 2000),
-                temperature=kwargs.get("temperature", 0.7),
-                messages=[{"role": "user", "content": prompt}],
-            )
+            response = self.client.messages.create(**params)
+            self._record_usage(getattr(response, "usage", None), reserved_tokens)
+            return response.content[0].text
+        except Exception as e:
+            raise self._convert_error(e)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Asynchronously generate code using Claude."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        await self.rate_limiter.aacquire(reserved_tokens)
+        try:
+            response = await self.async_client.messages.create(**params)
+            self._record_usage(getattr(response, "usage", None), reserved_tokens)
             return response.content[0].text
         except Exception as e:
-            raise RuntimeError(f"Claude API error: {str(e)}")
+            raise self._convert_error(e)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Generate code using Claude, yielding the response as it arrives."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        self.rate_limiter.acquire(reserved_tokens)
+        try:
+            with self.client.messages.stream(**params) as stream:
+                yield from stream.text_stream
+                self._record_usage(stream.get_final_message().usage, reserved_tokens)
+        except Exception as e:
+            raise self._convert_error(e)
+
+    def _batches(self) -> Any:
+        """Get the Message Batches resource of the SDK client."""
+        batches = getattr(self.client.messages, "batches", None)
+        if batches is None:
+            import anthropic
+
+            raise AIAdapterError(
+                f"anthropic {anthropic.__version__} has no Message Batches API; "
+                "upgrade the anthropic package to use --batch with Claude",
+                self.model,
+            )
+        return batches
+
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit requests to the Anthropic Message Batches API."""
+        batch_requests = []
+        for request in requests:
+            params = {k: v for k, v in request.items() if k != "custom_id"}
+            batch_requests.append(
+                {
+                    "custom_id": request["custom_id"],
+                    "params": self._request_params(**params),
+                }
+            )
+        batches = self._batches()
+        try:
+            batch = batches.create(requests=batch_requests)
+        except Exception as e:
+            raise self._convert_error(e)
+        return batch.id
+
+    def batch_status(self, batch_id: str) -> str:
+        """Get the status of an Anthropic message batch."""
+        batches = self._batches()
+        try:
+            batch = batches.retrieve(batch_id)
+        except Exception as e:
+            raise self._convert_error(e)
+        return "completed" if batch.processing_status == "ended" else "in_progress"
+
+    def batch_results(self, batch_id: str) -> Dict[str, Union[str, Exception]]:
+        """Get the results of an ended Anthropic message batch."""
+        results: Dict[str, Union[str, Exception]] = {}
+        batches = self._batches()
+        try:
+            for item in batches.results(batch_id):
+                if item.result.type == "succeeded":
+                    results[item.custom_id] = item.result.message.content[0].text
+                else:
+                    error = getattr(item.result, "error", None) or item.result.type
+                    results[item.custom_id] = AIAdapterError(str(error), self.model)
+        except Exception as e:
+            raise self._convert_error(e)
+        return results
 
     def validate_response(self, response: str) -> bool:
         """Validate Claude response."""
@@ -1,49 +1,243 @@
-import openai
-from typing import Dict, Any, Optional
-from openai import OpenAIError
+import json
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional, Union
 from .base import AiAdapter
-from ..exceptions import AIAdapterError, RateLimitError
-from ..utils.rate_limiter import RateLimiter
+from .http_pool import get_async_http_client, get_http_client
+from ..instrumentation import instrumentation
+from ..exceptions import AIAdapterError, RateLimitError, TransientAIError
+from ..utils.retry import parse_retry_after
+from ..utils.rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful programming assistant."
 
 
 class GptAdapter(AiAdapter):
     """Adapter for OpenAI's GPT models."""
 
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4",
+        rate_limiter: Optional[RateLimiter] = None,
+        organization: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
         """
         Initialize GPT adapter.
 
         Args:
             api_key: OpenAI API key
             model: GPT model to use (default: gpt-4)
+            rate_limiter: Rate limiter to use (default: shared limiter for model)
+            organization: OpenAI organization to bill (optional)
+            base_url: API endpoint, e.g. of an Azure or proxy deployment
+                (default: OpenAI's)
         """
         self.api_key = api_key
         self.model = model
-        openai.api_key = api_key
+        self.organization = organization
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or get_rate_limiter(model)
+        # Clients are created on first use, so the SDK is only imported by
+        # runs that call the API
+        self._client: Optional["OpenAI"] = None
+        self._async_client: Optional["AsyncOpenAI"] = None
+
+    @property
+    def client(self) -> "OpenAI":
+        """OpenAI client, created on first use."""
+        if self._client is None:
+            from openai import OpenAI
+
+            # Retries are handled by CodeGenerator's RetryPolicy, and
+            # connections are pooled across adapters
+            self._client = OpenAI(
+                api_key=self.api_key,
+                organization=self.organization,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=get_http_client(),
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> "AsyncOpenAI":
+        """Async OpenAI client, created on first use."""
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                organization=self.organization,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=get_async_http_client(),
+            )
+        return self._async_client
+
+    def _request_params(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Build chat completion parameters for a prompt."""
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": kwargs.get("system_prompt") or DEFAULT_SYSTEM_PROMPT,
+                },
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 2000),
+        }
+
+    def _record_usage(self, usage: Any, reserved_tokens: int) -> None:
+        """
+        Report the token counts of a response to the instrumentation.
+
+        Tokens reserved for the request but not used by it are refunded to
+        the rate limiter.
+        """
+        if usage is None:
+            return
+        if instrumentation.enabled:
+            instrumentation.record_usage(
+                self.model, usage.prompt_tokens, usage.completion_tokens
+            )
+        self.rate_limiter.refund(
+            reserved_tokens - usage.prompt_tokens - usage.completion_tokens
+        )
+
+    def _convert_error(self, error: Exception) -> AIAdapterError:
+        """Convert an SDK error into an adapter error."""
+        import openai
+
+        if isinstance(error, openai.RateLimitError):
+            retry_after = parse_retry_after(error.response.headers)
+            return RateLimitError(self.model, retry_after, error)
+        if isinstance(error, openai.APIConnectionError):
+            return TransientAIError(str(error), self.model, error)
+        if isinstance(error, openai.APIStatusError) and (
+            error.status_code >= 500 or error.status_code in (408, 409)
+        ):
+            return TransientAIError(str(error), self.model, error)
+        if isinstance(error, openai.OpenAIError):
+            if "rate limit" in str(error).lower():
+                return RateLimitError(self.model, raw_error=error)
+            return AIAdapterError(str(error), self.model, error)
+        return AIAdapterError(f"Unexpected error: {str(error)}", self.model, error)
 
-    @RateLimiter(calls=50, period=60)  # 50 calls per minute
     def generate(self, prompt: str, **kwargs) -> str:
         """Generate code using GPT."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        self.rate_limiter.acquire(reserved_tokens)
+        try:
+            response = self.client.chat.completions.create(**params)
+            self._record_usage(getattr(response, "usage", None), reserved_tokens)
+            return response.choices[0].message.content
+        except Exception as e:
+            raise self._convert_error(e)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Asynchronously generate code using GPT."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        await self.rate_limiter.aacquire(reserved_tokens)
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
+            response = await self.async_client.chat.completions.create(**params)
+            self._record_usage(getattr(response, "usage", None), reserved_tokens)
+            return response.choices[0].message.content
+        except Exception as e:
+            raise self._convert_error(e)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Generate code using GPT, yielding the response as it arrives."""
+        params = self._request_params(prompt, **kwargs)
+        reserved_tokens = estimate_tokens(prompt, params["max_tokens"])
+        self.rate_limiter.acquire(reserved_tokens)
+        try:
+            for chunk in self.client.chat.completions.create(
+                **params, stream=True, stream_options={"include_usage": True}
+            ):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None):
+                    self._record_usage(chunk.usage, reserved_tokens)
+        except Exception as e:
+            raise self._convert_error(e)
+
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit requests to the OpenAI Batch API."""
+        lines = []
+        for request in requests:
+            params = {k: v for k, v in request.items() if k != "custom_id"}
+            lines.append(
+                json.dumps(
                     {
-                        "role": "system",
-                        "content": "You are a helpful programming assistant.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=kwargs.get("temperature", 0.7),
-                max_tokens=kwargs.get("max_tokens", 2000),
+                        "custom_id": request["custom_id"],
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": self._request_params(**params),
+                    }
+                )
             )
-            return response.choices[0].message.content
-        except OpenAIError as e:
-            if "rate limit" in str(e).lower():
-                raise RateLimitError(model=self.model)
-            raise AIAdapterError(str(e), self.model, e)
+        try:
+            batch_file = self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+        except Exception as e:
+            raise self._convert_error(e)
+        return batch.id
+
+    def batch_status(self, batch_id: str) -> str:
+        """Get the status of an OpenAI batch."""
+        try:
+            status = self.client.batches.retrieve(batch_id).status
+        except Exception as e:
+            raise self._convert_error(e)
+        if status == "completed":
+            return "completed"
+        if status in ("expired", "cancelled"):
+            # Requests finished before the batch stopped have results
+            return "ended"
+        if status == "failed":
+            return "failed"
+        return "in_progress"
+
+    def batch_results(self, batch_id: str) -> Dict[str, Union[str, Exception]]:
+        """Get the results of a completed, expired or cancelled OpenAI batch."""
+        results: Dict[str, Union[str, Exception]] = {}
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    response = item.get("response") or {}
+                    if item.get("error") or response.get("status_code") != 200:
+                        error = item.get("error") or response.get("body")
+                        results[item["custom_id"]] = AIAdapterError(
+                            str(error), self.model
+                        )
+                    else:
+                        body = response["body"]
+                        results[item["custom_id"]] = body["choices"][0]["message"][
+                            "content"
+                        ]
         except Exception as e:
-            raise AIAdapterError(f"Unexpected error: {str(e)}", self.model, e)
+            raise self._convert_error(e)
+        return results
 
     def validate_response(self, response: str) -> bool:
         """Validate GPT response."""
@@ -0,0 +1,277 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from .base import AiAdapter
+from ..exceptions import AIAdapterError, RateLimitError, TransientAIError
+from ..instrumentation import instrumentation
+from ..utils.latency import get_latency_histogram
+
+
+def _model_of(adapter: AiAdapter) -> str:
+    return getattr(adapter, "model", None) or adapter.adapter_name
+
+
+def _start_daemon(func: Callable[..., Any], *args: Any) -> Future:
+    """
+    Run `func` in a new daemon thread.
+
+    Unlike executor workers, daemon threads are not joined at exit, so a
+    request nobody waits for any more does not keep the process alive.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args)
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=run, name="hedged-request", daemon=True).start()
+    return future
+
+
+def is_hard_error(error: BaseException) -> bool:
+    """Whether an error is one that retrying the same model would not fix."""
+    return isinstance(error, AIAdapterError) and not isinstance(
+        error, (RateLimitError, TransientAIError)
+    )
+
+
+class _Race:
+    """Which adapter a hedged request tries next, and when to hedge."""
+
+    def __init__(self, hedged: "HedgedAdapter"):
+        self.hedged = hedged
+        self.remaining = list(hedged.adapters)
+        self.hedges = 0
+        self.hedge_at = 0.0
+
+    def next(self) -> AiAdapter:
+        """Take the next adapter and start the hedge timer for it."""
+        adapter = self.remaining.pop(0)
+        self.hedge_at = time.monotonic() + self.hedged.hedge_delay(adapter)
+        return adapter
+
+    def timeout(self) -> Optional[float]:
+        """Seconds until a hedge is due, or None if no more hedges are allowed."""
+        if (
+            not self.remaining
+            or self.hedges >= self.hedged.max_hedges
+            or math.isinf(self.hedge_at)
+        ):
+            return None
+        return max(0.0, self.hedge_at - time.monotonic())
+
+    def hedge(self) -> AiAdapter:
+        """Take the adapter to send a duplicate request to."""
+        self.hedges += 1
+        adapter = self.next()
+        instrumentation.count("hedges", model=_model_of(adapter))
+        return adapter
+
+    def fallback(self, error: BaseException) -> Optional[AiAdapter]:
+        """Take the adapter to fall back to after `error`, if any."""
+        if not self.remaining or not is_hard_error(error):
+            return None
+        adapter = self.next()
+        instrumentation.count("fallbacks", model=_model_of(adapter))
+        return adapter
+
+
+class HedgedAdapter(AiAdapter):
+    """
+    Adapter cutting tail latency with hedged requests to other models.
+
+    Requests go to the first adapter. When one has not finished by the
+    configured latency percentile of its model, a duplicate request goes to
+    the next adapter and whichever finishes first is used. When a request
+    fails with an error retrying would not fix, such as a rejected key or
+    an unknown model, the next adapter takes over. Latencies are recorded in
+    process-wide histograms per model.
+
+    Losing async requests are cancelled. Synchronous requests cannot be
+    interrupted, so each runs in a daemon thread: a losing one runs to
+    completion and its response is discarded, without holding up the exit
+    of the process. Streams are not hedged, but fall back
+    to the next adapter if they fail before their first chunk. Batches go
+    to the first adapter.
+    """
+
+    def __init__(
+        self,
+        adapters: Sequence[AiAdapter],
+        percentile: float = 95.0,
+        initial_delay: float = 30.0,
+        min_samples: int = 20,
+        max_hedges: int = 1,
+    ):
+        """
+        Initialize hedged adapter.
+
+        Args:
+            adapters: Adapters in the order to try them, e.g. of different
+                models or providers
+            percentile: Latency percentile of a model after which a request
+                to it is hedged
+            initial_delay: Seconds after which to hedge while fewer than
+                `min_samples` latencies of the model are recorded
+            min_samples: Latencies to record before using the percentile
+            max_hedges: Duplicate requests to send at most per request
+
+        Raises:
+            ValueError: If no adapters are given
+        """
+        if not adapters:
+            raise ValueError("A hedged adapter needs at least one adapter")
+        self.adapters = list(adapters)
+        self.model = _model_of(self.adapters[0])
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+
+    @property
+    def adapter_name(self) -> str:
+        """Name covering every adapter, as any of them may answer."""
+        members = ", ".join(
+            f"{adapter.adapter_name}:{_model_of(adapter)}" for adapter in self.adapters
+        )
+        return f"HedgedAdapter({members})"
+
+    def hedge_delay(self, adapter: AiAdapter) -> float:
+        """Seconds after which a request to `adapter` is hedged."""
+        histogram = get_latency_histogram(_model_of(adapter))
+        if histogram.total < self.min_samples:
+            return self.initial_delay
+        return histogram.percentile(self.percentile)
+
+    def _generate(self, adapter: AiAdapter, prompt: str, kwargs: Dict[str, Any]) -> str:
+        start = time.monotonic()
+        response = adapter.generate(prompt, **kwargs)
+        get_latency_histogram(_model_of(adapter)).record(time.monotonic() - start)
+        return response
+
+    async def _agenerate(
+        self, adapter: AiAdapter, prompt: str, kwargs: Dict[str, Any]
+    ) -> str:
+        start = time.monotonic()
+        response = await adapter.agenerate(prompt, **kwargs)
+        get_latency_histogram(_model_of(adapter)).record(time.monotonic() - start)
+        return response
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """Generate code, hedging slow requests and falling back on hard errors."""
+        race = _Race(self)
+        attempts: Dict[Future, AiAdapter] = {}
+
+        def start(adapter: AiAdapter) -> None:
+            future = _start_daemon(self._generate, adapter, prompt, kwargs)
+            attempts[future] = adapter
+
+        start(race.next())
+        while True:
+            done, _ = wait(
+                attempts, timeout=race.timeout(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                start(race.hedge())
+                continue
+            # A success wins over failures finishing at the same time
+            for future in sorted(
+                done, key=lambda future: future.exception() is not None
+            ):
+                adapter = attempts.pop(future)
+                error = future.exception()
+                if error is None:
+                    self._count_win(adapter, raced=bool(attempts))
+                    return future.result()
+                if attempts:
+                    continue
+                fallback = race.fallback(error)
+                if fallback is None:
+                    raise error
+                start(fallback)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Asynchronously generate code with hedging and fallback."""
+        race = _Race(self)
+        attempts: Dict[asyncio.Task, AiAdapter] = {}
+
+        def start(adapter: AiAdapter) -> None:
+            task = asyncio.ensure_future(self._agenerate(adapter, prompt, kwargs))
+            attempts[task] = adapter
+
+        start(race.next())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    attempts, timeout=race.timeout(), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    start(race.hedge())
+                    continue
+                for task in sorted(done, key=lambda task: task.exception() is not None):
+                    adapter = attempts.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        self._count_win(adapter, raced=bool(attempts))
+                        return task.result()
+                    if attempts:
+                        continue
+                    fallback = race.fallback(error)
+                    if fallback is None:
+                        raise error
+                    start(fallback)
+        finally:
+            # Cancel the losers, or every request if the caller was cancelled
+            for task in attempts:
+                task.cancel()
+
+    def _count_win(self, winner: AiAdapter, raced: bool) -> None:
+        """Count a request won by a hedge over a request still in flight."""
+        if raced and winner is not self.adapters[0]:
+            instrumentation.count("hedge_wins", model=_model_of(winner))
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream code, falling back on hard errors before the first chunk."""
+        race = _Race(self)
+        adapter = race.next()
+        while True:
+            streamed = False
+            start = time.monotonic()
+            try:
+                for chunk in adapter.stream(prompt, **kwargs):
+                    streamed = True
+                    yield chunk
+            except Exception as error:
+                fallback = None if streamed else race.fallback(error)
+                if fallback is None:
+                    raise
+                adapter = fallback
+                continue
+            get_latency_histogram(_model_of(adapter)).record(time.monotonic() - start)
+            return
+
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit requests to the first adapter's batch API."""
+        return self.adapters[0].submit_batch(requests)
+
+    def batch_status(self, batch_id: str) -> str:
+        """Get the status of a batch from the first adapter."""
+        return self.adapters[0].batch_status(batch_id)
+
+    def batch_results(self, batch_id: str) -> Dict[str, Union[str, Exception]]:
+        """Get the results of a batch from the first adapter."""
+        return self.adapters[0].batch_results(batch_id)
+
+    def validate_response(self, response: str) -> bool:
+        """Validate a response as the first adapter does."""
+        return self.adapters[0].validate_response(response)
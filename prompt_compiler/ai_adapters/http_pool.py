@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+# Connection pool settings of the HTTP clients shared by all adapters,
+# overridden by `http` in prompt-compiler.yaml
+DEFAULT_HTTP_SETTINGS: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 60.0,  # seconds an idle connection is kept open
+    "timeout": 600.0,  # seconds, long enough for a full completion
+    "connect_timeout": 10.0,
+}
+
+_settings: Dict[str, Any] = dict(DEFAULT_HTTP_SETTINGS)
+_client: Optional["httpx.Client"] = None
+# Async clients by event loop, as connections are bound to the loop they
+# were opened in
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# Clients replaced by configure_http_pool, still used by the adapters they
+# were handed to until close_http_clients
+_retired: List["httpx.Client"] = []
+_retired_async: List[Tuple[asyncio.AbstractEventLoop, "httpx.AsyncClient"]] = []
+_lock = threading.Lock()
+
+
+def configure_http_pool(settings: Optional[Dict[str, Any]]) -> None:
+    """
+    Configure the shared HTTP clients.
+
+    Clients created from now on use the new settings. Clients handed out
+    before stay open, so adapters of a compiler set up earlier in the
+    process keep working; close_http_clients closes them.
+
+    Args:
+        settings: Mapping with `max_connections`, `max_keepalive_connections`,
+            `keepalive_expiry`, `timeout` and `connect_timeout` keys, as found
+            under `http` in prompt-compiler.yaml
+    """
+    global _client
+    new_settings = {**DEFAULT_HTTP_SETTINGS, **(settings or {})}
+    with _lock:
+        if new_settings == _settings:
+            return
+        _settings.clear()
+        _settings.update(new_settings)
+        if _client is not None:
+            _retired.append(_client)
+            _client = None
+        _retired_async.extend(_async_clients.items())
+        _async_clients.clear()
+
+
+def _client_options() -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=_settings["max_connections"],
+            max_keepalive_connections=_settings["max_keepalive_connections"],
+            keepalive_expiry=_settings["keepalive_expiry"],
+        ),
+        "timeout": httpx.Timeout(
+            _settings["timeout"], connect=_settings["connect_timeout"]
+        ),
+    }
+
+
+def get_http_client() -> "httpx.Client":
+    """
+    Get the process-wide HTTP client shared by all SDK clients.
+
+    Sharing one connection pool lets requests with any adapter or API key
+    reuse open keep-alive connections instead of setting up TLS each time.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            import httpx
+
+            _client = httpx.Client(**_client_options())
+        return _client
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """Get the async HTTP client shared by SDK clients in the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(**_client_options())
+            _async_clients[loop] = client
+        return client
+
+
+def _close_async_client(
+    loop: asyncio.AbstractEventLoop, client: "httpx.AsyncClient"
+) -> None:
+    """Close an async client in the event loop its connections belong to."""
+    if loop.is_closed():
+        # Nothing can run in the loop any more; its sockets go with it
+        return
+    if not loop.is_running():
+        loop.run_until_complete(client.aclose())
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(client.aclose())
+    else:
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+def close_http_clients() -> None:
+    """
+    Close every shared HTTP client, including replaced ones.
+
+    Call once no adapter is in use any more, e.g. at exit; adapters created
+    afterwards get new clients.
+    """
+    global _client
+    with _lock:
+        clients = _retired + ([_client] if _client is not None else [])
+        async_clients = _retired_async + list(_async_clients.items())
+        _client = None
+        _retired.clear()
+        _retired_async.clear()
+        _async_clients.clear()
+    for client in clients:
+        client.close()
+    for loop, async_client in async_clients:
+        _close_async_client(loop, async_client)
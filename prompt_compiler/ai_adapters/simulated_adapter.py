@@ -0,0 +1,138 @@
+import asyncio
+import math
+import random
+import threading
+import time
+import zlib
+from typing import Iterator, Optional
+
+from .base import AiAdapter
+from ..instrumentation import instrumentation
+from ..exceptions import RateLimitError, TransientAIError
+from ..utils.rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+class SimulatedAdapter(AiAdapter):
+    """
+    Adapter answering without network access after a simulated delay.
+
+    Used to benchmark the compiler's own overhead and scaling: responses are
+    valid Python of a configurable size, and latency, transient errors and
+    429s follow configurable distributions. Calls go through the model's
+    shared rate limiter like those of real adapters.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        distribution: str = "constant",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        response_lines: int = 20,
+        chunk_size: int = 64,
+        seed: Optional[int] = None,
+        model: str = "simulated",
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        Initialize simulated adapter.
+
+        Args:
+            latency: Mean response latency in seconds
+            distribution: Latency distribution, one of LATENCY_DISTRIBUTIONS
+            error_rate: Probability of a transient (5xx-like) error
+            rate_limit_rate: Probability of a 429 rate limit error
+            response_lines: Lines of code in each response
+            chunk_size: Characters per streamed chunk
+            seed: Random seed, for repeatable runs (optional)
+            model: Model name, also selecting the rate limiter
+            rate_limiter: Rate limiter to use (default: shared limiter for model)
+
+        Raises:
+            ValueError: If the distribution is unknown
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {distribution} "
+                f"(choose from {', '.join(LATENCY_DISTRIBUTIONS)})"
+            )
+        self.latency = latency
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.response_lines = response_lines
+        self.chunk_size = chunk_size
+        self.model = model
+        self.rate_limiter = rate_limiter or get_rate_limiter(model)
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        if self.latency <= 0 or self.distribution == "constant":
+            return max(0.0, self.latency)
+        if self.distribution == "uniform":
+            return self._random.uniform(0, 2 * self.latency)
+        if self.distribution == "exponential":
+            return self._random.expovariate(1 / self.latency)
+        # Lognormal with sigma 0.5 and the requested mean: a long right tail
+        sigma = 0.5
+        return self._random.lognormvariate(math.log(self.latency) - sigma**2 / 2, sigma)
+
+    def _next_call(self) -> float:
+        """Count a call, raise a simulated error if it fails; return its latency."""
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self._sample_latency()
+        if roll < self.rate_limit_rate:
+            raise RateLimitError(self.model, retry_after=0)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise TransientAIError("Simulated server error", self.model)
+        return delay
+
+    def _response(self, prompt: str, reserved_tokens: int) -> str:
+        # Vary the code with the prompt so responses are distinct
+        name = f"generated_{zlib.crc32(prompt.encode())}"
+        lines = [f"def {name}(value):", '    """Generated function."""']
+        for i in range(max(0, self.response_lines - 3)):
+            lines.append(f"    value = value + {i}")
+        lines.append("    return value")
+        response = "```python\n" + "\n".join(lines) + "\n```"
+        # Report usage like a provider would, ~4 characters per token, and
+        # refund the reserved tokens it did not use like real adapters do
+        input_tokens, output_tokens = len(prompt) // 4 + 1, len(response) // 4 + 1
+        instrumentation.record_usage(self.model, input_tokens, output_tokens)
+        self.rate_limiter.refund(reserved_tokens - input_tokens - output_tokens)
+        return response
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """Generate a response after a simulated delay."""
+        reserved_tokens = estimate_tokens(prompt, kwargs.get("max_tokens", 0))
+        self.rate_limiter.acquire(reserved_tokens)
+        time.sleep(self._next_call())
+        return self._response(prompt, reserved_tokens)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Asynchronously generate a response after a simulated delay."""
+        reserved_tokens = estimate_tokens(prompt, kwargs.get("max_tokens", 0))
+        await self.rate_limiter.aacquire(reserved_tokens)
+        await asyncio.sleep(self._next_call())
+        return self._response(prompt, reserved_tokens)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream a response, spreading the simulated delay over its chunks."""
+        reserved_tokens = estimate_tokens(prompt, kwargs.get("max_tokens", 0))
+        self.rate_limiter.acquire(reserved_tokens)
+        delay = self._next_call()
+        response = self._response(prompt, reserved_tokens)
+        chunks = range(0, len(response), self.chunk_size)
+        for i in chunks:
+            time.sleep(delay / len(chunks))
+            yield response[i : i + self.chunk_size]
+
+    def validate_response(self, response: str) -> bool:
+        """Validate simulated response."""
+        return bool(response and response.strip())
@@ -0,0 +1,185 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .compiler import Compiler
+from .exceptions import AIAdapterError, PromptCompilerError
+from .validator import module_name_for
+
+# (compile result, error message); exactly one of them is None
+BatchOutcome = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+class BatchRunner:
+    """
+    Compile many prompt files through the AI provider's batch API.
+
+    Prompts already in the cache are completed immediately. The rest are
+    submitted as one provider batch, polled until it finishes, and each
+    response then goes through the usual processing, caching and test
+    generation. Submitted batches are recorded in a state file, so a run
+    that is interrupted resumes waiting on the same batch instead of paying
+    for the requests again.
+
+    A batch that fails is dropped from the state file and its prompt files
+    are reported as errors, so the next run submits them again. A batch that
+    expired or was cancelled keeps the responses it finished.
+    """
+
+    def __init__(
+        self,
+        compiler: Compiler,
+        state_path: Path,
+        poll_interval: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize batch runner.
+
+        Args:
+            compiler: Compiler whose adapter, cache and templates to use
+            state_path: File recording submitted batches for resuming
+            poll_interval: Seconds between batch status checks
+            sleep: Function used to wait between status checks
+        """
+        self.compiler = compiler
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.sleep = sleep
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {"batches": []}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        if not state["batches"]:
+            self.state_path.unlink(missing_ok=True)
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _wait(self, batch_id: str) -> str:
+        """Wait for a batch to finish; return its final status."""
+        adapter = self.compiler.code_generator.ai_adapter
+        while True:
+            status = adapter.batch_status(batch_id)
+            if status in ("completed", "ended", "failed"):
+                return status
+            self.sleep(self.poll_interval)
+
+    def run(
+        self, prompt_files: List[Path], force_rebuild: bool = False
+    ) -> List[BatchOutcome]:
+        """
+        Compile prompt files in a batch.
+
+        Args:
+            prompt_files: Prompt files to compile
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Outcome for each prompt file, in input order
+        """
+        code_generator = self.compiler.code_generator
+        adapter = code_generator.ai_adapter
+        outcomes: List[Optional[BatchOutcome]] = [None] * len(prompt_files)
+        # cache key -> indexes of prompt files waiting for that response
+        pending: Dict[str, List[int]] = {}
+        prompts: Dict[int, Dict[str, Any]] = {}
+
+        for i, prompt_file in enumerate(prompt_files):
+            try:
+                prompt_data = self.compiler.prompt_reader.read(prompt_file)
+                cache_key = code_generator.cache_key(prompt_data)
+                cached = None
+                if not force_rebuild:
+                    cached = code_generator.cache_manager.lookup(cache_key)
+                if cached:
+                    code_result = {"code": cached, "cached": True, "retries": 0}
+                    result = self.compiler.complete(
+                        prompt_data,
+                        code_result,
+                        module_name=module_name_for(prompt_file.stem),
+                    )
+                    outcomes[i] = (result, None)
+                else:
+                    prompts[i] = prompt_data
+                    pending.setdefault(cache_key, []).append(i)
+            except Exception as e:
+                outcomes[i] = (None, str(e))
+
+        state = self._load_state()
+        # Drop batches whose responses are no longer needed
+        state["batches"] = [
+            batch
+            for batch in state["batches"]
+            if any(key in pending for key in batch["keys"])
+        ]
+        submitted = {key for batch in state["batches"] for key in batch["keys"]}
+
+        requests = []
+        for cache_key, indexes in pending.items():
+            if cache_key not in submitted:
+                request = code_generator.build_request(prompts[indexes[0]])
+                requests.append({"custom_id": cache_key, **request})
+        if requests:
+            batch_id = adapter.submit_batch(requests)
+            state["batches"].append(
+                {"batch_id": batch_id, "keys": [r["custom_id"] for r in requests]}
+            )
+        self._save_state(state)
+
+        for batch in list(state["batches"]):
+            if self._wait(batch["batch_id"]) == "failed":
+                responses: Dict[str, Any] = {
+                    cache_key: PromptCompilerError(f"Batch {batch['batch_id']} failed")
+                    for cache_key in batch["keys"]
+                }
+            else:
+                responses = adapter.batch_results(batch["batch_id"])
+            for cache_key in batch["keys"]:
+                for i in pending.get(cache_key, []):
+                    outcomes[i] = self._complete(
+                        prompts[i],
+                        cache_key,
+                        responses.get(cache_key),
+                        module_name_for(prompt_files[i].stem),
+                    )
+            state["batches"].remove(batch)
+            self._save_state(state)
+
+        return [
+            outcome or (None, "No response received from batch") for outcome in outcomes
+        ]
+
+    def _complete(
+        self,
+        prompt_data: Dict[str, Any],
+        cache_key: str,
+        response: Any,
+        module_name: str,
+    ) -> BatchOutcome:
+        """Process a batch response into a compile result."""
+        if response is None:
+            return None, "No response received from batch"
+        if isinstance(response, Exception):
+            return None, str(response)
+        try:
+            code = self.compiler.code_generator.process_response(
+                prompt_data, response, cache_key
+            )
+            code_result = {"code": code, "cached": False, "retries": 0}
+            result = self.compiler.complete(
+                prompt_data, code_result, module_name=module_name
+            )
+            return result, None
+        except (AIAdapterError, PromptCompilerError, ValueError) as e:
+            return None, str(e)
@@ -0,0 +1,313 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import __version__
+from .ai_adapters.simulated_adapter import SimulatedAdapter
+from .compiler import Compiler
+from .utils.pipeline import run_pipeline
+from .utils.rate_limiter import configure_rate_limits
+from .validator import module_name_for
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Settings the benchmark compiler starts from; a config file overrides them.
+# The simulated model is not rate limited unless configured, and retries
+# back off briefly so simulated errors do not dominate the run.
+BASE_CONFIG: Dict[str, Any] = {
+    "rate_limits": {"simulated": {"requests_per_minute": None}},
+    "retry": {"base_delay": 0.01, "max_delay": 0.1},
+}
+
+# Responses formatted and prompts rendered when timing them in isolation
+MICROBENCHMARK_SAMPLES = 1000
+
+# Command whose wall time is the CLI's startup time
+STARTUP_COMMAND = [sys.executable, "-m", "prompt_compiler.cli", "--help"]
+
+
+def create_corpus(directory: Path, count: int) -> List[Path]:
+    """
+    Write a synthetic corpus of distinct prompt files.
+
+    Args:
+        directory: Directory to write the prompt files to
+        count: Number of prompt files
+
+    Returns:
+        Paths of the prompt files
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    prompt_files = []
+    for i in range(count):
+        prompt_file = directory / f"prompt_{i:05d}.prompt"
+        prompt_file.write_text(
+            f"name: Function {i}\n"
+            f"description: Add the numbers from 0 to {i} to a value\n"
+            "requirements:\n"
+            "  - Accept an integer\n"
+            f"  - Return the integer plus {i * (i + 1) // 2}\n"
+            "language: python\n",
+            encoding="utf-8",
+        )
+        prompt_files.append(prompt_file)
+    return prompt_files
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latencies in milliseconds.
+
+    Returns:
+        Dictionary with "mean", "p50", "p95", "p99" and "max"
+    """
+    if not latencies:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def _compile_all(
+    compiler: Compiler, prompt_files: List[Path], jobs: int
+) -> Dict[str, Any]:
+    """
+    Compile prompt files through the CLI's pipeline and time each one.
+
+    A file's latency is the time its two stages ran, without the time it
+    waited between them.
+    """
+
+    def generate(
+        prompt_file: Path,
+    ) -> Tuple[Tuple[Dict[str, Any], Dict[str, Any]], float]:
+        start = time.perf_counter()
+        code = compiler.generate_code(prompt_file)
+        return code, time.perf_counter() - start
+
+    def complete(
+        prompt_file: Path,
+        generated: Tuple[Tuple[Dict[str, Any], Dict[str, Any]], float],
+    ) -> Tuple[Dict[str, Any], float]:
+        code, generate_seconds = generated
+        start = time.perf_counter()
+        result = compiler.complete(*code, module_name=module_name_for(prompt_file.stem))
+        return result, generate_seconds + time.perf_counter() - start
+
+    latencies = []
+    errors = retries = 0
+    start = time.perf_counter()
+    for outcome, error in run_pipeline(prompt_files, generate, complete, jobs):
+        if error is not None:
+            errors += 1
+            continue
+        result, latency = outcome
+        latencies.append(latency)
+        retries += result.get("retries", 0)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "files_per_second": len(prompt_files) / seconds if seconds else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "errors": errors,
+        "retries": retries,
+    }
+
+
+def _time_per_call(func: Any, items: Sequence[Any]) -> float:
+    """Mean milliseconds `func` takes per item."""
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1000 if items else 0.0
+
+
+def measure_startup(runs: int = 5) -> Optional[float]:
+    """
+    Median milliseconds a fresh interpreter takes to run `prompt-compiler --help`.
+
+    Args:
+        runs: Number of interpreters started
+
+    Returns:
+        Median wall time, or None with no runs
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(STARTUP_COMMAND, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times) if times else None
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark(
+    files: int = 100,
+    jobs: int = 4,
+    latency: float = 0.0,
+    distribution: str = "constant",
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    response_lines: int = 20,
+    generate_tests: bool = True,
+    seed: Optional[int] = 0,
+    config: Optional[Dict[str, Any]] = None,
+    startup_runs: int = 5,
+) -> Dict[str, Any]:
+    """
+    Benchmark the compiler against a simulated AI model.
+
+    A compiler is set up the way the CLI sets it up, then compiles a
+    synthetic corpus twice: once with an empty cache, and once more with
+    every response cached.
+
+    Args:
+        files: Number of prompt files in the corpus
+        jobs: Prompt files compiled in parallel
+        latency: Mean simulated response latency in seconds
+        distribution: Latency distribution, see SimulatedAdapter
+        error_rate: Probability of a simulated transient error
+        rate_limit_rate: Probability of a simulated 429
+        response_lines: Lines of code in each simulated response
+        generate_tests: Whether to generate tests for the code
+        seed: Random seed of the simulated model (optional)
+        config: Settings as in prompt-compiler.yaml, applied over
+            BASE_CONFIG (optional)
+        startup_runs: Times the CLI is started to measure its startup time
+            (0 to skip)
+
+    Returns:
+        JSON-serializable results: the parameters, "cold" and "warm" run
+        throughput, latency percentiles, errors and retries, AI calls made,
+        cache statistics, per-call formatter and template times, the CLI's
+        startup time and the peak resident memory of the process
+    """
+    from .cli import setup_compiler
+
+    config = {**BASE_CONFIG, **(config or {})}
+    config["rate_limits"] = {
+        **BASE_CONFIG["rate_limits"],
+        **config.get("rate_limits", {}),
+    }
+    parameters = {
+        "files": files,
+        "jobs": jobs,
+        "latency": latency,
+        "distribution": distribution,
+        "error_rate": error_rate,
+        "rate_limit_rate": rate_limit_rate,
+        "response_lines": response_lines,
+        "generate_tests": generate_tests,
+        "seed": seed,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="prompt-compiler-bench-") as tmp:
+        workdir = Path(tmp)
+        prompt_files = create_corpus(workdir / "prompts", files)
+
+        # Adapters pick up their rate limits when created
+        configure_rate_limits(config.get("rate_limits", {}))
+        adapter = SimulatedAdapter(
+            latency=latency,
+            distribution=distribution,
+            error_rate=error_rate,
+            rate_limit_rate=rate_limit_rate,
+            response_lines=response_lines,
+            seed=seed,
+        )
+        args = argparse.Namespace(
+            cache_dir=workdir / ".cache", no_tests=not generate_tests
+        )
+        compiler = setup_compiler(args, config, adapter=adapter)
+        try:
+            cold = _compile_all(compiler, prompt_files, jobs)
+            cold_calls = adapter.calls
+            warm = _compile_all(compiler, prompt_files, jobs)
+            cache_stats = compiler.code_generator.cache_manager.stats()
+
+            generator = compiler.code_generator
+            samples = [
+                compiler.prompt_reader.read(prompt_file)
+                for prompt_file in prompt_files[:MICROBENCHMARK_SAMPLES]
+            ]
+        finally:
+            compiler.close()
+
+    processor = generator.formatter_for()
+    responses = [adapter._response(str(i), 0) for i in range(len(samples))]
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": parameters,
+        "cold": {**cold, "ai_calls": cold_calls},
+        "warm": {**warm, "ai_calls": adapter.calls - cold_calls},
+        "cache": {
+            "hits": cache_stats["hits"],
+            "misses": cache_stats["misses"],
+            "entries": cache_stats["entries"],
+            "bytes": cache_stats["bytes"],
+        },
+        "formatter_ms": _time_per_call(
+            lambda response: processor.process(response, {}), responses
+        ),
+        "template_ms": _time_per_call(generator.template.render, samples),
+        "startup_ms": measure_startup(startup_runs),
+        "peak_rss_bytes": _peak_rss_bytes(),
+    }
+
+
+def save_results(results: Dict[str, Any], path: Path) -> None:
+    """Save benchmark results as JSON, for comparison across releases."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """Describe benchmark results in a few lines of text."""
+    lines = []
+    for run in ("cold", "warm"):
+        stats = results[run]
+        latency = stats["latency_ms"]
+        lines.append(
+            f"{run.capitalize()}: {stats['files_per_second']:.1f} files/s, "
+            f"p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+            f"p99 {latency['p99']:.1f} ms, {stats['ai_calls']} AI calls, "
+            f"{stats['errors']} errors, {stats['retries']} retries"
+        )
+    lines.append(
+        f"Formatter: {results['formatter_ms']:.3f} ms/response, "
+        f"template: {results['template_ms']:.3f} ms/prompt"
+    )
+    if results["startup_ms"] is not None:
+        lines.append(f"Startup: {results['startup_ms']:.1f} ms")
+    if results["peak_rss_bytes"] is not None:
+        lines.append(f"Peak memory: {results['peak_rss_bytes'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
@@ -1,25 +1,42 @@
 import argparse
 import sys
+from datetime import timedelta
 from pathlib import Path
-from typing import Optional, List
-import yaml
+from typing import Any, Dict, Optional, List, Tuple
 
+from .ai_adapters import AiAdapter
+from .ai_adapters.http_pool import close_http_clients, configure_http_pool
 from .compiler import Compiler
-from .ai_adapters import GptAdapter, ClaudeAdapter
 from .exceptions import PromptCompilerError
+from .instrumentation import JsonLinesExporter, format_summary, instrumentation
+from .languages import get_language
+from .manifest import BuildManifest, config_hash
+from .templates import CodeGenerationTemplate, TemplateLoader, TestGenerationTemplate
+from .validator import VALIDATION_CHECKS, LintCheck, Validator, module_name_for
+from .utils.cache_backends import create_cache_backend
+from .utils.cache_manager import CacheManager
+from .utils.pipeline import run_pipeline
+from .utils.rate_limiter import RateLimiter, configure_rate_limits, get_rate_limiter
+from .utils.retry import RetryPolicy
+from .utils.scheduler import TokenEstimator, largest_first, load_tokenizer
 
 
 def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="prompt-compiler",
         description="Compile prompt files into code using AI models",
+        epilog=(
+            "Run 'prompt-compiler cache --help' to manage the response cache, "
+            "'prompt-compiler serve --help' to run a compile server and "
+            "'prompt-compiler bench --help' to benchmark the compiler."
+        ),
     )
 
     # Input/Output options
     parser.add_argument(
         "input",
         type=Path,
-        help="Input prompt file(s)",
+        help="Input prompt file(s) or directories containing .prompt files",
         nargs="+",
     )
     parser.add_argument(
@@ -49,6 +66,80 @@ def create_parser() -> argparse.ArgumentParser:
         help="Cache directory (default: .cache)",
         default=Path(".cache"),
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Skip prompt files unchanged since the last build whose outputs "
+            "still exist"
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and recompile prompt files when they change",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses and write code to the output file as it arrives",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of prompt files to compile in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--no-tests",
+        action="store_true",
+        help="Generate code only, without tests",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=(
+            "Submit uncached prompts through the provider's batch API and wait "
+            "for the results (cheaper, but may take hours; resumable)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between batch status checks (default: 30)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help=(
+            "Print time spent per stage, cache hits, retries and token usage "
+            "and cost per model at the end of the run"
+        ),
+    )
+    parser.add_argument(
+        "--trace-file",
+        type=Path,
+        help="Append timing, counter and token usage events to a JSON lines file",
+    )
+    parser.add_argument(
+        "--server",
+        metavar="URL",
+        help=(
+            "Compile on a running 'prompt-compiler serve' server, e.g. "
+            "http://127.0.0.1:8765; model, cache and validation settings are "
+            "the server's"
+        ),
+    )
+    parser.add_argument(
+        "--server-token",
+        metavar="TOKEN",
+        help=(
+            "Token of the --server (default: read from server.token in the "
+            "cache directory, where the server writes it)"
+        ),
+    )
 
     # AI model options
     model_group = parser.add_argument_group("AI Model Options")
@@ -81,95 +172,910 @@ def create_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def create_cache_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="prompt-compiler cache",
+        description="Manage the AI response cache",
+    )
+    parser.add_argument(
+        "command",
+        choices=["gc", "stats", "clear"],
+        help=(
+            "gc: remove expired entries and evict beyond size limits; "
+            "stats: show hit rate, entry count and size; "
+            "clear: remove all entries"
+        ),
+    )
+    parser.add_argument(
+        "-c",
+        "--config",
+        type=Path,
+        help="Config file path",
+        default=Path("prompt-compiler.yaml"),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Cache directory (default: .cache)",
+        default=Path(".cache"),
+    )
+    return parser
+
+
+def create_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="prompt-compiler serve",
+        description=(
+            "Run a compile server that keeps the compiler, its connections, "
+            "cache and rate limits warm between CLI runs (--server)"
+        ),
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port to listen on (default: 8765)",
+    )
+    parser.add_argument(
+        "--token-file",
+        type=Path,
+        help=(
+            "File to write the token clients must send to, readable only by "
+            "you (default: server.token in the cache directory)"
+        ),
+    )
+    parser.add_argument(
+        "-c",
+        "--config",
+        type=Path,
+        help="Config file path",
+        default=Path("prompt-compiler.yaml"),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Cache directory (default: .cache)",
+        default=Path(".cache"),
+    )
+    parser.add_argument(
+        "--no-tests",
+        action="store_true",
+        help="Generate code only, without tests",
+    )
+    parser.add_argument(
+        "--model",
+        choices=["gpt", "claude"],
+        default="gpt",
+        help="AI model type to use (default: gpt)",
+    )
+    parser.add_argument("--model-name", help="Specific model name")
+    parser.add_argument(
+        "--api-key",
+        help="API key for the AI model (can also be set in config file)",
+    )
+    return parser
+
+
+def create_bench_parser() -> argparse.ArgumentParser:
+    from .ai_adapters.simulated_adapter import LATENCY_DISTRIBUTIONS
+
+    parser = argparse.ArgumentParser(
+        prog="prompt-compiler bench",
+        description=(
+            "Benchmark the compiler against a simulated AI model, with an "
+            "empty and with a full cache"
+        ),
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=100,
+        help="Number of synthetic prompt files (default: 100)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        help="Number of prompt files to compile in parallel (default: 4)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Mean simulated response latency in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--latency-distribution",
+        choices=LATENCY_DISTRIBUTIONS,
+        default="constant",
+        help="Simulated latency distribution (default: constant)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a simulated server error (default: 0)",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Probability of a simulated 429 (default: 0)",
+    )
+    parser.add_argument(
+        "--response-lines",
+        type=int,
+        default=20,
+        help="Lines of code in each simulated response (default: 20)",
+    )
+    parser.add_argument(
+        "--no-tests",
+        action="store_true",
+        help="Generate code only, without tests",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed of the simulated model (default: 0)",
+    )
+    parser.add_argument(
+        "--startup-runs",
+        type=int,
+        default=5,
+        help=(
+            "Times the CLI is started to measure its median startup time, "
+            "0 to skip (default: 5)"
+        ),
+    )
+    parser.add_argument(
+        "-c",
+        "--config",
+        type=Path,
+        help=(
+            "Config file whose retry, rate limit, cache, validation and "
+            "template settings are benchmarked (optional)"
+        ),
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Save the results as JSON to this file",
+    )
+    return parser
+
+
 def load_config(config_path: Path) -> dict:
     """Load configuration from file."""
     if not config_path.exists():
         return {}
 
+    import yaml
+
     with open(config_path, "r") as f:
         return yaml.safe_load(f) or {}
 
 
-def setup_compiler(args: argparse.Namespace, config: dict) -> Compiler:
-    """Setup compiler with given arguments and config."""
-    # Get API key from args or config
-    api_key = args.api_key or config.get("api_key")
-    if not api_key:
+def setup_instrumentation(
+    args: argparse.Namespace, config: dict
+) -> Optional[JsonLinesExporter]:
+    """Enable instrumentation for --stats and --trace-file."""
+    instrumentation.prices.update(config.get("pricing") or {})
+    instrumentation.enable()
+    if not args.trace_file:
+        return None
+    exporter = JsonLinesExporter(args.trace_file)
+    instrumentation.add_hook(exporter)
+    return exporter
+
+
+def setup_cache_manager(args: argparse.Namespace, config: dict) -> CacheManager:
+    """Setup cache manager with given arguments and config."""
+    ttl_hours = config.get("cache_ttl_hours", 24)
+    backend = create_cache_backend(
+        config.get("cache_backend", "sqlite"), args.cache_dir
+    )
+    return CacheManager(
+        args.cache_dir,
+        backend=backend,
+        ttl=timedelta(hours=ttl_hours) if ttl_hours is not None else None,
+        max_entries=config.get("cache_max_entries"),
+        max_bytes=config.get("cache_max_bytes"),
+        eviction_policy=config.get("cache_eviction_policy", "lru"),
+        memory_max_entries=config.get("cache_memory_max_entries", 1000),
+        memory_max_bytes=config.get("cache_memory_max_bytes", 64 * 1024 * 1024),
+    )
+
+
+def setup_templates(args: argparse.Namespace, config: dict) -> Dict[str, Any]:
+    """Load custom code and test templates named in the config, if any."""
+    templates_config = config.get("templates") or {}
+    if not templates_config.get("code") and not templates_config.get("test"):
+        return {}
+
+    loader = TemplateLoader(
+        Path(templates_config.get("dir", "templates")),
+        bytecode_cache_dir=args.cache_dir / "templates",
+    )
+    templates = {}
+    if templates_config.get("code"):
+        templates["template"] = loader.load(
+            templates_config["code"], CodeGenerationTemplate().get_system_prompt()
+        )
+    if templates_config.get("test"):
+        templates["test_template"] = loader.load(
+            templates_config["test"], TestGenerationTemplate().get_system_prompt()
+        )
+    return templates
+
+
+def setup_validator(config: dict) -> Validator:
+    """Setup the validation checks named in the config."""
+    validation_config = config.get("validation") or {}
+    timeout = validation_config.get("timeout", 30)
+    checks = []
+    for name in validation_config.get("checks", ["syntax"]):
+        if name not in VALIDATION_CHECKS:
+            raise PromptCompilerError(f"Unknown validation check: {name}")
+        if name == "lint" and validation_config.get("lint_command"):
+            checks.append(LintCheck(timeout, validation_config["lint_command"]))
+        else:
+            checks.append(VALIDATION_CHECKS[name](timeout))
+    return Validator(checks, max_workers=validation_config.get("workers"))
+
+
+def setup_api_keys(config: dict, api_key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    API keys of a provider from its config.
+
+    Args:
+        config: Loaded configuration, or a provider's entry in it, with
+            `api_keys` or `api_key`
+        api_key: Key given on the command line, used instead (optional)
+
+    Returns:
+        Dictionaries with the "key" and optionally its "name", "organization",
+        "base_url" and "rate_limits"
+
+    Raises:
+        PromptCompilerError: If no API key is given
+    """
+    if api_key:
+        keys = [api_key]
+    else:
+        keys = config.get("api_keys") or [config.get("api_key")]
+    keys = [key if isinstance(key, dict) else {"key": key} for key in keys]
+    if not all(key.get("key") for key in keys):
         raise PromptCompilerError(
             "API key is required. Provide it via --api-key or config file."
         )
+    return keys
+
+
+def create_adapter(
+    provider: str, model_name: Optional[str], keys: List[Dict[str, Any]]
+) -> AiAdapter:
+    """
+    Create the adapter for a provider's model.
+
+    With several API keys, requests are spread across an adapter per key,
+    each key with its own rate limits.
+
+    Args:
+        provider: "gpt" or "claude"
+        model_name: Model to use (default: the provider's default model)
+        keys: API keys from `setup_api_keys`
+
+    Raises:
+        PromptCompilerError: If the provider is unknown
+    """
+    # Only the selected adapter's module is imported
+    if provider == "gpt":
+        from .ai_adapters.gpt_adapter import GptAdapter
+
+        model_name = model_name or "gpt-4"
+
+        def create(key: Dict[str, Any], rate_limiter: Optional[RateLimiter]):
+            return GptAdapter(
+                api_key=key["key"],
+                model=model_name,
+                rate_limiter=rate_limiter,
+                organization=key.get("organization"),
+                base_url=key.get("base_url"),
+            )
+
+    elif provider == "claude":
+        from .ai_adapters.claude_adapter import ClaudeAdapter
+
+        model_name = model_name or "claude-3-opus-20240229"
+
+        def create(key: Dict[str, Any], rate_limiter: Optional[RateLimiter]):
+            return ClaudeAdapter(
+                api_key=key["key"],
+                model=model_name,
+                rate_limiter=rate_limiter,
+                base_url=key.get("base_url"),
+            )
+
+    else:
+        raise PromptCompilerError(
+            f"Unknown model provider: {provider} (choose from gpt, claude)"
+        )
+
+    adapters = []
+    for i, key in enumerate(keys, 1):
+        rate_limiter = None
+        if len(keys) > 1 or key.get("rate_limits"):
+            # Quotas are per key; a single key shares the model's limiter
+            rate_limiter = get_rate_limiter(
+                model_name, key.get("name", f"key-{i}"), key.get("rate_limits")
+            )
+        adapters.append(create(key, rate_limiter))
+    if len(adapters) == 1:
+        return adapters[0]
+
+    from .ai_adapters.adapter_pool import AdapterPool
+
+    return AdapterPool(adapters)
+
+
+def setup_adapter(args: argparse.Namespace, config: dict) -> AiAdapter:
+    """
+    Setup the AI adapter selected by the arguments and config.
+
+    With `hedging` fallbacks configured, requests slower than usual are
+    hedged with the fallbacks, and requests failing with errors retrying
+    would not fix fall back to them, in order.
+    """
+    adapter = create_adapter(
+        args.model,
+        args.model_name or config.get("model_name"),
+        setup_api_keys(config, args.api_key),
+    )
+    hedging = config.get("hedging") or {}
+    if not hedging.get("fallbacks"):
+        return adapter
+
+    from .ai_adapters.hedged_adapter import HedgedAdapter
+
+    adapters = [adapter]
+    for fallback in hedging["fallbacks"]:
+        adapters.append(
+            create_adapter(
+                fallback.get("model"),
+                fallback.get("model_name"),
+                setup_api_keys(fallback),
+            )
+        )
+    return HedgedAdapter(
+        adapters,
+        **{
+            name: hedging[name]
+            for name in ("percentile", "initial_delay", "min_samples", "max_hedges")
+            if name in hedging
+        },
+    )
 
-    # Get model name from args or config
-    model_name = args.model_name or config.get("model_name")
 
-    # Initialize AI adapter
-    if args.model == "gpt":
-        default_model = "gpt-4"
-        adapter = GptAdapter(api_key=api_key, model=model_name or default_model)
-    else:  # claude
-        default_model = "claude-3-opus-20240229"
-        adapter = ClaudeAdapter(api_key=api_key, model=model_name or default_model)
+def setup_token_estimator(config: dict, model: Optional[str] = None) -> TokenEstimator:
+    """Setup the token estimator that orders requests."""
+    scheduling = config.get("scheduling") or {}
+    return TokenEstimator(tokenizer=load_tokenizer(scheduling.get("tokenizer"), model))
+
+
+def setup_compiler(
+    args: argparse.Namespace, config: dict, adapter: Optional[AiAdapter] = None
+) -> Compiler:
+    """
+    Setup compiler with given arguments and config.
+
+    Args:
+        args: Parsed command line arguments
+        config: Loaded configuration
+        adapter: AI adapter to use instead of the one selected by the
+            arguments (optional)
+    """
+    # Per-model request/token budgets and connection pools shared by all
+    # adapters and workers
+    configure_rate_limits(config.get("rate_limits", {}))
+    configure_http_pool(config.get("http"))
+
+    if adapter is None:
+        adapter = setup_adapter(args, config)
 
     # Initialize compiler
     return Compiler(
         ai_adapter=adapter,
-        cache_dir=args.cache_dir,
+        cache_manager=setup_cache_manager(args, config),
+        retry_policy=RetryPolicy(**config.get("retry", {})),
+        generation_params=config.get("generation"),
+        generate_tests=not args.no_tests,
+        validator=setup_validator(config),
+        regenerate_attempts=(config.get("validation") or {}).get(
+            "regenerate_attempts", 0
+        ),
+        token_estimator=setup_token_estimator(config, getattr(adapter, "model", None)),
+        **setup_templates(args, config),
     )
 
 
+def code_output_path(
+    output_dir: Path, format: str, prompt_file: Path, language: Optional[str] = None
+) -> Path:
+    """
+    Path of the file that receives the generated code for a prompt.
+
+    The file is named after the module the tests were validated against,
+    e.g. `src/my_util.py` for `my-util.prompt`.
+    """
+    filename = f"{module_name_for(prompt_file.stem)}{get_language(language).extension}"
+    if format == "single":
+        return output_dir / filename
+    return output_dir / "src" / filename
+
+
+class StreamWriter:
+    """Write streamed code to a file as it arrives."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, code: str) -> None:
+        self.file.write(code)
+        self.file.flush()
+
+    def reset(self) -> None:
+        """Discard everything written so far."""
+        self.file.seek(0)
+        self.file.truncate()
+
+    def close(self) -> None:
+        self.file.close()
+
+
 def process_output(
     result: dict, output_dir: Path, format: str, prompt_file: Path
-) -> None:
-    """Process and write compilation results."""
+) -> List[Path]:
+    """Process and write compilation results; return the files written."""
     output_dir.mkdir(parents=True, exist_ok=True)
+    language = get_language(result.get("language"))
 
     if format == "single":
         # Write everything to a single file
-        output_file = output_dir / f"{prompt_file.stem}.py"
-        content = f"{result['code']}\n\n# Tests\n{result['tests']}"
+        output_file = code_output_path(output_dir, format, prompt_file, language.name)
+        content = result["code"]
+        if result["tests"] is not None:
+            content += f"\n\n{language.line_comment} Tests\n{result['tests']}"
         output_file.write_text(content)
+        return [output_file]
     else:
         # Split into separate files
         src_dir = output_dir / "src"
-        test_dir = output_dir / "tests"
-
         src_dir.mkdir(exist_ok=True)
+        src_file = code_output_path(output_dir, format, prompt_file, language.name)
+        src_file.write_text(result["code"])
+        if result["tests"] is None:
+            return [src_file]
+
+        test_dir = output_dir / "tests"
         test_dir.mkdir(exist_ok=True)
+        test_file = test_dir / language.test_filename.format(
+            name=module_name_for(prompt_file.stem)
+        )
+        test_file.write_text(result["tests"])
+        return [src_file, test_file]
+
+
+def build_config_hash(compiler: Compiler, args: argparse.Namespace) -> str:
+    """Hash the compiler and output settings recorded in the build manifest."""
+    return config_hash(
+        compiler.context_digest(), args.format, str(args.output_dir.resolve())
+    )
+
+
+def generate_code(
+    compiler: Compiler,
+    prompt_file: Path,
+    args: argparse.Namespace,
+    prompt_data: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    First compile stage: read a prompt file and generate its code.
 
-        (src_dir / f"{prompt_file.stem}.py").write_text(result["code"])
-        (test_dir / f"test_{prompt_file.stem}.py").write_text(result["tests"])
+    With --stream, the code is written to the output file as it streams; the
+    file is rewritten with the final output by `complete_file`, and removed
+    if compilation fails.
+
+    Args:
+        compiler: Compiler, or client of a compile server
+        prompt_file: Path to the prompt file
+        args: Parsed command line arguments
+        prompt_data: Prompt data already read from `prompt_file` (optional)
+
+    Returns:
+        Tuple of the parsed prompt data and the code generation result
+    """
+    if not args.stream:
+        if prompt_data is None:
+            return compiler.generate_code(prompt_file, force_rebuild=args.force)
+        return compiler.generate_code(
+            prompt_file, force_rebuild=args.force, prompt_data=prompt_data
+        )
+
+    # The output file name depends on the prompt's language
+    if prompt_data is None:
+        prompt_data = compiler.prompt_reader.read(prompt_file)
+    writer = StreamWriter(
+        code_output_path(
+            args.output_dir, args.format, prompt_file, prompt_data.get("language")
+        )
+    )
+    try:
+        return compiler.generate_code(
+            prompt_file,
+            force_rebuild=args.force,
+            on_code=writer.write,
+            on_restart=writer.reset,
+            prompt_data=prompt_data,
+        )
+    except Exception:
+        writer.close()
+        writer.path.unlink(missing_ok=True)
+        raise
+    finally:
+        writer.close()
+
+
+def complete_file(
+    compiler: Compiler,
+    prompt_file: Path,
+    code: Tuple[Dict[str, Any], Dict[str, Any]],
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    """
+    Second compile stage: generate tests for the code and write the output.
+
+    Returns:
+        Compilation result, with the files written under "outputs"
+    """
+    prompt_data, code_result = code
+    try:
+        result = compiler.complete(
+            prompt_data,
+            code_result,
+            force_rebuild=args.force,
+            module_name=module_name_for(prompt_file.stem),
+        )
+    except Exception:
+        if args.stream:
+            code_output_path(
+                args.output_dir, args.format, prompt_file, prompt_data.get("language")
+            ).unlink(missing_ok=True)
+        raise
+
+    with instrumentation.span("write_output"):
+        result["outputs"] = process_output(
+            result, args.output_dir, args.format, prompt_file
+        )
+    return result
+
+
+def compile_batch(
+    compiler: Compiler, prompt_files: List[Path], args: argparse.Namespace
+) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Compile prompt files through the provider's batch API and write outputs.
+
+    Submitted batches are recorded in the cache directory, so an interrupted
+    run picks up the same batch when it is restarted.
+    """
+    from .batch import BatchRunner
+
+    runner = BatchRunner(
+        compiler,
+        args.cache_dir / "batch_state.json",
+        poll_interval=args.batch_poll_interval,
+    )
+    outcomes = []
+    for prompt_file, (result, error) in zip(
+        prompt_files, runner.run(prompt_files, force_rebuild=args.force)
+    ):
+        if result is not None:
+            try:
+                with instrumentation.span("write_output"):
+                    result["outputs"] = process_output(
+                        result, args.output_dir, args.format, prompt_file
+                    )
+            except Exception as e:
+                result, error = None, str(e)
+        outcomes.append((result, error))
+    return outcomes
+
+
+def schedule_prompt_files(
+    compiler: Compiler, prompt_files: List[Path], token_estimator: TokenEstimator
+) -> Tuple[Dict[Path, Dict[str, Any]], List[int]]:
+    """
+    Read prompt files and order them by their expected output, largest first.
+
+    Prompt files that cannot be read are left to fail when compiled.
+
+    Returns:
+        Tuple of the prompt data by prompt file, and the indices of the
+        prompt files in the order to compile them
+    """
+    prompt_data = {}
+    costs = []
+    for prompt_file in prompt_files:
+        try:
+            with instrumentation.span("read_prompt"):
+                prompt_data[prompt_file] = compiler.prompt_reader.read(prompt_file)
+        except Exception:
+            costs.append(0)
+            continue
+        costs.append(token_estimator.expected_output_tokens(prompt_data[prompt_file]))
+    return prompt_data, largest_first(costs)
+
+
+def compile_files(
+    compiler: Compiler,
+    prompt_files: List[Path],
+    args: argparse.Namespace,
+    manifest: Optional[BuildManifest] = None,
+    token_estimator: Optional[TokenEstimator] = None,
+) -> None:
+    """
+    Compile prompt files in parallel, reporting results in input order.
+
+    Code and test generation run as a pipeline, each stage with `--jobs`
+    workers, so tests for one file are generated while code for the next one
+    is. With a token estimator, files expected to produce the most output
+    are started first, so that they do not hold up the end of the run.
+
+    With a build manifest, prompt files that are up to date are skipped
+    without being read, and successful builds are recorded.
+    """
+    if manifest is not None:
+        build_hash = build_config_hash(compiler, args)
+        if not args.force:
+            pending = []
+            for prompt_file in prompt_files:
+                if manifest.is_up_to_date(prompt_file, build_hash):
+                    print(f"Up to date: {prompt_file}")
+                else:
+                    pending.append(prompt_file)
+            prompt_files = pending
+
+    if args.batch:
+        outcomes = compile_batch(compiler, prompt_files, args)
+    else:
+        prompt_data: Dict[Path, Dict[str, Any]] = {}
+        order = None
+        if token_estimator is not None and args.jobs > 1:
+            prompt_data, order = schedule_prompt_files(
+                compiler, prompt_files, token_estimator
+            )
+        outcomes = (
+            (result, None if error is None else str(error))
+            for result, error in run_pipeline(
+                prompt_files,
+                lambda prompt_file: generate_code(
+                    compiler, prompt_file, args, prompt_data.get(prompt_file)
+                ),
+                lambda prompt_file, code: complete_file(
+                    compiler, prompt_file, code, args
+                ),
+                workers=args.jobs,
+                order=order,
+            )
+        )
+    for prompt_file, (result, error) in zip(prompt_files, outcomes):
+        if error is not None:
+            if manifest is not None:
+                manifest.invalidate(prompt_file)
+            print(f"Error compiling {prompt_file}: {error}", file=sys.stderr)
+            continue
+
+        if manifest is not None:
+            manifest.record(prompt_file, build_hash, result["outputs"])
+        if result.get("retries"):
+            print(f"Successfully compiled {prompt_file} ({result['retries']} retries)")
+        else:
+            print(f"Successfully compiled {prompt_file}")
+
+    if manifest is not None:
+        manifest.save()
+
+
+def collect_prompt_files(inputs: List[Path]) -> List[Path]:
+    """Expand input paths into prompt files, reporting missing ones."""
+    prompt_files = []
+    for path in inputs:
+        if path.is_dir():
+            prompt_files.extend(sorted(path.rglob("*.prompt")))
+        elif path.exists():
+            prompt_files.append(path)
+        else:
+            print(f"Error: Input file not found: {path}", file=sys.stderr)
+    return prompt_files
+
+
+def watch(
+    compiler: Compiler,
+    args: argparse.Namespace,
+    manifest: Optional[BuildManifest] = None,
+) -> None:
+    """Recompile prompt files as they change until interrupted."""
+    from .watcher import PromptWatcher
+
+    watcher = PromptWatcher(args.input)
+    print("Watching for changes (press Ctrl+C to stop)...")
+    try:
+        for changed in watcher.changes():
+            compile_files(compiler, changed, args, manifest)
+    except KeyboardInterrupt:
+        pass
+
+
+def cache_main(argv: List[str]) -> int:
+    """Entry point for the `cache` subcommand."""
+    args = create_cache_parser().parse_args(argv)
+
+    try:
+        cache_manager = setup_cache_manager(args, load_config(args.config))
+
+        if args.command == "gc":
+            removed = cache_manager.gc()
+            print(f"Removed {removed} cache entries")
+        elif args.command == "clear":
+            removed = cache_manager.clear()
+            print(f"Cleared {removed} cache entries")
+        else:
+            stats = cache_manager.stats()
+            print(f"Entries:  {stats['entries']}")
+            print(f"Size:     {stats['bytes']} bytes")
+            print(f"Hits:     {stats['hits']}")
+            print(f"Misses:   {stats['misses']}")
+            print(f"Hit rate: {stats['hit_rate']:.1%}")
+
+        return 0
+
+    except PromptCompilerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def serve_main(argv: List[str]) -> int:
+    """Entry point for the `serve` subcommand."""
+    from .server import TOKEN_FILENAME, CompileServer, write_token_file
+
+    args = create_serve_parser().parse_args(argv)
+    token_file = args.token_file or args.cache_dir / TOKEN_FILENAME
+
+    try:
+        compiler = setup_compiler(args, load_config(args.config))
+        try:
+            server = CompileServer(compiler, args.host, args.port)
+        except OSError as e:
+            raise PromptCompilerError(f"Cannot listen on {args.host}:{args.port}: {e}")
+        write_token_file(token_file, server.token)
+        print(f"Serving on {server.url} (press Ctrl+C to stop)")
+        print(f"Client token written to {token_file}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            token_file.unlink(missing_ok=True)
+            server.server_close()
+            compiler.close()
+            close_http_clients()
+        return 0
+
+    except PromptCompilerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def bench_main(argv: List[str]) -> int:
+    """Entry point for the `bench` subcommand."""
+    from .benchmark import format_results, run_benchmark, save_results
+
+    args = create_bench_parser().parse_args(argv)
+
+    try:
+        if args.files < 1 or args.jobs < 1:
+            raise PromptCompilerError("--files and --jobs must be at least 1")
+        results = run_benchmark(
+            files=args.files,
+            jobs=args.jobs,
+            latency=args.latency,
+            distribution=args.latency_distribution,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            response_lines=args.response_lines,
+            generate_tests=not args.no_tests,
+            seed=args.seed,
+            config=load_config(args.config) if args.config else None,
+            startup_runs=args.startup_runs,
+        )
+        print(format_results(results))
+        if args.output:
+            save_results(results, args.output)
+            print(f"Results saved to {args.output}")
+        return 0
+
+    except PromptCompilerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
 
 
 def main(argv: Optional[List[str]] = None) -> int:
     """Main entry point for the compiler CLI."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "cache":
+        return cache_main(argv[1:])
+    if argv and argv[0] == "serve":
+        return serve_main(argv[1:])
+    if argv and argv[0] == "bench":
+        return bench_main(argv[1:])
+
     parser = create_parser()
     args = parser.parse_args(argv)
+    instrumented = args.stats or args.trace_file
+    exporter = None
 
     try:
         # Load config
         config = load_config(args.config)
 
-        # Setup compiler
-        compiler = setup_compiler(args, config)
+        if args.jobs < 1:
+            raise PromptCompilerError("--jobs must be at least 1")
+        if args.batch and (args.stream or args.watch or args.server):
+            raise PromptCompilerError(
+                "--batch cannot be combined with --stream, --watch or --server"
+            )
+        if instrumented:
+            exporter = setup_instrumentation(args, config)
 
-        # Process each input file
-        for prompt_file in args.input:
-            if not prompt_file.exists():
-                print(f"Error: Input file not found: {prompt_file}", file=sys.stderr)
-                continue
+        # Setup compiler, or a client running it on a server
+        if args.server:
+            from .server import TOKEN_FILENAME, CompileClient, read_token_file
 
-            try:
-                # Compile prompt
-                result = compiler.compile(prompt_file, force_rebuild=args.force)
+            token = args.server_token or read_token_file(
+                args.cache_dir / TOKEN_FILENAME
+            )
+            compiler = CompileClient(args.server, token)
+        else:
+            compiler = setup_compiler(args, config)
 
-                # Write output
-                process_output(result, args.output_dir, args.format, prompt_file)
+        prompt_files = collect_prompt_files(args.input)
 
-                print(f"Successfully compiled {prompt_file}")
+        manifest = None
+        if args.incremental:
+            manifest = BuildManifest(args.cache_dir / "manifest.json")
 
-            except Exception as e:
-                print(f"Error compiling {prompt_file}: {e}", file=sys.stderr)
+        token_estimator = None
+        if (config.get("scheduling") or {}).get("order", "largest_first") != "input":
+            token_estimator = setup_token_estimator(config)
+        compile_files(compiler, prompt_files, args, manifest, token_estimator)
+
+        if args.watch:
+            watch(compiler, args, manifest)
 
+        compiler.close()
+        if args.stats:
+            print(format_summary(instrumentation.summary()))
         return 0
 
     except PromptCompilerError as e:
@@ -178,6 +1084,13 @@ def main(argv: Optional[List[str]] = None) -> int:
     except Exception as e:
         print(f"Unexpected error: {e}", file=sys.stderr)
         return 2
+    finally:
+        close_http_clients()
+        if instrumented:
+            instrumentation.disable()
+        if exporter is not None:
+            instrumentation.remove_hook(exporter)
+            exporter.close()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,19 @@
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 from .ai_adapters import AiAdapter
 from .utils.cache_manager import CacheManager
 from .exceptions import ValidationError
 from .templates import CodeGenerationTemplate
-from .formatters import ResponseProcessor, PythonFormatter
+from .formatters import ResponseProcessor, StreamingCodeExtractor
+from .instrumentation import instrumentation
+from .languages import get_language
+from .utils.hashing import canonical_json, context_hash
+from .utils.retry import RetryPolicy
+from .utils.scheduler import TokenEstimator
+from .utils.single_flight import SingleFlight
+
+# Generation parameters passed to the AI adapter unless overridden
+DEFAULT_GENERATION_PARAMS = {"temperature": 0.7, "max_tokens": 2000}
 
 
 class CodeGenerator:
@@ -14,6 +23,10 @@ class CodeGenerator:
         cache_dir: Optional[Path] = None,
         template: Optional[CodeGenerationTemplate] = None,
         formatter: Optional[ResponseProcessor] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache_manager: Optional[CacheManager] = None,
+        generation_params: Optional[Dict[str, Any]] = None,
+        token_estimator: Optional[TokenEstimator] = None,
     ):
         """
         Initialize CodeGenerator with an AI adapter.
@@ -22,12 +35,29 @@ class CodeGenerator:
             ai_adapter: AI adapter instance to use for code generation
             cache_dir: Directory for caching responses (optional)
             template: Template for code generation (optional)
-            formatter: Response formatter (optional)
+            formatter: Response formatter for all languages (default: the
+                formatter registered for each prompt's language)
+            retry_policy: Retry policy for AI adapter calls (optional)
+            cache_manager: Cache manager, overrides cache_dir (optional)
+            generation_params: AI adapter parameters such as temperature and
+                max_tokens (optional)
+            token_estimator: Token estimator used by estimate_tokens (default:
+                heuristic token counts)
         """
         self.ai_adapter = ai_adapter
-        self.cache_manager = CacheManager(cache_dir or Path(".cache"))
+        self.cache_manager = cache_manager or CacheManager(cache_dir or Path(".cache"))
         self.template = template or CodeGenerationTemplate()
-        self.formatter = formatter or ResponseProcessor(PythonFormatter())
+        self.formatter = formatter
+        self._processors: Dict[str, ResponseProcessor] = {}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.generation_params = {
+            **DEFAULT_GENERATION_PARAMS,
+            **(generation_params or {}),
+        }
+        self.token_estimator = token_estimator
+        # Identical concurrent generations, in this or other processes sharing
+        # the cache directory, wait for a single AI call
+        self.single_flight = SingleFlight(self.cache_manager.cache_dir / "locks")
 
     def generate(self, prompt_data: Dict[str, Any], force_rebuild: bool = False) -> str:
         """
@@ -40,28 +70,347 @@ class CodeGenerator:
         Returns:
             Generated code as string
         """
+        return self.generate_result(prompt_data, force_rebuild)["code"]
+
+    def generate_result(
+        self, prompt_data: Dict[str, Any], force_rebuild: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Generate code and report how it was obtained.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Dictionary with the generated "code", whether it was "cached"
+            and the number of "retries" made against the AI adapter;
+            "coalesced" is True when the code was shared by an identical
+            generation already in flight
+        """
+        cache_key = self.cache_key(prompt_data)
+        if not force_rebuild:
+            cached_result = self._cached_result(cache_key)
+            if cached_result:
+                return cached_result
+
+        def generate() -> Dict[str, Any]:
+            if not force_rebuild:
+                # Another process may have generated it while we waited
+                cached_result = self._cached_result(cache_key, record_miss=False)
+                if cached_result:
+                    return cached_result
+
+            # Format prompt using template
+            formatted_prompt, system_prompt = self._render_prompt(prompt_data)
+
+            # Generate code using AI adapter
+            with instrumentation.span("ai_request", model=self._model):
+                generated_code, retries = self.retry_policy.call(
+                    lambda: self.ai_adapter.generate(
+                        formatted_prompt,
+                        system_prompt=system_prompt,
+                        **self.generation_params,
+                    )
+                )
+            instrumentation.count("retries", retries)
+
+            code = self.process_response(prompt_data, generated_code, cache_key)
+            return {"code": code, "cached": False, "retries": retries}
+
+        return self._coalesced(*self.single_flight.do(cache_key, generate))
+
+    async def agenerate(
+        self, prompt_data: Dict[str, Any], force_rebuild: bool = False
+    ) -> str:
+        """
+        Asynchronously generate code from prompt data.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Generated code as string
+        """
+        return (await self.agenerate_result(prompt_data, force_rebuild))["code"]
+
+    async def agenerate_result(
+        self, prompt_data: Dict[str, Any], force_rebuild: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously generate code and report how it was obtained.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Dictionary with the generated "code", whether it was "cached"
+            and the number of "retries" made against the AI adapter;
+            "coalesced" is True when the code was shared by an identical
+            generation already in flight
+        """
+        cache_key = self.cache_key(prompt_data)
+        if not force_rebuild:
+            cached_result = self._cached_result(cache_key)
+            if cached_result:
+                return cached_result
+
+        async def generate() -> Dict[str, Any]:
+            if not force_rebuild:
+                # Another process may have generated it while we waited
+                cached_result = self._cached_result(cache_key, record_miss=False)
+                if cached_result:
+                    return cached_result
+
+            # Format prompt using template
+            formatted_prompt, system_prompt = self._render_prompt(prompt_data)
+
+            # Generate code using AI adapter
+            with instrumentation.span("ai_request", model=self._model):
+                generated_code, retries = await self.retry_policy.acall(
+                    lambda: self.ai_adapter.agenerate(
+                        formatted_prompt,
+                        system_prompt=system_prompt,
+                        **self.generation_params,
+                    )
+                )
+            instrumentation.count("retries", retries)
+
+            code = self.process_response(prompt_data, generated_code, cache_key)
+            return {"code": code, "cached": False, "retries": retries}
+
+        return self._coalesced(*await self.single_flight.ado(cache_key, generate))
+
+    def generate_stream(
+        self,
+        prompt_data: Dict[str, Any],
+        on_code: Callable[[str], None],
+        force_rebuild: bool = False,
+        on_restart: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate code, passing code to `on_code` as the response streams in.
+
+        The streamed code is extracted from the response as-is; the returned
+        code is the fully processed response and may differ in formatting.
+        It is cached only once the response is complete.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            on_code: Called with each piece of code as it becomes available
+            force_rebuild: If True, ignore cache and generate new code
+            on_restart: Called before a retry re-streams the response, so
+                that code already passed to `on_code` can be discarded
+
+        Returns:
+            Dictionary with the generated "code", whether it was "cached"
+            and the number of "retries" made against the AI adapter;
+            "coalesced" is True when the code was shared by an identical
+            generation already in flight
+        """
+        cache_key = self.cache_key(prompt_data)
+        if not force_rebuild:
+            cached_result = self._cached_result(cache_key)
+            if cached_result:
+                on_code(cached_result["code"])
+                return cached_result
+
+        result, shared = self.single_flight.do(
+            cache_key,
+            lambda: self._generate_stream(
+                prompt_data, cache_key, on_code, force_rebuild, on_restart
+            ),
+        )
+        if shared:
+            # Only the leading call streamed; hand over the finished code
+            on_code(result["code"])
+        return self._coalesced(result, shared)
+
+    def _generate_stream(
+        self,
+        prompt_data: Dict[str, Any],
+        cache_key: str,
+        on_code: Callable[[str], None],
+        force_rebuild: bool,
+        on_restart: Optional[Callable[[], None]],
+    ) -> Dict[str, Any]:
         if not force_rebuild:
-            cached_response = self.cache_manager.get_cached_response(prompt_data)
-            if cached_response:
-                return cached_response
+            # Another process may have generated it while we waited
+            cached_result = self._cached_result(cache_key, record_miss=False)
+            if cached_result:
+                on_code(cached_result["code"])
+                return cached_result
 
         # Format prompt using template
-        formatted_prompt = self.template.render(prompt_data)
-        system_prompt = self.template.get_system_prompt()
+        formatted_prompt, system_prompt = self._render_prompt(prompt_data)
+        language = get_language(prompt_data.get("language"))
+        attempts = 0
+
+        def stream_response() -> str:
+            nonlocal attempts
+            if attempts and on_restart is not None:
+                on_restart()
+            attempts += 1
+
+            extractor = StreamingCodeExtractor(tags=language.tags)
+            for chunk in self.ai_adapter.stream(
+                formatted_prompt, system_prompt=system_prompt, **self.generation_params
+            ):
+                code = extractor.feed(chunk)
+                if code:
+                    on_code(code)
+            remaining = extractor.finish()
+            if remaining:
+                on_code(remaining)
+            return extractor.response
+
+        with instrumentation.span("ai_request", model=self._model, stream=True):
+            generated_code, retries = self.retry_policy.call(stream_response)
+        instrumentation.count("retries", retries)
+
+        code = self.process_response(prompt_data, generated_code, cache_key)
+        return {"code": code, "cached": False, "retries": retries}
+
+    def _cached_result(
+        self, cache_key: str, record_miss: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        with instrumentation.span("cache_read"):
+            cached_response = self.cache_manager.lookup(cache_key, record_miss)
+        if not cached_response:
+            if record_miss:
+                instrumentation.count("cache_misses")
+            return None
+        instrumentation.count("cache_hits")
+        return {"code": cached_response, "cached": True, "retries": 0}
+
+    @staticmethod
+    def _coalesced(result: Dict[str, Any], shared: bool) -> Dict[str, Any]:
+        """Mark a result taken over from an identical in-flight generation."""
+        if not shared:
+            return result
+        instrumentation.count("coalesced")
+        return {**result, "retries": 0, "coalesced": True}
+
+    @property
+    def _model(self) -> str:
+        return getattr(self.ai_adapter, "model", None) or type(self.ai_adapter).__name__
+
+    def formatter_for(self, language: Optional[str] = None) -> ResponseProcessor:
+        """
+        Response processor for code in a language.
+
+        Args:
+            language: Prompt language, None for the default language
+
+        Returns:
+            The configured formatter, or the language's registered formatter
+        """
+        if self.formatter is not None:
+            return self.formatter
+        name = get_language(language).name
+        processor = self._processors.get(name)
+        if processor is None:
+            processor = ResponseProcessor(get_language(name).formatter())
+            self._processors[name] = processor
+        return processor
+
+    def context_digest(self, language: Optional[str] = None) -> str:
+        """
+        Digest of everything besides the prompt that shapes a response.
+
+        Covers the adapter type and model, generation parameters, template
+        and system prompt source, and the formatter and its version.
+
+        Args:
+            language: Prompt language whose formatter to cover (default:
+                the default language)
+        """
+        processor = self.formatter_for(language)
+        formatter = getattr(processor, "formatter", processor)
+        return context_hash(
+            (
+                self.ai_adapter.adapter_name,
+                getattr(self.ai_adapter, "model", None),
+                canonical_json(self.generation_params),
+                type(self.template).__name__,
+                self.template.get_template(),
+                self.template.get_system_prompt(),
+                type(formatter).__name__,
+                getattr(formatter, "version", None),
+            )
+        )
 
-        # Generate code using AI adapter
-        generated_code = self.ai_adapter.generate(
-            formatted_prompt, system_prompt=system_prompt
+    def cache_key(self, prompt_data: Dict[str, Any]) -> str:
+        """Cache key for generating code from `prompt_data` with this generator."""
+        return self.cache_manager.make_key(
+            prompt_data, self.context_digest(prompt_data.get("language"))
         )
 
+    def build_request(self, prompt_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the AI adapter request for prompt data.
+
+        Returns:
+            Dictionary with the rendered "prompt", the "system_prompt" and
+            the generation parameters
+        """
+        formatted_prompt, system_prompt = self._render_prompt(prompt_data)
+        return {
+            "prompt": formatted_prompt,
+            "system_prompt": system_prompt,
+            **self.generation_params,
+        }
+
+    def estimate_tokens(self, prompt_data: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Estimate the tokens of the request for prompt data.
+
+        Returns:
+            Dictionary with the "input_tokens" of the rendered prompts, the
+            "output_tokens" expected in the response and the "max_tokens"
+            the request is made with
+        """
+        estimator = self.token_estimator or TokenEstimator()
+        formatted_prompt, system_prompt = self._render_prompt(prompt_data)
+        return {
+            "input_tokens": estimator.count(formatted_prompt)
+            + estimator.count(system_prompt),
+            "output_tokens": estimator.expected_output_tokens(prompt_data),
+            "max_tokens": self.generation_params.get("max_tokens", 0),
+        }
+
+    def _render_prompt(self, prompt_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Render the user and system prompts for the prompt data."""
+        with instrumentation.span("render_template"):
+            return self.template.render(prompt_data), self.template.get_system_prompt()
+
+    def process_response(
+        self, prompt_data: Dict[str, Any], generated_code: str, cache_key: str
+    ) -> str:
+        """
+        Format, validate and cache a raw AI response.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            generated_code: Raw response from the AI adapter
+            cache_key: Key from `cache_key` to store the processed code under
+
+        Returns:
+            Processed code
+        """
         # Process and format the response
-        processed_code = self.formatter.process(generated_code, prompt_data)
+        formatter = self.formatter_for(prompt_data.get("language"))
+        with instrumentation.span("format"):
+            processed_code = formatter.process(generated_code, prompt_data)
 
         # Validate generated code
         if not self.ai_adapter.validate_response(processed_code):
             raise ValidationError("Generated code validation failed")
 
         # Cache the response
-        self.cache_manager.cache_response(prompt_data, processed_code)
+        with instrumentation.span("cache_write"):
+            self.cache_manager.store(cache_key, processed_code)
 
         return processed_code
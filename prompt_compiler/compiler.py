@@ -1,39 +1,399 @@
+import asyncio
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, NoReturn, Optional, Tuple
 
+from prompt_compiler.ai_adapters import AiAdapter
 from prompt_compiler.prompt_reader import PromptReader
 from prompt_compiler.code_generator import CodeGenerator
 from prompt_compiler.test_generator import TestGenerator
-from prompt_compiler.validator import Validator
+from prompt_compiler.exceptions import ValidationError
+from prompt_compiler.instrumentation import instrumentation
+from prompt_compiler.languages import get_language
+from prompt_compiler.validator import Validator, format_failures, module_name_for
+from prompt_compiler.templates import BaseTemplate, CodeGenerationTemplate
+from prompt_compiler.formatters import ResponseProcessor
+from prompt_compiler.utils.cache_manager import CacheManager
+from prompt_compiler.utils.hashing import combine_hashes
+from prompt_compiler.utils.retry import RetryPolicy
+from prompt_compiler.utils.scheduler import TokenEstimator
 
 
 class Compiler:
-    def __init__(self):
+    def __init__(
+        self,
+        ai_adapter: AiAdapter,
+        cache_dir: Optional[Path] = None,
+        template: Optional[CodeGenerationTemplate] = None,
+        formatter: Optional[ResponseProcessor] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache_manager: Optional[CacheManager] = None,
+        generation_params: Optional[Dict[str, Any]] = None,
+        generate_tests: bool = True,
+        test_template: Optional[BaseTemplate] = None,
+        validator: Optional[Validator] = None,
+        regenerate_attempts: int = 0,
+        token_estimator: Optional[TokenEstimator] = None,
+    ):
+        """
+        Initialize Compiler with an AI adapter.
+
+        Args:
+            ai_adapter: AI adapter instance to use for generation
+            cache_dir: Directory for caching responses (optional)
+            template: Template for code generation (optional)
+            formatter: Response formatter (optional)
+            retry_policy: Retry policy for AI adapter calls (optional)
+            cache_manager: Cache manager, overrides cache_dir (optional)
+            generation_params: AI adapter parameters such as temperature and
+                max_tokens (optional)
+            generate_tests: If False, skip test generation
+            test_template: Template for test generation (optional)
+            validator: Validator for generated Python code and tests; other
+                languages use their registered validator (optional)
+            regenerate_attempts: Times to regenerate code that fails
+                validation, with the failures added to the prompt
+            token_estimator: Token estimator used to estimate the tokens of
+                requests (default: heuristic token counts)
+        """
         self.prompt_reader = PromptReader()
-        self.code_generator = CodeGenerator()
-        self.test_generator = TestGenerator()
-        self.validator = Validator()
+        self.code_generator = CodeGenerator(
+            ai_adapter,
+            cache_dir=cache_dir,
+            template=template,
+            formatter=formatter,
+            retry_policy=retry_policy,
+            cache_manager=cache_manager,
+            generation_params=generation_params,
+            token_estimator=token_estimator,
+        )
+        # Tests go through the same adapter, cache and formatter as the code
+        self.test_generator = TestGenerator(
+            ai_adapter,
+            template=test_template,
+            formatter=formatter,
+            retry_policy=retry_policy,
+            cache_manager=self.code_generator.cache_manager,
+            generation_params=generation_params,
+            token_estimator=token_estimator,
+        )
+        self.generate_tests = generate_tests
+        self.validator = validator or Validator()
+        self._validators = {"python": self.validator}
+        self.regenerate_attempts = regenerate_attempts
 
-    def compile(self, prompt_file: Path) -> Dict[str, Any]:
+    def context_digest(self) -> str:
+        """Digest of the model, template and formatter settings used to compile."""
+        if not self.generate_tests:
+            return self.code_generator.context_digest()
+        return combine_hashes(
+            self.code_generator.context_digest(), self.test_generator.context_digest()
+        )
+
+    def close(self) -> None:
+        """Flush cache statistics and release resources."""
+        for validator in self._validators.values():
+            validator.close()
+        self.code_generator.cache_manager.close()
+
+    def compile(self, prompt_file: Path, force_rebuild: bool = False) -> Dict[str, Any]:
         """
         Compile a prompt file into code and tests.
 
         Args:
             prompt_file: Path to the prompt file
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Dictionary containing generated code and tests, and the number
+            of retries made against the AI adapter
+        """
+        prompt_data, code_result = self.generate_code(prompt_file, force_rebuild)
+        return self.complete(
+            prompt_data, code_result, force_rebuild, module_name_for(prompt_file.stem)
+        )
+
+    async def acompile(
+        self, prompt_file: Path, force_rebuild: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously compile a prompt file into code and tests.
+
+        Args:
+            prompt_file: Path to the prompt file
+            force_rebuild: If True, ignore cache and generate new code
+
+        Returns:
+            Dictionary containing generated code and tests, and the number
+            of retries made against the AI adapter
+        """
+        # Read and parse prompt file without blocking the event loop
+        with instrumentation.span("read_prompt"):
+            prompt_data = await asyncio.to_thread(self.prompt_reader.read, prompt_file)
+
+        # Generate code from prompt
+        code_result = await self.code_generator.agenerate_result(
+            prompt_data, force_rebuild=force_rebuild
+        )
+
+        return await self.acomplete(
+            prompt_data, code_result, force_rebuild, module_name_for(prompt_file.stem)
+        )
+
+    def compile_stream(
+        self,
+        prompt_file: Path,
+        on_code: Callable[[str], None],
+        force_rebuild: bool = False,
+        on_restart: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compile a prompt file, passing code to `on_code` as it is generated.
+
+        Args:
+            prompt_file: Path to the prompt file
+            on_code: Called with each piece of code as it becomes available
+            force_rebuild: If True, ignore cache and generate new code
+            on_restart: Called before a retry re-streams the code
+
+        Returns:
+            Dictionary containing the final generated code and tests, and
+            the number of retries made against the AI adapter
+        """
+        prompt_data, code_result = self.generate_code(
+            prompt_file, force_rebuild, on_code=on_code, on_restart=on_restart
+        )
+        return self.complete(
+            prompt_data, code_result, force_rebuild, module_name_for(prompt_file.stem)
+        )
+
+    def generate_code(
+        self,
+        prompt_file: Path,
+        force_rebuild: bool = False,
+        on_code: Optional[Callable[[str], None]] = None,
+        on_restart: Optional[Callable[[], None]] = None,
+        prompt_data: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Read a prompt file and generate its code, without tests.
+
+        This is the first stage of `compile`; pass the results to `complete`
+        to finish. Running the stages in separate workers lets the code for
+        one prompt be generated while tests for the previous one are.
+
+        Args:
+            prompt_file: Path to the prompt file
+            force_rebuild: If True, ignore cache and generate new code
+            on_code: If given, stream code to it as it is generated
+            on_restart: Called before a retry re-streams the code
+            prompt_data: Prompt data already read from `prompt_file`
+                (optional)
 
         Returns:
-            Dictionary containing generated code and tests
+            Tuple of the parsed prompt data and the code generation result
         """
         # Read and parse prompt file
-        prompt_data = self.prompt_reader.read(prompt_file)
+        if prompt_data is None:
+            with instrumentation.span("read_prompt"):
+                prompt_data = self.prompt_reader.read(prompt_file)
 
         # Generate code from prompt
-        generated_code = self.code_generator.generate(prompt_data)
+        if on_code is None:
+            code_result = self.code_generator.generate_result(
+                prompt_data, force_rebuild=force_rebuild
+            )
+        else:
+            code_result = self.code_generator.generate_stream(
+                prompt_data, on_code, force_rebuild=force_rebuild, on_restart=on_restart
+            )
+
+        return prompt_data, code_result
+
+    def complete(
+        self,
+        prompt_data: Dict[str, Any],
+        code_result: Dict[str, Any],
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate generated code and generate tests for it.
+
+        Code that fails validation, or whose tests fail, is regenerated up
+        to `regenerate_attempts` times with the failures added to the
+        prompt's requirements.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            code_result: Result of one of the CodeGenerator generate methods
+            force_rebuild: If True, ignore cache and generate new tests
+            module_name: Module the tests import the code from (default:
+                derived from the prompt name)
+
+        Returns:
+            Dictionary containing generated code and tests (None if test
+            generation is disabled), the number of retries made against the
+            AI adapter and the number of "regenerations"
+
+        Raises:
+            ValidationError: If the code still fails validation once the
+                regeneration budget is spent
+        """
+        module_name = module_name or self._module_name(prompt_data)
+        validator = self.validator_for(prompt_data.get("language"))
+        retries = 0
+        for attempt in range(self.regenerate_attempts + 1):
+            if attempt:
+                instrumentation.count("regenerations")
+                code_result = self.code_generator.generate_result(
+                    self._feedback_prompt_data(prompt_data, failures),
+                    force_rebuild=True,
+                )
+            retries += code_result["retries"]
+            code = code_result["code"]
+
+            test_result = None
+            failures = validator.check(
+                code, module_name=module_name, checks=validator.code_checks
+            )
+            if not failures and self.generate_tests:
+                test_result = self.test_generator.generate_result(
+                    code, prompt_data, force_rebuild, module_name
+                )
+                retries += test_result["retries"]
+                failures = validator.check(
+                    code,
+                    test_result["code"],
+                    module_name,
+                    checks=validator.test_checks,
+                )
+            if not failures:
+                return self._accept(prompt_data, code, test_result, retries, attempt)
+
+        self._reject(prompt_data, failures)
+
+    async def acomplete(
+        self,
+        prompt_data: Dict[str, Any],
+        code_result: Dict[str, Any],
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously validate generated code and generate tests for it.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            code_result: Result of one of the CodeGenerator generate methods
+            force_rebuild: If True, ignore cache and generate new tests
+            module_name: Module the tests import the code from (default:
+                derived from the prompt name)
+
+        Returns:
+            Dictionary containing generated code and tests (None if test
+            generation is disabled), the number of retries made against the
+            AI adapter and the number of "regenerations"
+
+        Raises:
+            ValidationError: If the code still fails validation once the
+                regeneration budget is spent
+        """
+        module_name = module_name or self._module_name(prompt_data)
+        validator = self.validator_for(prompt_data.get("language"))
+        retries = 0
+        for attempt in range(self.regenerate_attempts + 1):
+            if attempt:
+                instrumentation.count("regenerations")
+                code_result = await self.code_generator.agenerate_result(
+                    self._feedback_prompt_data(prompt_data, failures),
+                    force_rebuild=True,
+                )
+            retries += code_result["retries"]
+            code = code_result["code"]
+
+            test_result = None
+            failures = await asyncio.to_thread(
+                validator.check,
+                code,
+                module_name=module_name,
+                checks=validator.code_checks,
+            )
+            if not failures and self.generate_tests:
+                test_result = await self.test_generator.agenerate_result(
+                    code, prompt_data, force_rebuild, module_name
+                )
+                retries += test_result["retries"]
+                failures = await asyncio.to_thread(
+                    validator.check,
+                    code,
+                    test_result["code"],
+                    module_name,
+                    checks=validator.test_checks,
+                )
+            if not failures:
+                return self._accept(prompt_data, code, test_result, retries, attempt)
+
+        self._reject(prompt_data, failures)
+
+    def validator_for(self, language: Optional[str] = None) -> Validator:
+        """
+        Validator for code in a language.
+
+        Args:
+            language: Prompt language, None for the default language
+
+        Returns:
+            The configured validator for Python, or the language's
+            registered validator
+        """
+        spec = get_language(language)
+        validator = self._validators.get(spec.name)
+        if validator is None:
+            validator = self._validators[spec.name] = spec.validator()
+        return validator
+
+    @staticmethod
+    def _module_name(prompt_data: Dict[str, Any]) -> str:
+        return module_name_for(str(prompt_data.get("name") or "generated"))
 
-        # Generate tests
-        generated_tests = self.test_generator.generate(generated_code)
+    @staticmethod
+    def _feedback_prompt_data(
+        prompt_data: Dict[str, Any], failures: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Prompt data asking to fix the failures of the previous attempt."""
+        requirements = list(prompt_data.get("requirements") or [])
+        requirements.extend(
+            f"The previous implementation failed the {name} check, fix it:\n{message}"
+            for name, message in failures.items()
+        )
+        return {**prompt_data, "requirements": requirements}
 
-        # Validate generated code
-        self.validator.validate(generated_code)
+    def _accept(
+        self,
+        prompt_data: Dict[str, Any],
+        code: str,
+        test_result: Optional[Dict[str, Any]],
+        retries: int,
+        regenerations: int,
+    ) -> Dict[str, Any]:
+        if regenerations:
+            # Serve the working code for the original prompt from now on
+            self.code_generator.cache_manager.store(
+                self.code_generator.cache_key(prompt_data), code
+            )
+        return {
+            "code": code,
+            "tests": test_result["code"] if test_result else None,
+            "language": get_language(prompt_data.get("language")).name,
+            "retries": retries,
+            "regenerations": regenerations,
+        }
 
-        return {"code": generated_code, "tests": generated_tests}
+    def _reject(
+        self, prompt_data: Dict[str, Any], failures: Dict[str, str]
+    ) -> NoReturn:
+        # Do not serve the broken code from the cache next time
+        self.code_generator.cache_manager.delete(
+            self.code_generator.cache_key(prompt_data)
+        )
+        raise ValidationError(format_failures(failures))
@@ -19,13 +19,26 @@ class AIAdapterError(PromptCompilerError):
 class RateLimitError(AIAdapterError):
     """Raised when AI API rate limit is exceeded."""
 
-    def __init__(self, model: str, retry_after: Optional[int] = None):
+    def __init__(
+        self,
+        model: str,
+        retry_after: Optional[float] = None,
+        raw_error: Optional[Exception] = None,
+    ):
         self.retry_after = retry_after
         super().__init__(
-            f"Rate limit exceeded. Retry after {retry_after} seconds.", model
+            f"Rate limit exceeded. Retry after {retry_after} seconds.",
+            model,
+            raw_error,
         )
 
 
+class TransientAIError(AIAdapterError):
+    """Raised for provider failures that may succeed on retry (5xx, timeouts)."""
+
+    pass
+
+
 class ValidationError(PromptCompilerError):
     """Raised when generated code validation fails."""
 
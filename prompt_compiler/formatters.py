@@ -1,5 +1,4 @@
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
 from abc import ABC, abstractmethod
 from .exceptions import ValidationError
 
@@ -7,48 +6,231 @@ from .exceptions import ValidationError
 class CodeFormatter(ABC):
     """Base class for code formatters."""
 
+    # Bump when formatting output changes so cached responses are regenerated
+    version = "1"
+
     @abstractmethod
     def format(self, code: str) -> str:
         """Format the code string."""
         pass
 
 
-class PythonFormatter(CodeFormatter):
+# Fence tags accepted for Python code blocks
+PYTHON_TAGS = frozenset({"python", "py", "python3"})
+
+# Blank lines kept in a row; PEP 8 separates top-level definitions with two
+MAX_BLANK_LINES = 2
+
+
+def _closing_fence(text: str, pos: int) -> int:
+    """Index of the line holding the closing ``` fence at or after `pos`, or -1."""
+    while True:
+        fence = text.find("```", pos)
+        if fence == -1:
+            return -1
+        line_start = text.rfind("\n", 0, fence) + 1
+        line_end = text.find("\n", fence)
+        if line_end == -1:
+            line_end = len(text)
+        if (
+            not text[line_start:fence].strip()
+            and not text[fence + 3 : line_end].strip()
+        ):
+            return line_start
+        pos = fence + 3
+
+
+def extract_code_block(text: str, tags: frozenset = PYTHON_TAGS) -> Optional[str]:
+    """
+    Find the fenced code block to use in a response.
+
+    Scans the response once, fence by fence. The first block tagged with
+    one of `tags` wins; otherwise the first untagged block is used. A final
+    block that is never closed (truncated response) runs to the end.
+
+    Args:
+        text: AI response
+        tags: Lower-case language tags to accept
+
+    Returns:
+        Body of the chosen block, or None if there is none
+    """
+    untagged = None
+    pos = 0
+    while True:
+        fence = text.find("```", pos)
+        if fence == -1:
+            return untagged
+        line_start = text.rfind("\n", 0, fence) + 1
+        if text[line_start:fence].strip():
+            # Inline ``` in prose, not a fence
+            pos = fence + 3
+            continue
+
+        line_end = text.find("\n", fence)
+        if line_end == -1:
+            return untagged
+        info = text[fence + 3 : line_end].split(None, 1)
+        tag = info[0].lower() if info else ""
+
+        close = _closing_fence(text, line_end + 1)
+        body = text[line_end + 1 : close if close != -1 else len(text)]
+        if tag in tags:
+            return body
+        if not tag and untagged is None:
+            untagged = body
+        if close == -1:
+            return untagged
+        pos = text.find("\n", close)
+        if pos == -1:
+            return untagged
+
+
+def normalize_whitespace(code: str) -> str:
+    """
+    Normalize whitespace without changing indentation structure.
+
+    Strips trailing whitespace, removes the indentation common to all lines
+    (blocks indented inside markdown lists), limits runs of blank lines to
+    MAX_BLANK_LINES and drops leading and trailing blank lines.
+    """
+    lines = [line.rstrip() for line in code.splitlines()]
+    margin = min((len(line) - len(line.lstrip()) for line in lines if line), default=0)
+
+    kept = []
+    blank_run = 0
+    for line in lines:
+        if not line:
+            blank_run += 1
+            if blank_run <= MAX_BLANK_LINES and kept:
+                kept.append("")
+            continue
+        blank_run = 0
+        kept.append(line[margin:])
+    while kept and not kept[-1]:
+        kept.pop()
+    return "\n".join(kept)
+
+
+class FencedCodeFormatter(CodeFormatter):
+    """Formatter extracting a fenced code block by language tag."""
+
+    def __init__(self, tags: Iterable[str] = ()):
+        """
+        Initialize formatter.
+
+        Args:
+            tags: Language tags of the code blocks to extract; untagged
+                blocks are used when no tagged block is found
+        """
+        self.tags = frozenset(tag.lower() for tag in tags)
+
+    def format(self, code: str) -> str:
+        """Extract the code block and normalize its whitespace."""
+        return normalize_whitespace(self._extract_code_blocks(code))
+
+    def _extract_code_blocks(self, text: str) -> str:
+        """Extract code from markdown-style code blocks."""
+        block = extract_code_block(text, self.tags)
+        return text if block is None else block
+
+
+class PythonFormatter(FencedCodeFormatter):
     """Formatter for Python code."""
 
+    version = "2"
+
+    def __init__(self):
+        super().__init__(PYTHON_TAGS)
+
     def format(self, code: str) -> str:
-        """Format Python code."""
-        # Extract code blocks if present
-        code = self._extract_code_blocks(code)
+        """
+        Format Python code.
 
-        # Remove extra blank lines
-        code = re.sub(r"\n\s*\n\s*\n", "\n\n", code)
+        Extracts the Python code block from the response and normalizes its
+        whitespace. Indentation is kept as written. Syntax errors are left
+        to the validator's syntax check, so that the compiler can regenerate
+        the code with the error as feedback.
+        """
+        return super().format(code)
 
-        # Ensure proper indentation
-        lines = code.split("\n")
-        formatted_lines = []
-        indent_level = 0
 
+class StreamingCodeExtractor:
+    """
+    Extract the first fenced code block from a response as it streams in.
+
+    Code lines are released as soon as they are complete, so they can be
+    written out before the response has finished. If the response turns out
+    to contain no code block, `finish` returns the whole response, matching
+    `PythonFormatter._extract_code_blocks`.
+    """
+
+    def __init__(
+        self, language: Optional[str] = "python", tags: Optional[Iterable[str]] = None
+    ):
+        """
+        Initialize streaming extractor.
+
+        Args:
+            language: Language tag accepted on the opening fence besides none
+            tags: Language tags accepted on the opening fence, overrides
+                `language` (optional)
+        """
+        if tags is None:
+            tags = PYTHON_TAGS if language == "python" else {language}
+        self.fences = {"```"} | {f"```{tag}" for tag in tags if tag}
+        self.state = "before"
+        self._partial = ""
+        self._chunks: List[str] = []
+
+    @property
+    def response(self) -> str:
+        """The full response received so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consume a response chunk.
+
+        Returns:
+            Code that became available with this chunk (possibly empty)
+        """
+        self._chunks.append(chunk)
+        if self.state == "done":
+            return ""
+
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        code = []
         for line in lines:
-            # Adjust indent level based on line content
             stripped = line.strip()
-            if stripped.endswith(":"):
-                formatted_lines.append("    " * indent_level + stripped)
-                indent_level += 1
-            elif stripped in ["pass", "break", "continue"]:
-                formatted_lines.append("    " * indent_level + stripped)
-            elif stripped:
-                formatted_lines.append("    " * indent_level + stripped)
+            if self.state == "before":
+                if stripped in self.fences:
+                    self.state = "inside"
+                elif stripped.startswith("```"):
+                    self.state = "skipping"
+            elif self.state == "skipping":
+                if stripped == "```":
+                    self.state = "before"
+            elif stripped == "```":
+                self.state = "done"
+                break
             else:
-                formatted_lines.append("")
+                code.append(line + "\n")
+        return "".join(code)
 
-        return "\n".join(formatted_lines)
+    def finish(self) -> str:
+        """
+        Signal the end of the response.
 
-    def _extract_code_blocks(self, text: str) -> str:
-        """Extract code from markdown-style code blocks."""
-        code_block_pattern = r"```(?:python)?\n(.*?)\n```"
-        matches = re.findall(code_block_pattern, text, re.DOTALL)
-        return matches[0] if matches else text
+        Returns:
+            Remaining code, or the whole response if it had no code block
+        """
+        if self.state in ("before", "skipping"):
+            return self.response
+        if self.state == "inside" and self._partial.strip() != "```":
+            return self._partial
+        return ""
 
 
 class ResponseProcessor:
@@ -0,0 +1,324 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+# Prices in USD per million input and output tokens, for cost estimates;
+# override or extend them with `pricing` in prompt-compiler.yaml
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4": {"input": 30.0, "output": 60.0},
+    "gpt-4-turbo": {"input": 10.0, "output": 30.0},
+    "gpt-4o": {"input": 2.5, "output": 10.0},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.6},
+    "gpt-3.5-turbo": {"input": 0.5, "output": 1.5},
+    "claude-3-opus-20240229": {"input": 15.0, "output": 75.0},
+    "claude-3-sonnet-20240229": {"input": 3.0, "output": 15.0},
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25},
+}
+
+# Receives every event: {"type": "span" | "counter" | "usage", "name", ...}
+Hook = Callable[[Dict[str, Any]], None]
+
+# Returned by `span` while instrumentation is disabled
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """Times a block and reports it to the instrumentation on exit."""
+
+    __slots__ = ("instrumentation", "name", "attributes", "start", "wall_start")
+
+    def __init__(
+        self, instrumentation: "Instrumentation", name: str, attributes: Dict[str, Any]
+    ):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> "_Span":
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.instrumentation._record_span(
+            self.name, self.wall_start, duration, self.attributes
+        )
+
+
+class Instrumentation:
+    """
+    Timing, counter and token usage collection with exporter hooks.
+
+    Disabled until enabled or given a hook; while disabled, `span` returns a
+    shared no-op context manager and the other methods return immediately,
+    so instrumented code pays a single attribute check.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Initialize instrumentation.
+
+        Args:
+            prices: USD per million "input" and "output" tokens by model,
+                over MODEL_PRICES (optional)
+        """
+        self.enabled = False
+        self.prices = {**MODEL_PRICES, **(prices or {})}
+        self._hooks: List[Hook] = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self) -> None:
+        """Start collecting."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop collecting; collected data and hooks are kept."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Discard collected data."""
+        with self._lock:
+            self._spans: Dict[str, Dict[str, float]] = {}
+            self._counters: Dict[str, float] = {}
+            self._usage: Dict[str, Dict[str, Any]] = {}
+
+    def add_hook(self, hook: Hook) -> None:
+        """Send every event to `hook`, enabling collection."""
+        with self._lock:
+            self._hooks.append(hook)
+        self.enable()
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Stop sending events to `hook`."""
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def span(self, name: str, **attributes: Any) -> ContextManager[Any]:
+        """
+        Time a block of code.
+
+        Args:
+            name: Span name, e.g. "render_template"
+            **attributes: Attributes passed to hooks with the span
+
+        Returns:
+            Context manager timing its block
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attributes)
+
+    def count(self, name: str, value: float = 1, **attributes: Any) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name, e.g. "cache_hits"
+            value: Amount to add
+            **attributes: Attributes passed to hooks with the event
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._emit({"type": "counter", "name": name, "value": value, **attributes})
+
+    def record_usage(self, model: str, input_tokens: int, output_tokens: int) -> None:
+        """
+        Record the tokens one AI request used.
+
+        Args:
+            model: Model name
+            input_tokens: Prompt tokens reported by the provider
+            output_tokens: Completion tokens reported by the provider
+        """
+        if not self.enabled:
+            return
+        cost = self.cost(model, input_tokens, output_tokens)
+        with self._lock:
+            usage = self._usage.setdefault(
+                model,
+                {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0},
+            )
+            usage["requests"] += 1
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+            if cost is None or usage["cost"] is None:
+                usage["cost"] = None
+            else:
+                usage["cost"] += cost
+        self._emit(
+            {
+                "type": "usage",
+                "name": "ai_usage",
+                "model": model,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost": cost,
+            }
+        )
+
+    def cost(
+        self, model: str, input_tokens: int, output_tokens: int
+    ) -> Optional[float]:
+        """Estimated cost of a request in USD, or None for unknown models."""
+        prices = self.prices.get(model)
+        if prices is None:
+            return None
+        return (
+            input_tokens * prices["input"] + output_tokens * prices["output"]
+        ) / 1_000_000
+
+    def _record_span(
+        self, name: str, start: float, duration: float, attributes: Dict[str, Any]
+    ) -> None:
+        with self._lock:
+            stats = self._spans.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["max"] = max(stats["max"], duration)
+        self._emit(
+            {
+                "type": "span",
+                "name": name,
+                "start": start,
+                "duration": duration,
+                **attributes,
+            }
+        )
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        for hook in list(self._hooks):
+            hook(event)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize collected data.
+
+        Returns:
+            Dictionary with "spans" (count, total, mean and max seconds by
+            name), "counters" by name, and "usage" (requests, input and
+            output tokens and cost by model; cost is None if unknown)
+        """
+        with self._lock:
+            spans = {
+                name: {**stats, "mean": stats["total"] / stats["count"]}
+                for name, stats in self._spans.items()
+            }
+            return {
+                "spans": spans,
+                "counters": dict(self._counters),
+                "usage": {model: dict(usage) for model, usage in self._usage.items()},
+            }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Describe an instrumentation summary as a text report."""
+    lines = []
+    if summary["spans"]:
+        lines.append(
+            f"{'Stage':<20} {'Count':>7} {'Total':>10} {'Mean':>10} {'Max':>10}"
+        )
+        for name, stats in sorted(
+            summary["spans"].items(), key=lambda item: -item[1]["total"]
+        ):
+            lines.append(
+                f"{name:<20} {stats['count']:>7} {stats['total']:>9.3f}s "
+                f"{stats['mean'] * 1000:>8.1f}ms {stats['max'] * 1000:>8.1f}ms"
+            )
+
+    counters = summary["counters"]
+    lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+    if lookups:
+        lines.append(
+            f"Cache: {counters.get('cache_hits', 0):g} hits, "
+            f"{counters.get('cache_misses', 0):g} misses "
+            f"({counters.get('cache_hits', 0) / lookups:.1%} hit rate)"
+        )
+    other = {
+        name: value
+        for name, value in counters.items()
+        if name not in ("cache_hits", "cache_misses")
+    }
+    if other:
+        lines.append(
+            ", ".join(f"{name}: {value:g}" for name, value in sorted(other.items()))
+        )
+
+    for model, usage in sorted(summary["usage"].items()):
+        cost = "unknown cost" if usage["cost"] is None else f"${usage['cost']:.4f}"
+        lines.append(
+            f"{model}: {usage['requests']} requests, {usage['input_tokens']} input "
+            f"+ {usage['output_tokens']} output tokens, {cost}"
+        )
+    return "\n".join(lines) if lines else "No statistics collected"
+
+
+class JsonLinesExporter:
+    """Hook appending every event to a JSON lines file."""
+
+    def __init__(self, path: Path):
+        """
+        Initialize exporter.
+
+        Args:
+            path: File to append events to
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetryExporter:
+    """
+    Hook recording spans with an OpenTelemetry tracer.
+
+    Takes any object with the OpenTelemetry `Tracer.start_span` API, so this
+    module does not depend on the OpenTelemetry SDK. Counter and usage events
+    become zero-length spans with their values as attributes.
+    """
+
+    def __init__(self, tracer: Any):
+        """
+        Initialize exporter.
+
+        Args:
+            tracer: OpenTelemetry tracer, e.g. `trace.get_tracer(__name__)`
+        """
+        self.tracer = tracer
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        attributes = {
+            key: value
+            for key, value in event.items()
+            if key not in ("name", "start", "duration", "type")
+            and isinstance(value, (str, bool, int, float))
+        }
+        start = event.get("start", time.time())
+        end = start + event.get("duration", 0.0)
+        span = self.tracer.start_span(
+            event["name"], start_time=int(start * 1e9), attributes=attributes
+        )
+        span.end(end_time=int(end * 1e9))
+
+
+# Process-wide instrumentation used by the compiler
+instrumentation = Instrumentation()
@@ -0,0 +1,228 @@
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from .exceptions import PromptCompilerError
+
+if TYPE_CHECKING:
+    from .formatters import CodeFormatter
+    from .validator import Validator
+
+# Entry point group through which other packages register languages; each
+# entry point loads a Language
+ENTRY_POINT_GROUP = "prompt_compiler.languages"
+
+# Language of prompts that do not name one
+DEFAULT_LANGUAGE = "python"
+
+
+class Language:
+    """
+    How code in one language is extracted, validated and written.
+
+    The formatter and validator are built by factories on first use, so
+    languages that are never compiled cost nothing beyond this object.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        extension: str,
+        test_filename: str,
+        formatter_factory: Callable[["Language"], "CodeFormatter"],
+        validator_factory: Callable[["Language"], "Validator"],
+        aliases: Iterable[str] = (),
+        test_framework: Optional[str] = None,
+        line_comment: str = "//",
+    ):
+        """
+        Initialize language.
+
+        Args:
+            name: Language name as used in prompt files
+            extension: File extension of generated code, e.g. ".py"
+            test_filename: Test file name, "{name}" is replaced by the
+                prompt file name, e.g. "test_{name}.py"
+            formatter_factory: Builds the formatter for generated code
+            validator_factory: Builds the validator for generated code
+            aliases: Other names and code block tags for the language
+            test_framework: Test framework asked for by default (optional)
+            line_comment: Line comment marker, used to label the tests in
+                single file output
+        """
+        self.name = name
+        self.extension = extension
+        self.test_filename = test_filename
+        self.aliases = tuple(aliases)
+        self.test_framework = test_framework
+        self.line_comment = line_comment
+        self._formatter_factory = formatter_factory
+        self._validator_factory = validator_factory
+        self._formatter: Optional["CodeFormatter"] = None
+        self._validator: Optional["Validator"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tags(self) -> List[str]:
+        """Code block tags for the language."""
+        return [self.name, *self.aliases]
+
+    def formatter(self) -> "CodeFormatter":
+        """The formatter for generated code, built on first use."""
+        with self._lock:
+            if self._formatter is None:
+                self._formatter = self._formatter_factory(self)
+            return self._formatter
+
+    def validator(self) -> "Validator":
+        """The validator for generated code, built on first use."""
+        with self._lock:
+            if self._validator is None:
+                self._validator = self._validator_factory(self)
+            return self._validator
+
+
+class LanguageRegistry:
+    """Languages by name and alias, extended through entry points."""
+
+    def __init__(self, languages: Iterable[Language] = ()):
+        """
+        Initialize registry.
+
+        Args:
+            languages: Languages to register
+        """
+        self._languages: Dict[str, Language] = {}
+        self._entry_points_loaded = False
+        self._lock = threading.Lock()
+        for language in languages:
+            self.register(language)
+
+    def register(self, language: Language) -> None:
+        """Register a language under its name and aliases."""
+        with self._lock:
+            for name in language.tags:
+                self._languages[name.lower()] = language
+
+    def _load_entry_points(self) -> None:
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            self._entry_points_loaded = True
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            language = entry_point.load()
+            self.register(language() if callable(language) else language)
+
+    def get(self, name: Optional[str]) -> Language:
+        """
+        Get a language by name or alias.
+
+        Entry points are only loaded when a name is not built in.
+
+        Args:
+            name: Language name, None for the default language
+
+        Returns:
+            The language
+
+        Raises:
+            PromptCompilerError: If the language is not registered
+        """
+        key = (name or DEFAULT_LANGUAGE).lower()
+        language = self._languages.get(key)
+        if language is None:
+            self._load_entry_points()
+            language = self._languages.get(key)
+        if language is None:
+            known = ", ".join(sorted({lang.name for lang in self._languages.values()}))
+            raise PromptCompilerError(f"Unsupported language: {name} (known: {known})")
+        return language
+
+
+def _fenced_formatter(language: Language) -> "CodeFormatter":
+    from .formatters import FencedCodeFormatter
+
+    return FencedCodeFormatter(language.tags)
+
+
+def _python_formatter(language: Language) -> "CodeFormatter":
+    from .formatters import PythonFormatter
+
+    return PythonFormatter()
+
+
+def _python_validator(language: Language) -> "Validator":
+    from .validator import Validator
+
+    return Validator()
+
+
+def _command_validator(*command: str) -> Callable[[Language], "Validator"]:
+    """Validator factory running `command`, if it is installed."""
+
+    def factory(language: Language) -> "Validator":
+        from .validator import CommandCheck, Validator
+
+        checks = [CommandCheck(command)] if command else []
+        return Validator(
+            checks, extension=language.extension, test_filename=language.test_filename
+        )
+
+    return factory
+
+
+languages = LanguageRegistry(
+    [
+        Language(
+            "python",
+            ".py",
+            "test_{name}.py",
+            _python_formatter,
+            _python_validator,
+            aliases=("py", "python3"),
+            test_framework="pytest",
+            line_comment="#",
+        ),
+        Language(
+            "typescript",
+            ".ts",
+            "{name}.test.ts",
+            _fenced_formatter,
+            _command_validator("tsc", "--noEmit", "{module}.ts"),
+            aliases=("ts",),
+            test_framework="jest",
+        ),
+        Language(
+            "javascript",
+            ".js",
+            "{name}.test.js",
+            _fenced_formatter,
+            _command_validator("node", "--check", "{module}.js"),
+            aliases=("js",),
+            test_framework="jest",
+        ),
+        Language(
+            "go",
+            ".go",
+            "{name}_test.go",
+            _fenced_formatter,
+            _command_validator("gofmt", "-e", "{module}.go"),
+            aliases=("golang",),
+            test_framework="testing",
+        ),
+        Language(
+            "sql",
+            ".sql",
+            "test_{name}.sql",
+            _fenced_formatter,
+            _command_validator(),
+            line_comment="--",
+        ),
+    ]
+)
+
+
+def get_language(name: Optional[str]) -> Language:
+    """Get a language from the default registry, see LanguageRegistry.get."""
+    return languages.get(name)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class BuildManifest:
+    """
+    Record of previous builds used to skip unchanged prompt files.
+
+    Each prompt file maps to its mtime, size and content hash, the hash of
+    the configuration it was compiled with, and the output files written.
+    A prompt is up to date when the configuration matches, its outputs
+    still exist and its contents are unchanged. Contents are only re-hashed
+    when the size matches but the mtime does not.
+    """
+
+    version = 1
+
+    def __init__(self, path: Path):
+        """
+        Initialize build manifest, loading existing entries from `path`.
+
+        Args:
+            path: Manifest file path
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if isinstance(data, dict) and data.get("version") == self.version:
+            self.entries = data.get("entries", {})
+
+    @staticmethod
+    def _key(prompt_file: Path) -> str:
+        return str(prompt_file.resolve())
+
+    def is_up_to_date(self, prompt_file: Path, config_hash: str) -> bool:
+        """
+        Check whether `prompt_file` can be skipped.
+
+        Args:
+            prompt_file: Prompt file to check
+            config_hash: Hash of the configuration the build would use
+
+        Returns:
+            True if the prompt and configuration are unchanged since the last
+            recorded build and all its outputs exist
+        """
+        key = self._key(prompt_file)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None or entry["config_hash"] != config_hash:
+            return False
+
+        try:
+            stat = prompt_file.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry["size"]:
+            return False
+        if not all(os.path.exists(output) for output in entry["outputs"]):
+            return False
+
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            # Touched but possibly unchanged (checkout, copy): compare contents
+            if file_hash(prompt_file) != entry["content_hash"]:
+                return False
+            with self._lock:
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self._dirty = True
+
+        return True
+
+    def record(self, prompt_file: Path, config_hash: str, outputs: List[Path]) -> None:
+        """
+        Record a successful build of `prompt_file`.
+
+        Args:
+            prompt_file: Compiled prompt file
+            config_hash: Hash of the configuration used
+            outputs: Files written for the prompt
+        """
+        stat = prompt_file.stat()
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "content_hash": file_hash(prompt_file),
+            "config_hash": config_hash,
+            "outputs": [str(output) for output in outputs],
+        }
+        with self._lock:
+            self.entries[self._key(prompt_file)] = entry
+            self._dirty = True
+
+    def invalidate(self, prompt_file: Path) -> None:
+        """Forget the recorded build of `prompt_file`."""
+        with self._lock:
+            if self.entries.pop(self._key(prompt_file), None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest atomically if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": self.version, "entries": self.entries}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def config_hash(*parts: Optional[str]) -> str:
+    """Hash the configuration parts that affect a prompt's build outputs."""
+    return hashlib.sha256("\0".join(part or "" for part in parts).encode()).hexdigest()
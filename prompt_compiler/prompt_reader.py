@@ -1,6 +1,5 @@
 from pathlib import Path
 from typing import Dict, Any
-import yaml
 
 
 class PromptReader:
@@ -14,6 +13,8 @@ class PromptReader:
         Returns:
             Dictionary containing parsed prompt data
         """
+        import yaml
+
         with open(prompt_file, "r", encoding="utf-8") as f:
             content = f.read()
 
@@ -0,0 +1,369 @@
+import hmac
+import json
+import os
+import secrets
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from .compiler import Compiler
+from .exceptions import PromptCompilerError, ValidationError
+from .prompt_reader import PromptReader
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TOKEN_FILENAME = "server.token"
+
+# Host header values accepted besides the address the server listens on;
+# anything else, e.g. a rebound DNS name, is refused
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+# Exceptions re-raised by the client with their own type
+_ERROR_TYPES = {"ValidationError": ValidationError}
+
+
+class CompileServer(ThreadingHTTPServer):
+    """
+    HTTP server compiling prompts with one long-lived Compiler.
+
+    Every client shares the compiler's adapter and its connection pool, the
+    in-memory cache, the rate limiters and the table of generations in
+    flight, so concurrent clients compiling the same prompt wait for one AI
+    call and stay within one rate limit.
+
+    Endpoints, all exchanging JSON:
+
+    - `GET /health`: `{"status": "ok"}`
+    - `GET /context`: `{"digest": ...}`, the compiler's context digest
+    - `GET /stats`: cache statistics
+    - `POST /generate` `{"prompt", "force", "stream"}`: first compile stage,
+      returns `{"result": code_result}`; with "stream", returns JSON lines
+      `{"code": chunk}` and `{"restart": true}` followed by the result
+    - `POST /complete` `{"prompt", "force", "module_name"}`: second compile
+      stage for code generated by `/generate`, returns `{"result": result}`
+
+    Every request except `/health` needs an `Authorization: Bearer <token>`
+    header with the server's token, POST requests need a JSON content type,
+    and the Host header must name a local address. Browsers cannot send such
+    requests across origins, so web pages cannot spend API credit or run
+    validation checks on the server. `/complete` only validates the code the
+    server generated and cached for the prompt, never code sent by clients.
+
+    Failures are returned as `{"error": message, "type": exception name}`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        compiler: Compiler,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        token: Optional[str] = None,
+    ):
+        """
+        Initialize compile server.
+
+        Args:
+            compiler: Compiler serving all requests
+            host: Address to listen on; keep it local
+            port: Port to listen on, 0 for any free port
+            token: Token clients must send (default: a new random token)
+        """
+        self.compiler = compiler
+        self.token = token or secrets.token_urlsafe(32)
+        self.allowed_hosts = LOCAL_HOSTS | {host}
+        super().__init__((host, port), _CompileHandler)
+
+    @property
+    def url(self) -> str:
+        """Base URL clients connect to."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def generate(
+        self,
+        request: Dict[str, Any],
+        on_code: Optional[Callable[[str], None]] = None,
+        on_restart: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """Run the first compile stage for a request."""
+        _, code_result = self.compiler.generate_code(
+            Path(request.get("name", "prompt")),
+            force_rebuild=request.get("force", False),
+            on_code=on_code,
+            on_restart=on_restart,
+            prompt_data=request["prompt"],
+        )
+        return code_result
+
+    def complete(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the second compile stage for a request.
+
+        The code is looked up in the cache by the prompt's cache key, where
+        `/generate` stored it; it is generated again if it was evicted.
+        """
+        prompt_data = request["prompt"]
+        code_result = self.compiler.code_generator.generate_result(prompt_data)
+        return self.compiler.complete(
+            prompt_data,
+            code_result,
+            force_rebuild=request.get("force", False),
+            module_name=request.get("module_name"),
+        )
+
+
+class _CompileHandler(BaseHTTPRequestHandler):
+    server: CompileServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _refuse(self) -> bool:
+        """Answer requests that may not be served; return whether refused."""
+        host = urlsplit(f"//{self.headers.get('Host', '')}").hostname
+        if host not in self.server.allowed_hosts:
+            status, message = 403, "Host not allowed"
+        elif self.path == "/health":
+            return False
+        elif not hmac.compare_digest(
+            self.headers.get("Authorization", ""), f"Bearer {self.server.token}"
+        ):
+            status, message = 401, "Missing or invalid server token"
+        elif self.command == "POST" and (
+            self.headers.get_content_type() != "application/json"
+        ):
+            status, message = 415, "Requests must be application/json"
+        else:
+            return False
+        # The request body is not read, so the connection cannot be reused
+        self.close_connection = True
+        self._send_json(status, {"error": message})
+        return True
+
+    def do_GET(self) -> None:
+        if self._refuse():
+            return
+        compiler = self.server.compiler
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/context":
+            self._send_json(200, {"digest": compiler.context_digest()})
+        elif self.path == "/stats":
+            self._send_json(200, compiler.code_generator.cache_manager.stats())
+        else:
+            self._send_json(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self._refuse():
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        if self.path == "/generate" and request.get("stream"):
+            self._stream_generate(request)
+            return
+        if self.path == "/generate":
+            handler = self.server.generate
+        elif self.path == "/complete":
+            handler = self.server.complete
+        else:
+            self._send_json(404, {"error": f"Not found: {self.path}"})
+            return
+        try:
+            self._send_json(200, {"result": handler(request)})
+        except Exception as e:
+            self._send_json(_status_for(e), _error_body(e))
+
+    def _stream_generate(self, request: Dict[str, Any]) -> None:
+        """Send code chunks as JSON lines while generating."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_line(message: Dict[str, Any]) -> None:
+            data = json.dumps(message).encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        try:
+            result = self.server.generate(
+                request,
+                on_code=lambda chunk: send_line({"code": chunk}),
+                on_restart=lambda: send_line({"restart": True}),
+            )
+            send_line({"result": result})
+        except Exception as e:
+            send_line(_error_body(e))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def write_token_file(path: Path, token: str) -> None:
+    """Write a server token to a file only the current user can read."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as token_file:
+        token_file.write(token)
+
+
+def read_token_file(path: Path) -> Optional[str]:
+    """Read a server token written by `write_token_file`, if there is one."""
+    try:
+        return path.read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _status_for(error: Exception) -> int:
+    return 422 if isinstance(error, PromptCompilerError) else 500
+
+
+def _error_body(error: Exception) -> Dict[str, Any]:
+    return {"error": str(error), "type": type(error).__name__}
+
+
+class CompileClient:
+    """
+    Compile prompts on a CompileServer.
+
+    Offers the two compile stages of Compiler, so the CLI runs the same
+    pipeline locally or against a server. Prompt files are read by the
+    client and sent to the server, which never touches the client's files.
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 600.0):
+        """
+        Initialize compile client.
+
+        Args:
+            url: Base URL of the server, e.g. "http://127.0.0.1:8765"
+            token: The server's token
+            timeout: Seconds to wait for a response
+        """
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.prompt_reader = PromptReader()
+
+    def _request(self, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a request and return the open response."""
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = Request(self.url + path, data=data, headers=headers)
+        try:
+            return urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            with e:
+                _raise_error(json.load(e))
+        except URLError as e:
+            raise PromptCompilerError(
+                f"Cannot reach compile server at {self.url}: {e.reason}"
+            ) from None
+
+    def _call(self, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        with self._request(path, body) as response:
+            return json.load(response)
+
+    def context_digest(self) -> str:
+        """The server compiler's context digest."""
+        return self._call("/context")["digest"]
+
+    def stats(self) -> Dict[str, Any]:
+        """The server's cache statistics."""
+        return self._call("/stats")
+
+    def generate_code(
+        self,
+        prompt_file: Path,
+        force_rebuild: bool = False,
+        on_code: Optional[Callable[[str], None]] = None,
+        on_restart: Optional[Callable[[], None]] = None,
+        prompt_data: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Read a prompt file and generate its code on the server.
+
+        See Compiler.generate_code.
+        """
+        if prompt_data is None:
+            prompt_data = self.prompt_reader.read(prompt_file)
+        request = {
+            "name": prompt_file.name,
+            "prompt": prompt_data,
+            "force": force_rebuild,
+            "stream": on_code is not None,
+        }
+        if on_code is None:
+            return prompt_data, self._call("/generate", request)["result"]
+
+        with self._request("/generate", request) as response:
+            for message in _json_lines(response):
+                if "code" in message:
+                    on_code(message["code"])
+                elif "restart" in message:
+                    if on_restart is not None:
+                        on_restart()
+                elif "result" in message:
+                    return prompt_data, message["result"]
+                else:
+                    _raise_error(message)
+        raise PromptCompilerError("Compile server closed the stream early")
+
+    def complete(
+        self,
+        prompt_data: Dict[str, Any],
+        code_result: Dict[str, Any],
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate code and generate its tests on the server.
+
+        The server validates the code it generated for `prompt_data`, which
+        `code_result` must come from. See Compiler.complete.
+        """
+        result = self._call(
+            "/complete",
+            {"prompt": prompt_data, "force": force_rebuild, "module_name": module_name},
+        )["result"]
+        # The server looks the code up in its cache; count the retries made
+        # generating it
+        result["retries"] += code_result.get("retries", 0)
+        return result
+
+    def close(self) -> None:
+        """Nothing to release; the server keeps running."""
+        pass
+
+
+def _json_lines(response: Any) -> Iterator[Dict[str, Any]]:
+    for line in response:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _raise_error(body: Dict[str, Any]) -> None:
+    error_type = _ERROR_TYPES.get(body.get("type"), PromptCompilerError)
+    raise error_type(body.get("error", "Compile server error"))
@@ -0,0 +1,15 @@
+"""Prompt templates for code and test generation."""
+
+from .base_template import BaseTemplate, compile_template
+from .code_template import CodeGenerationTemplate
+from .file_template import FileTemplate, TemplateLoader
+from .test_template import TestGenerationTemplate
+
+__all__ = [
+    "BaseTemplate",
+    "CodeGenerationTemplate",
+    "FileTemplate",
+    "TemplateLoader",
+    "TestGenerationTemplate",
+    "compile_template",
+]
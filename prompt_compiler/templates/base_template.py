@@ -1,13 +1,65 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-from jinja2 import Environment, BaseLoader
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+
+# Environment shared by all string templates, created on first render so
+# runs served from the cache never import jinja2
+_environment: Optional["Environment"] = None
+
+# Compiled templates by source, shared process-wide
+_compiled: Dict[str, "Template"] = {}
+_compiled_lock = threading.Lock()
+
+
+def get_environment() -> "Environment":
+    """Get the Jinja environment shared by all string templates."""
+    global _environment
+    if _environment is None:
+        with _compiled_lock:
+            if _environment is None:
+                from jinja2 import BaseLoader, Environment
+
+                _environment = Environment(loader=BaseLoader())
+    return _environment
+
+
+def compile_template(source: str) -> "Template":
+    """
+    Get the compiled template for a template source string.
+
+    Each distinct source is parsed and compiled once per process.
+
+    Args:
+        source: Jinja template source
+
+    Returns:
+        Compiled template
+    """
+    template = _compiled.get(source)
+    if template is None:
+        environment = get_environment()
+        with _compiled_lock:
+            template = _compiled.get(source)
+            if template is None:
+                template = _compiled[source] = environment.from_string(source)
+    return template
+
+
+class _SharedEnvironment:
+    """Class attribute resolving to the shared environment on access."""
+
+    def __get__(self, instance: Any, owner: type) -> "Environment":
+        return get_environment()
 
 
 class BaseTemplate(ABC):
     """Base class for prompt templates."""
 
-    def __init__(self):
-        self.env = Environment(loader=BaseLoader())
+    # Shared environment, kept for templates that use it directly
+    env = _SharedEnvironment()
 
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -21,5 +73,4 @@ class BaseTemplate(ABC):
 
     def render(self, context: Dict[str, Any]) -> str:
         """Render the template with given context."""
-        template = self.env.from_string(self.get_template())
-        return template.render(**context)
+        return compile_template(self.get_template()).render(**context)
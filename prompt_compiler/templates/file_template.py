@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from ..exceptions import PromptCompilerError
+from .base_template import BaseTemplate
+
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+
+class TemplateLoader:
+    """
+    Load prompt templates from a directory.
+
+    Compiled templates are kept in memory by the loader's environment and,
+    with a bytecode cache directory, on disk, so later runs skip compiling
+    unchanged template files.
+    """
+
+    def __init__(self, template_dir: Path, bytecode_cache_dir: Optional[Path] = None):
+        """
+        Initialize template loader.
+
+        Args:
+            template_dir: Directory containing template files
+            bytecode_cache_dir: Directory for compiled template bytecode
+                (optional)
+        """
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+        bytecode_cache = None
+        if bytecode_cache_dir is not None:
+            bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+        self.template_dir = template_dir
+        self.env = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            bytecode_cache=bytecode_cache,
+        )
+
+    def load(self, name: str, system_prompt: str) -> "FileTemplate":
+        """
+        Load a template file.
+
+        Args:
+            name: Template file name, relative to the template directory
+            system_prompt: System prompt to use with the template
+
+        Returns:
+            Template rendering the file
+
+        Raises:
+            PromptCompilerError: If the template file does not exist
+        """
+        from jinja2 import TemplateNotFound
+
+        try:
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            template = self.env.get_template(name)
+        except TemplateNotFound:
+            raise PromptCompilerError(
+                f"Template not found: {self.template_dir / name}"
+            ) from None
+        return FileTemplate(template, source, system_prompt)
+
+
+class FileTemplate(BaseTemplate):
+    """Prompt template loaded from a file by a TemplateLoader."""
+
+    def __init__(self, template: "Template", source: str, system_prompt: str):
+        """
+        Initialize file template.
+
+        Args:
+            template: Compiled Jinja template
+            source: Template source, used to key cached responses
+            system_prompt: System prompt for the AI model
+        """
+        self.template = template
+        self.source = source
+        self.system_prompt = system_prompt
+
+    def get_system_prompt(self) -> str:
+        return self.system_prompt
+
+    def get_template(self) -> str:
+        return self.source
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """Render the template with given context."""
+        return self.template.render(**context)
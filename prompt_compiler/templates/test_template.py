@@ -31,6 +31,9 @@ class TestGenerationTemplate(BaseTemplate):
         {% endif %}
         
         Framework: {{ framework|default('pytest') }}
+        {% if code_file %}
+        The code is saved as `{{ code_file }}`; import it from there.
+        {% endif %}
         
         Please provide comprehensive test cases with appropriate assertions and error cases.
         """
@@ -1,13 +1,155 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .ai_adapters import AiAdapter
+from .code_generator import CodeGenerator
+from .formatters import ResponseProcessor
+from .instrumentation import instrumentation
+from .languages import get_language
+from .templates import BaseTemplate, TestGenerationTemplate
+from .utils.cache_manager import CacheManager
+from .utils.retry import RetryPolicy
+from .utils.scheduler import TokenEstimator
+
+
 class TestGenerator:
-    def generate(self, code: str) -> str:
+    """Generate tests for generated code with the code generation stack."""
+
+    # Not a pytest test class despite the name
+    __test__ = False
+
+    def __init__(
+        self,
+        ai_adapter: AiAdapter,
+        cache_dir: Optional[Path] = None,
+        template: Optional[BaseTemplate] = None,
+        formatter: Optional[ResponseProcessor] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache_manager: Optional[CacheManager] = None,
+        generation_params: Optional[Dict[str, Any]] = None,
+        token_estimator: Optional[TokenEstimator] = None,
+    ):
+        """
+        Initialize TestGenerator with an AI adapter.
+
+        Args:
+            ai_adapter: AI adapter instance to use for test generation
+            cache_dir: Directory for caching responses (optional)
+            template: Template for test generation (optional)
+            formatter: Response formatter (optional)
+            retry_policy: Retry policy for AI adapter calls (optional)
+            cache_manager: Cache manager, overrides cache_dir (optional)
+            generation_params: AI adapter parameters such as temperature and
+                max_tokens (optional)
+            token_estimator: Token estimator used to estimate the tokens of
+                requests (default: heuristic token counts)
+        """
+        self.code_generator = CodeGenerator(
+            ai_adapter,
+            cache_dir=cache_dir,
+            template=template or TestGenerationTemplate(),
+            formatter=formatter,
+            retry_policy=retry_policy,
+            cache_manager=cache_manager,
+            generation_params=generation_params,
+            token_estimator=token_estimator,
+        )
+
+    def context_digest(self) -> str:
+        """Digest of the model, template and formatter settings used for tests."""
+        return self.code_generator.context_digest()
+
+    @staticmethod
+    def _test_prompt_data(
+        code: str, prompt_data: Optional[Dict[str, Any]], module_name: Optional[str]
+    ) -> Dict[str, Any]:
+        """Prompt data for the test template: the code and its original prompt."""
+        test_prompt_data = {
+            key: value
+            for key, value in (prompt_data or {}).items()
+            # Required elements apply to the code, not to its tests
+            if key != "required_elements"
+        }
+        test_prompt_data["code"] = code
+        language = get_language(test_prompt_data.get("language"))
+        if language.test_framework and not test_prompt_data.get("framework"):
+            test_prompt_data["framework"] = language.test_framework
+        if module_name is not None:
+            test_prompt_data["code_file"] = f"{module_name}{language.extension}"
+        return test_prompt_data
+
+    def generate(
+        self,
+        code: str,
+        prompt_data: Optional[Dict[str, Any]] = None,
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> str:
         """
         Generate test code for the given code.
 
         Args:
             code: Generated source code
+            prompt_data: Prompt data the code was generated from (optional)
+            force_rebuild: If True, ignore cache and generate new tests
+            module_name: Module the tests should import the code from
+                (optional)
 
         Returns:
             Generated test code as string
         """
-        # TODO: Implement test generation logic
-        raise NotImplementedError("Test generation not implemented yet")
+        return self.generate_result(code, prompt_data, force_rebuild, module_name)[
+            "code"
+        ]
+
+    def generate_result(
+        self,
+        code: str,
+        prompt_data: Optional[Dict[str, Any]] = None,
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate test code and report how it was obtained.
+
+        Args:
+            code: Generated source code
+            prompt_data: Prompt data the code was generated from (optional)
+            force_rebuild: If True, ignore cache and generate new tests
+            module_name: Module the tests should import the code from
+                (optional)
+
+        Returns:
+            Dictionary with the generated test "code", whether it was
+            "cached" and the number of "retries" made against the AI adapter
+        """
+        with instrumentation.span("generate_tests"):
+            return self.code_generator.generate_result(
+                self._test_prompt_data(code, prompt_data, module_name), force_rebuild
+            )
+
+    async def agenerate_result(
+        self,
+        code: str,
+        prompt_data: Optional[Dict[str, Any]] = None,
+        force_rebuild: bool = False,
+        module_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously generate test code and report how it was obtained.
+
+        Args:
+            code: Generated source code
+            prompt_data: Prompt data the code was generated from (optional)
+            force_rebuild: If True, ignore cache and generate new tests
+            module_name: Module the tests should import the code from
+                (optional)
+
+        Returns:
+            Dictionary with the generated test "code", whether it was
+            "cached" and the number of "retries" made against the AI adapter
+        """
+        with instrumentation.span("generate_tests"):
+            return await self.code_generator.agenerate_result(
+                self._test_prompt_data(code, prompt_data, module_name), force_rebuild
+            )
@@ -0,0 +1,485 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..exceptions import CacheError
+
+# (response, created_at as a UNIX timestamp)
+CacheEntry = Tuple[str, float]
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Entry files are named after their SHA-256 key; other JSON files in the
+# cache directory (build manifest, batch state) are left alone
+JSON_ENTRY_PATTERN = "[0-9a-f]" * 64 + ".json"
+
+
+def _check_policy(policy: str) -> None:
+    if policy not in EVICTION_POLICIES:
+        raise CacheError(f"Unknown eviction policy: {policy}")
+
+
+class CacheBackend(ABC):
+    """Base class for cache storage backends."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get the entry stored under `key`, if any."""
+        pass
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """Get the entries stored under `keys`, omitting missing ones."""
+        entries = {}
+        for key in keys:
+            entry = self.get(key)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    @abstractmethod
+    def set(self, key: str, response: str, created_at: Optional[float] = None) -> None:
+        """Store `response` under `key`."""
+        pass
+
+    def set_many(self, entries: Iterable[Tuple[str, str, float]]) -> None:
+        """Store several `(key, response, created_at)` entries."""
+        for key, response, created_at in entries:
+            self.set(key, response, created_at)
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under `key`, if any."""
+        pass
+
+    def record_hit(self, key: str) -> None:
+        """Record a cache hit for `key`, updating its access time and count."""
+        pass
+
+    def record_hits(self, hits: Dict[str, int]) -> None:
+        """Record several cache hits, given as a mapping of key to hit count."""
+        for key in hits:
+            self.record_hit(key)
+
+    def record_miss(self) -> None:
+        """Record a cache miss."""
+        pass
+
+    def flush(self) -> None:
+        """Write statistics the backend buffers, if any."""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with "entries", "bytes", "hits" and "misses"
+        """
+        pass
+
+    @abstractmethod
+    def evict(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+    ) -> int:
+        """
+        Remove expired entries, then evict entries until within limits.
+
+        Args:
+            ttl: Maximum entry age in seconds (optional)
+            max_entries: Maximum number of entries to keep (optional)
+            max_bytes: Maximum total response size to keep (optional)
+            policy: "lru" evicts least recently used entries first, "lfu"
+                least frequently used ones
+
+        Returns:
+            Number of entries removed
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> int:
+        """Remove all entries and statistics; return the number of entries removed."""
+        pass
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+        pass
+
+
+class JsonFileCacheBackend(CacheBackend):
+    """Legacy backend storing one JSON file per entry."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        cache_file = self._path(key)
+        if not cache_file.exists():
+            return None
+        return read_json_entry(cache_file)
+
+    def set(self, key: str, response: str, created_at: Optional[float] = None) -> None:
+        cache_data = {
+            "timestamp": datetime.fromtimestamp(created_at or time.time()).isoformat(),
+            "response": response,
+        }
+        with open(self._path(key), "w") as f:
+            json.dump(cache_data, f, indent=2)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def record_hit(self, key: str) -> None:
+        # The file's access time doubles as the LRU timestamp
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _files(self) -> List[Tuple[Path, os.stat_result]]:
+        files = []
+        for cache_file in self.cache_dir.glob(JSON_ENTRY_PATTERN):
+            try:
+                files.append((cache_file, cache_file.stat()))
+            except OSError:
+                continue
+        return files
+
+    def stats(self) -> Dict[str, Any]:
+        files = self._files()
+        return {
+            "entries": len(files),
+            "bytes": sum(stat.st_size for _, stat in files),
+            "hits": 0,
+            "misses": 0,
+        }
+
+    def evict(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+    ) -> int:
+        _check_policy(policy)
+        now = time.time()
+        # Access counts are not tracked by this backend; LFU degrades to LRU
+        files = sorted(self._files(), key=lambda item: item[1].st_mtime)
+        keep = []
+        removed = 0
+        for cache_file, stat in files:
+            entry = read_json_entry(cache_file) if ttl is not None else None
+            if ttl is not None and (entry is None or now - entry[1] > ttl):
+                cache_file.unlink(missing_ok=True)
+                removed += 1
+            else:
+                keep.append((cache_file, stat))
+
+        remaining = len(keep)
+        total_bytes = sum(stat.st_size for _, stat in keep)
+        for cache_file, stat in keep:
+            if (max_entries is None or remaining <= max_entries) and (
+                max_bytes is None or total_bytes <= max_bytes
+            ):
+                break
+            cache_file.unlink(missing_ok=True)
+            remaining -= 1
+            total_bytes -= stat.st_size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        files = self._files()
+        for cache_file, _ in files:
+            cache_file.unlink(missing_ok=True)
+        return len(files)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Single-file cache backend using SQLite in WAL mode.
+
+    Each thread gets its own connection; WAL lets readers proceed while
+    another thread or process writes. Hit and miss counts are kept in memory
+    and written in the transaction of the next write, so lookups never
+    write.
+    """
+
+    # Columns added after the initial schema, with their definitions
+    _added_columns = {
+        "last_accessed": "REAL NOT NULL DEFAULT 0",
+        "access_count": "INTEGER NOT NULL DEFAULT 0",
+        "size": "INTEGER NOT NULL DEFAULT 0",
+    }
+
+    def __init__(self, path: Path, timeout: float = 30.0):
+        """
+        Initialize SQLite backend.
+
+        Args:
+            path: Database file path
+            timeout: Seconds to wait for a lock held by another writer
+        """
+        self.path = path
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Connections of all threads, closed together by close()
+        self._connections: List[sqlite3.Connection] = []
+        # Hit counts and last hit times by key, and misses, not yet written
+        self._pending_hits: Dict[str, Tuple[int, float]] = {}
+        self._pending_misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            for name, definition in self._added_columns.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE entries ADD COLUMN {name} {definition}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_accessed"
+                " ON entries (last_accessed)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                # Only this thread uses it, but close() may run in another
+                conn = sqlite3.connect(
+                    self.path, timeout=self.timeout, check_same_thread=False
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error as e:
+                raise CacheError(f"Failed to open cache database {self.path}: {e}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = (
+            self._connect()
+            .execute("SELECT response, created_at FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return (row[0], row[1]) if row else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        keys = list(keys)
+        entries = {}
+        conn = self._connect()
+        # Stay well below SQLite's bound parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT key, response, created_at FROM entries"
+                f" WHERE key IN ({placeholders})",
+                chunk,
+            )
+            for key, response, created_at in rows:
+                entries[key] = (response, created_at)
+        return entries
+
+    def set(self, key: str, response: str, created_at: Optional[float] = None) -> None:
+        self.set_many([(key, response, created_at or time.time())])
+
+    def set_many(self, entries: Iterable[Tuple[str, str, float]]) -> None:
+        with self._connect() as conn:
+            self._write_counters(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries"
+                " (key, response, created_at, last_accessed, access_count, size)"
+                " VALUES (?, ?, ?, ?, 0, ?)",
+                (
+                    (key, response, created_at, created_at, len(response.encode()))
+                    for key, response, created_at in entries
+                ),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _increment(self, conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def _write_counters(self, conn: sqlite3.Connection) -> None:
+        """Write the pending hit and miss counts in the transaction of `conn`."""
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, {}
+            misses, self._pending_misses = self._pending_misses, 0
+        if hits:
+            conn.executemany(
+                "UPDATE entries SET last_accessed = ?,"
+                " access_count = access_count + ? WHERE key = ?",
+                ((hit_at, count, key) for key, (count, hit_at) in hits.items()),
+            )
+            self._increment(conn, "hits", sum(count for count, _ in hits.values()))
+        if misses:
+            self._increment(conn, "misses", misses)
+
+    def record_hit(self, key: str) -> None:
+        self.record_hits({key: 1})
+
+    def record_hits(self, hits: Dict[str, int]) -> None:
+        now = time.time()
+        with self._lock:
+            for key, count in hits.items():
+                pending = self._pending_hits.get(key, (0, now))[0]
+                self._pending_hits[key] = (pending + count, now)
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self._pending_misses += 1
+
+    def flush(self) -> None:
+        if self._pending_hits or self._pending_misses:
+            with self._connect() as conn:
+                self._write_counters(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        conn = self._connect()
+        entries, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def evict(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+    ) -> int:
+        _check_policy(policy)
+        order = (
+            "last_accessed, key"
+            if policy == "lru"
+            else "access_count, last_accessed, key"
+        )
+        removed = 0
+        with self._connect() as conn:
+            # Eviction order depends on the access times of pending hits
+            self._write_counters(conn)
+            if ttl is not None:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE created_at < ?", (time.time() - ttl,)
+                ).rowcount
+
+            if max_entries is None and max_bytes is None:
+                return removed
+
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            victims = []
+            for key, size in conn.execute(
+                f"SELECT key, size FROM entries ORDER BY {order}"
+            ):
+                if (max_entries is None or entries <= max_entries) and (
+                    max_bytes is None or total_bytes <= max_bytes
+                ):
+                    break
+                victims.append((key,))
+                entries -= 1
+                total_bytes -= size
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            removed += len(victims)
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            self._pending_hits.clear()
+            self._pending_misses = 0
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM entries").rowcount
+            conn.execute("DELETE FROM counters")
+        conn.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            connections, self._connections = self._connections, []
+            # Threads using the backend again open new connections
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+def read_json_entry(cache_file: Path) -> Optional[CacheEntry]:
+    """Read a legacy one-file-per-entry JSON cache file."""
+    try:
+        with open(cache_file, "r") as f:
+            cache_data = json.load(f)
+        created_at = datetime.fromisoformat(cache_data["timestamp"]).timestamp()
+        return cache_data["response"], created_at
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def iter_json_entries(cache_dir: Path) -> Iterator[Tuple[Path, Optional[CacheEntry]]]:
+    """Yield legacy JSON cache files in `cache_dir` with their parsed entries."""
+    for cache_file in cache_dir.glob(JSON_ENTRY_PATTERN):
+        yield cache_file, read_json_entry(cache_file)
+
+
+def create_cache_backend(name: str, cache_dir: Path) -> CacheBackend:
+    """
+    Create a cache backend by name.
+
+    Args:
+        name: "sqlite" (default) or "json"
+        cache_dir: Cache directory
+
+    Returns:
+        Cache backend instance
+    """
+    if name == "sqlite":
+        return SQLiteCacheBackend(cache_dir / "cache.db")
+    if name == "json":
+        return JsonFileCacheBackend(cache_dir)
+    raise CacheError(f"Unknown cache backend: {name}")
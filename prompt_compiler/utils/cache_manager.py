@@ -1,54 +1,255 @@
-import json
-import hashlib
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from datetime import timedelta
+
+from .cache_backends import (
+    CacheBackend,
+    JsonFileCacheBackend,
+    SQLiteCacheBackend,
+    iter_json_entries,
+)
+from .hashing import combine_hashes, content_hash
+from .memory_cache import MemoryCache
 
 
 class CacheManager:
     """Manages caching of AI responses."""
 
-    def __init__(self, cache_dir: Path):
+    # Number of writes between automatic evictions
+    gc_interval = 100
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        backend: Optional[CacheBackend] = None,
+        ttl: Optional[timedelta] = timedelta(hours=24),
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        eviction_policy: str = "lru",
+        memory_max_entries: int = 1000,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        Initialize cache manager.
+
+        Args:
+            cache_dir: Cache directory
+            backend: Storage backend (default: SQLite database in cache_dir)
+            ttl: Maximum age of a cached response, None to never expire
+            max_entries: Maximum number of cached responses (optional)
+            max_bytes: Maximum total size of cached responses (optional)
+            eviction_policy: "lru" or "lfu", used when a limit is exceeded
+            memory_max_entries: Entries kept in the in-process memory tier
+                (0 disables it)
+            memory_max_bytes: Maximum size of the in-process memory tier
+        """
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = backend or SQLiteCacheBackend(cache_dir / "cache.db")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self._writes = 0
+        self.memory = MemoryCache(memory_max_entries, memory_max_bytes)
+        # Hits served from memory, recorded on disk in batches
+        self._pending_hits: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+
+        if not isinstance(self.backend, JsonFileCacheBackend):
+            self.migrate_json_entries()
+
+    def make_key(
+        self, prompt_data: Dict[str, Any], context_digest: Optional[str] = None
+    ) -> str:
+        """
+        Derive the cache key for a prompt.
+
+        Args:
+            prompt_data: Dictionary containing parsed prompt data
+            context_digest: Digest of everything else that shapes the response
+                (model, generation parameters, template, formatter), see
+                CodeGenerator.context_digest
+
+        Returns:
+            Hex digest cache key
+        """
+        prompt_digest = content_hash(prompt_data)
+        if context_digest is None:
+            return prompt_digest
+        return combine_hashes(context_digest, prompt_digest)
 
     def _get_cache_key(self, prompt_data: Dict[str, Any]) -> str:
         """Generate a unique cache key for the prompt data."""
-        # Sort dictionary to ensure consistent hashing
-        sorted_data = json.dumps(prompt_data, sort_keys=True)
-        return hashlib.sha256(sorted_data.encode()).hexdigest()
+        return self.make_key(prompt_data)
+
+    def _is_expired(self, created_at: float) -> bool:
+        if self.ttl is None:
+            return False
+        return time.time() - created_at > self.ttl.total_seconds()
+
+    def _get_from_memory(self, cache_key: str) -> Optional[str]:
+        """Serve a hit from the memory tier without touching the backend."""
+        entry = self.memory.get(cache_key)
+        if entry is None:
+            return None
+        if self._is_expired(entry[1]):
+            self.memory.delete(cache_key)
+            return None
+
+        with self._pending_lock:
+            self._pending_hits[cache_key] = self._pending_hits.get(cache_key, 0) + 1
+        return entry[0]
 
     def get_cached_response(self, prompt_data: Dict[str, Any]) -> Optional[str]:
         """Get cached response if it exists and is valid."""
-        cache_key = self._get_cache_key(prompt_data)
-        cache_file = self.cache_dir / f"{cache_key}.json"
+        return self.lookup(self._get_cache_key(prompt_data))
 
-        if not cache_file.exists():
-            return None
+    def lookup(self, cache_key: str, record_miss: bool = True) -> Optional[str]:
+        """
+        Get the cached response stored under a key from `make_key`.
 
-        try:
-            with open(cache_file, "r") as f:
-                cache_data = json.load(f)
+        Args:
+            cache_key: Cache key
+            record_miss: Count a miss in the statistics; False when re-checking
+                a key whose miss was already counted
 
-            # Check if cache is expired (default: 24 hours)
-            cached_time = datetime.fromisoformat(cache_data["timestamp"])
-            if datetime.now() - cached_time > timedelta(hours=24):
-                return None
+        Returns:
+            Cached response, or None if missing or expired
+        """
+        response = self._get_from_memory(cache_key)
+        if response is not None:
+            return response
 
-            return cache_data["response"]
-        except (json.JSONDecodeError, KeyError, ValueError):
+        entry = self.backend.get(cache_key)
+        if entry is None or self._is_expired(entry[1]):
+            if record_miss:
+                self.backend.record_miss()
             return None
 
+        self.backend.record_hit(cache_key)
+        self.memory.set(cache_key, entry[0], entry[1])
+        return entry[0]
+
+    def get_cached_responses(
+        self, prompt_data_list: List[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """Get cached responses for several prompts with a single lookup."""
+        return self.lookup_many(
+            [self._get_cache_key(prompt_data) for prompt_data in prompt_data_list]
+        )
+
+    def lookup_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Get the cached responses stored under several keys at once."""
+        responses = [self._get_from_memory(key) for key in keys]
+        entries = self.backend.get_many(
+            key for key, response in zip(keys, responses) if response is None
+        )
+
+        for i, key in enumerate(keys):
+            if responses[i] is not None:
+                continue
+            entry = entries.get(key)
+            if entry is None or self._is_expired(entry[1]):
+                self.backend.record_miss()
+            else:
+                self.backend.record_hit(key)
+                self.memory.set(key, entry[0], entry[1])
+                responses[i] = entry[0]
+        return responses
+
     def cache_response(self, prompt_data: Dict[str, Any], response: str) -> None:
         """Cache the AI response."""
-        cache_key = self._get_cache_key(prompt_data)
-        cache_file = self.cache_dir / f"{cache_key}.json"
+        self.store(self._get_cache_key(prompt_data), response)
+
+    def store(self, cache_key: str, response: str) -> None:
+        """Cache a response under a key from `make_key`."""
+        created_at = time.time()
+        self.backend.set(cache_key, response, created_at)
+        self.memory.set(cache_key, response, created_at)
+
+        self._writes += 1
+        if self._writes % self.gc_interval == 0:
+            self.gc()
+
+    def delete(self, cache_key: str) -> None:
+        """Remove the response stored under a key from `make_key`."""
+        self.memory.delete(cache_key)
+        self.backend.delete(cache_key)
+
+    def flush(self) -> None:
+        """Write hits served from memory and buffered statistics to the backend."""
+        with self._pending_lock:
+            hits, self._pending_hits = self._pending_hits, {}
+        if hits:
+            self.backend.record_hits(hits)
+        self.backend.flush()
+
+    def close(self) -> None:
+        """Flush pending statistics and release the backend."""
+        self.flush()
+        self.backend.close()
+
+    def gc(self) -> int:
+        """
+        Remove expired entries and evict entries beyond the size limits.
+
+        Returns:
+            Number of entries removed
+        """
+        # Access times from memory hits must be on disk before choosing victims
+        self.flush()
+        removed = self.backend.evict(
+            ttl=self.ttl.total_seconds() if self.ttl is not None else None,
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            policy=self.eviction_policy,
+        )
+        if removed:
+            self.memory.clear()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with "entries", "bytes", "hits", "misses" and "hit_rate"
+        """
+        self.flush()
+        stats = self.backend.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> int:
+        """Remove all cached responses; return the number removed."""
+        with self._pending_lock:
+            self._pending_hits.clear()
+        self.memory.clear()
+        return self.backend.clear()
+
+    def migrate_json_entries(self) -> int:
+        """
+        Import legacy one-file-per-entry JSON cache files into the backend.
+
+        Imported (and unreadable) files are removed afterwards.
+
+        Returns:
+            Number of entries imported
+        """
+        entries = []
+        migrated_files = []
+        for cache_file, entry in iter_json_entries(self.cache_dir):
+            if entry is not None:
+                entries.append((cache_file.stem, entry[0], entry[1]))
+            migrated_files.append(cache_file)
 
-        cache_data = {
-            "timestamp": datetime.now().isoformat(),
-            "prompt_data": prompt_data,
-            "response": response,
-        }
+        if entries:
+            self.backend.set_many(entries)
+        for cache_file in migrated_files:
+            cache_file.unlink(missing_ok=True)
 
-        with open(cache_file, "w") as f:
-            json.dump(cache_data, f, indent=2)
+        return len(entries)
@@ -0,0 +1,45 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Hashable, Tuple
+
+
+def canonical_json(data: Any) -> bytes:
+    """
+    Serialize data into a canonical, compact JSON encoding.
+
+    Keys are sorted and values JSON can't represent (e.g. dates parsed from
+    YAML) fall back to their string form, so equal data always hashes equal.
+    """
+    return json.dumps(
+        data,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8")
+
+
+def content_hash(data: Any) -> str:
+    """SHA-256 hex digest of the canonical encoding of `data`."""
+    return hashlib.sha256(canonical_json(data)).hexdigest()
+
+
+@lru_cache(maxsize=256)
+def context_hash(parts: Tuple[Hashable, ...]) -> str:
+    """
+    Memoized SHA-256 hex digest of a tuple of hashable parts.
+
+    Generation contexts (model, parameters, template source...) repeat for
+    every prompt in a run, so they are hashed once and reused.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def combine_hashes(*digests: str) -> str:
+    """Derive a single digest from several hex digests."""
+    return hashlib.sha256(":".join(digests).encode("ascii")).hexdigest()
@@ -0,0 +1,66 @@
+import bisect
+import threading
+from typing import Dict, List, Optional
+
+# Upper bounds in seconds of the histogram buckets, 25% apart from 10ms to
+# about 15 minutes; slower requests fall in a final, unbounded bucket
+BUCKET_BOUNDS: List[float] = [0.01 * 1.25**i for i in range(52)]
+
+
+class LatencyHistogram:
+    """
+    Histogram of request latencies with 25% wide buckets.
+
+    Recording is O(1) in memory and O(log buckets) in time however many
+    requests are recorded; percentiles are accurate to a bucket's width.
+    """
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of a request."""
+        bucket = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.total += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Latency below which `p` percent of recorded requests finished.
+
+        Args:
+            p: Percentile, between 0 and 100
+
+        Returns:
+            Upper bound of the bucket holding the percentile in seconds, or
+            None if nothing was recorded
+        """
+        with self._lock:
+            if not self.total:
+                return None
+            rank = p / 100 * self.total
+            seen = 0
+            for bucket, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    break
+        if bucket == len(BUCKET_BOUNDS):
+            return float("inf")
+        return BUCKET_BOUNDS[bucket]
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_registry_lock = threading.Lock()
+
+
+def get_latency_histogram(model: str) -> LatencyHistogram:
+    """Get the process-wide latency histogram of requests to `model`."""
+    with _registry_lock:
+        histogram = _histograms.get(model)
+        if histogram is None:
+            histogram = _histograms[model] = LatencyHistogram()
+        return histogram
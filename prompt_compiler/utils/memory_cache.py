@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# (response, created_at as a UNIX timestamp)
+MemoryEntry = Tuple[str, float]
+
+
+class MemoryCache:
+    """Bounded, thread-safe in-process LRU cache of responses."""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize memory cache.
+
+        Args:
+            max_entries: Maximum number of entries to hold
+            max_bytes: Maximum total size of held responses
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[MemoryEntry]:
+        """Get the entry stored under `key`, marking it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key: str, response: str, created_at: float) -> None:
+        """Store `response` under `key`, evicting least recently used entries."""
+        # Character count is a cheap stand-in for the encoded size
+        size = len(response)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+
+            self._entries[key] = (response, created_at, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted[2]
+
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under `key`, if any."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
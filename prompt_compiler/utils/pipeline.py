@@ -0,0 +1,61 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+U = TypeVar("U")
+R = TypeVar("R")
+
+
+def run_pipeline(
+    items: Iterable[T],
+    first: Callable[[T], U],
+    second: Callable[[T, U], R],
+    workers: int = 1,
+    order: Optional[Sequence[int]] = None,
+) -> Iterator[Tuple[Optional[R], Optional[Exception]]]:
+    """
+    Run two stages over items, overlapping the stages of different items.
+
+    Each stage has its own pool of `workers` threads, so while the second
+    stage processes item N the first stage can already process item N+1.
+
+    Args:
+        items: Items to process
+        first: First stage, called with an item
+        second: Second stage, called with an item and its first stage result
+        workers: Number of threads per stage
+        order: Indices of the items in the order to start them (default:
+            input order)
+
+    Returns:
+        Iterator over the second stage result or the exception raised by
+        either stage for each item, in input order
+    """
+    with ThreadPoolExecutor(max_workers=workers) as first_pool, ThreadPoolExecutor(
+        max_workers=workers
+    ) as second_pool:
+        items = list(items)
+        futures: List[Optional[Future]] = [None] * len(items)
+        for index in range(len(items)) if order is None else order:
+            item = items[index]
+            first_future = first_pool.submit(first, item)
+            futures[index] = second_pool.submit(
+                lambda item, future: second(item, future.result()),
+                item,
+                first_future,
+            )
+
+        for future in futures:
+            try:
+                yield future.result(), None
+            except Exception as e:
+                yield None, e
@@ -1,43 +1,231 @@
-from typing import Callable
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
 
-from functools import wraps
-from datetime import datetime, timedelta
 from ..exceptions import RateLimitError
+from ..instrumentation import instrumentation
+
+# Applied to models without an explicit entry in the `rate_limits` config
+DEFAULT_LIMITS: Dict[str, Any] = {"requests_per_minute": 50}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        """
+        Initialize token bucket.
+
+        Args:
+            capacity: Maximum number of tokens the bucket can hold
+            refill_rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the tokens accrued since the last update."""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        """Take `amount` tokens, possibly going into debt."""
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """Return `amount` unused tokens, up to the capacity."""
+        self.tokens = min(self.capacity, self.tokens + amount)
 
 
 class RateLimiter:
-    """Rate limiter for API calls."""
+    """
+    Requests- and tokens-per-minute limiter shared across threads and tasks.
 
-    def __init__(self, calls: int, period: int):
+    Each call reserves its share of both budgets in O(1). When a budget is
+    exhausted the limiter either waits for a slot (the default) or raises
+    `RateLimitError`. Waiting callers reserve their slot before sleeping, so
+    they are served in arrival order.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        block: bool = True,
+        model: str = "unknown",
+    ):
         """
         Initialize rate limiter.
 
         Args:
-            calls: Number of calls allowed
-            period: Time period in seconds
-        """
-        self.calls = calls
-        self.period = period
-        self.timestamps = []
-
-    def __call__(self, func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            now = datetime.now()
-
-            # Remove timestamps older than the period
-            self.timestamps = [
-                ts
-                for ts in self.timestamps
-                if now - ts < timedelta(seconds=self.period)
-            ]
-
-            if len(self.timestamps) >= self.calls:
-                oldest = min(self.timestamps)
-                retry_after = self.period - (now - oldest).seconds
-                raise RateLimitError(model=args[0].model, retry_after=retry_after)
-
-            self.timestamps.append(now)
-            return func(*args, **kwargs)
-
-        return wrapper
+            requests_per_minute: Requests allowed per minute (None for unlimited)
+            tokens_per_minute: Tokens allowed per minute (None for unlimited)
+            block: If True wait for a slot, otherwise raise RateLimitError
+            model: Model name reported in RateLimitError
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.block = block
+        self.model = model
+        self._lock = threading.Lock()
+        self._requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute
+            else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+            if tokens_per_minute
+            else None
+        )
+
+    def _wait_time(self, tokens: int) -> float:
+        """Refill the buckets and return seconds to wait; hold the lock."""
+        now = time.monotonic()
+        wait = 0.0
+        if self._requests:
+            self._requests.refill(now)
+            wait = max(wait, self._requests.wait_time(1))
+        if self._tokens and tokens:
+            self._tokens.refill(now)
+            wait = max(wait, self._tokens.wait_time(tokens))
+        return wait
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """Seconds a request for `tokens` tokens would wait now, without reserving."""
+        with self._lock:
+            return self._wait_time(tokens)
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve one request and `tokens` tokens; return seconds to wait."""
+        with self._lock:
+            wait = self._wait_time(tokens)
+
+            if wait and not self.block:
+                raise RateLimitError(model=self.model, retry_after=math.ceil(wait))
+
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens and tokens:
+                self._tokens.consume(tokens)
+            return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Acquire a request slot, blocking the calling thread if necessary.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Raises:
+            RateLimitError: If the budget is exhausted and blocking is disabled
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            with instrumentation.span("rate_limit_wait", model=self.model):
+                time.sleep(wait)
+
+    def refund(self, tokens: int) -> None:
+        """
+        Return tokens a request reserved but did not use to the token budget.
+
+        Args:
+            tokens: Reserved tokens beyond those the response reports using
+        """
+        if not self._tokens or tokens <= 0:
+            return
+        with self._lock:
+            self._tokens.refill(time.monotonic())
+            self._tokens.refund(tokens)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """
+        Acquire a request slot without blocking the event loop.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Raises:
+            RateLimitError: If the budget is exhausted and blocking is disabled
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            with instrumentation.span("rate_limit_wait", model=self.model):
+                await asyncio.sleep(wait)
+
+
+def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+    """
+    Roughly estimate the tokens a request counts against a TPM budget.
+
+    Providers count a request's full max_tokens when admitting it, so that
+    is reserved; adapters refund what the response did not use.
+
+    Args:
+        prompt: The prompt sent
+        max_tokens: The request's max_tokens
+    """
+    # ~4 characters per token for English text and code
+    return len(prompt) // 4 + 1 + max_tokens
+
+
+_limits: Dict[str, Dict[str, Any]] = {}
+_limiters: Dict[Tuple[str, Optional[str]], RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def configure_rate_limits(limits: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Configure per-model rate limits.
+
+    Args:
+        limits: Mapping of model name (or "default") to a dict with
+            `requests_per_minute`, `tokens_per_minute` and `block` keys,
+            as found under `rate_limits` in prompt-compiler.yaml
+    """
+    with _registry_lock:
+        _limits.clear()
+        _limits.update(limits or {})
+        _limiters.clear()
+
+
+def get_rate_limiter(
+    model: str, key: Optional[str] = None, limits: Optional[Dict[str, Any]] = None
+) -> RateLimiter:
+    """
+    Get the process-wide rate limiter shared by all adapters for `model`.
+
+    Args:
+        model: Model name
+        key: Name of an API key with its own budget for the model (optional)
+        limits: Settings for the key over the model's configured limits;
+            used when the limiter is first created (optional)
+    """
+    with _registry_lock:
+        limiter = _limiters.get((model, key))
+        if limiter is None:
+            settings = dict(DEFAULT_LIMITS)
+            settings.update(_limits.get("default", {}))
+            settings.update(_limits.get(model, {}))
+            settings.update(limits or {})
+            limiter = RateLimiter(
+                requests_per_minute=settings.get("requests_per_minute"),
+                tokens_per_minute=settings.get("tokens_per_minute"),
+                block=settings.get("block", True),
+                model=model,
+            )
+            _limiters[(model, key)] = limiter
+        return limiter
@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Mapping, Optional, Tuple, TypeVar
+
+from ..exceptions import RateLimitError, TransientAIError
+
+T = TypeVar("T")
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Read the delay in seconds from a `Retry-After` style response header."""
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if name == "retry-after-ms" else seconds
+    return None
+
+
+class RetryPolicy:
+    """Retry transient AI adapter errors with exponential backoff and jitter."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: bool = True,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Initialize retry policy.
+
+        Args:
+            max_attempts: Total attempts including the first call
+            base_delay: Backoff delay in seconds before the first retry
+            max_delay: Upper bound for a single backoff delay in seconds
+            jitter: If True, randomize delays ("full jitter")
+            deadline: Total seconds allowed across all attempts (optional)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether an error is worth retrying."""
+        return isinstance(error, (RateLimitError, TransientAIError))
+
+    def compute_delay(self, retry: int, error: Exception) -> float:
+        """
+        Compute the delay before a retry.
+
+        Args:
+            retry: Number of the upcoming retry, starting at 1
+            error: Error raised by the failed attempt
+
+        Returns:
+            Delay in seconds
+        """
+        backoff = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            # The provider knows best; only add a little spread on top
+            return retry_after + (
+                random.uniform(0, self.base_delay) if self.jitter else 0
+            )
+        return backoff
+
+    def _next_delay(
+        self, retry: int, error: Exception, started: float
+    ) -> Optional[float]:
+        """Delay before the next attempt, or None if the error should propagate."""
+        if retry >= self.max_attempts or not self.is_retryable(error):
+            return None
+        delay = self.compute_delay(retry, error)
+        if self.deadline is not None:
+            if time.monotonic() - started + delay > self.deadline:
+                return None
+        return delay
+
+    def call(self, func: Callable[[], T]) -> Tuple[T, int]:
+        """
+        Call `func`, retrying on transient errors.
+
+        Returns:
+            Tuple of the function result and the number of retries made
+        """
+        started = time.monotonic()
+        retry = 0
+        while True:
+            try:
+                return func(), retry
+            except Exception as e:
+                retry += 1
+                delay = self._next_delay(retry, e, started)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def acall(self, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, int]:
+        """
+        Await `func()`, retrying on transient errors.
+
+        Returns:
+            Tuple of the awaited result and the number of retries made
+        """
+        started = time.monotonic()
+        retry = 0
+        while True:
+            try:
+                return await func(), retry
+            except Exception as e:
+                retry += 1
+                delay = self._next_delay(retry, e, started)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
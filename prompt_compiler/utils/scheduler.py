@@ -0,0 +1,122 @@
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..exceptions import PromptCompilerError
+
+# Counts the tokens in a text
+Tokenizer = Callable[[str], int]
+
+TOKENIZERS = ("heuristic", "tiktoken")
+
+# Expected output tokens per token of specification (description,
+# requirements and code template) for code, and per token of code for tests
+CODE_OUTPUT_RATIO = 3.0
+TEST_OUTPUT_RATIO = 2.0
+# Expected output tokens besides those, for imports, docstrings and the like
+BASE_OUTPUT_TOKENS = 300
+
+
+def heuristic_token_count(text: str) -> int:
+    """Roughly count tokens, at ~4 characters per token for text and code."""
+    return len(text) // 4 + 1
+
+
+def load_tokenizer(
+    name: Optional[str] = None, model: Optional[str] = None
+) -> Tokenizer:
+    """
+    Load a tokenizer by name.
+
+    Args:
+        name: One of TOKENIZERS (default: "heuristic")
+        model: Model whose encoding tiktoken should use (optional)
+
+    Returns:
+        Function counting the tokens in a text
+
+    Raises:
+        PromptCompilerError: If the tokenizer is unknown or not installed
+    """
+    if name in (None, "heuristic"):
+        return heuristic_token_count
+    if name != "tiktoken":
+        raise PromptCompilerError(
+            f"Unknown tokenizer: {name} (choose from {', '.join(TOKENIZERS)})"
+        )
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise PromptCompilerError(
+            "The tiktoken tokenizer requires the tiktoken package"
+        ) from e
+    try:
+        encoding = tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenEstimator:
+    """
+    Estimate the tokens of AI requests to order them.
+
+    A request's output is expected to grow with the specification it is
+    given: the description, requirements and code template of a prompt, or
+    the code its tests are written for.
+    """
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None):
+        """
+        Initialize token estimator.
+
+        Args:
+            tokenizer: Function counting the tokens in a text (default:
+                heuristic_token_count)
+        """
+        self.tokenizer = tokenizer or heuristic_token_count
+
+    def count(self, text: Any) -> int:
+        """Count the tokens in a text (0 for empty values)."""
+        return self.tokenizer(str(text)) if text else 0
+
+    def expected_output_tokens(self, prompt_data: Dict[str, Any]) -> int:
+        """
+        Expected tokens of the response to a prompt.
+
+        Args:
+            prompt_data: Prompt data; with "code", the prompt asks for tests
+                of that code
+
+        Returns:
+            Expected output tokens
+        """
+        if prompt_data.get("code"):
+            expected = TEST_OUTPUT_RATIO * self.count(prompt_data["code"])
+        else:
+            specification = sum(
+                self.count(text)
+                for text in (
+                    prompt_data.get("description"),
+                    prompt_data.get("template"),
+                    *(prompt_data.get("requirements") or []),
+                )
+            )
+            expected = CODE_OUTPUT_RATIO * specification
+        return BASE_OUTPUT_TOKENS + math.ceil(expected)
+
+
+def largest_first(costs: Sequence[float]) -> List[int]:
+    """
+    Order jobs longest first.
+
+    Started first, long jobs run alongside the short ones instead of being
+    left to finish alone at the end of a batch, which shortens the batch
+    on a fixed number of workers.
+
+    Args:
+        costs: Expected cost of each job, e.g. its output tokens
+
+    Returns:
+        Job indices in the order to start them; equal costs keep input order
+    """
+    return sorted(range(len(costs)), key=lambda i: -costs[i])
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: coalesce within the process only
+    fcntl = None
+
+T = TypeVar("T")
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared between processes."""
+
+    def __init__(self, path: Path):
+        """
+        Initialize file lock.
+
+        Args:
+            path: Lock file path, created on acquire and removed on release
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        """Block until the lock is held."""
+        if fcntl is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # The previous holder may have removed the file while we waited;
+            # only a lock on the file currently at `path` counts
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    self._fd = fd
+                    return
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def release(self) -> None:
+        """Release the lock and remove the lock file."""
+        if self._fd is None:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Futures of async waiters and the loops they belong to
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    def land(self) -> None:
+        """Wake every waiter."""
+        with self._lock:
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:  # the waiter's loop is closed
+                pass
+
+    async def wait(self) -> None:
+        """
+        Wait for the flight to land without blocking a thread.
+
+        Waiting in an executor thread would hold threads that the leader may
+        need, e.g. when it runs a synchronous adapter in the same executor.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.done.is_set():
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        await waiter
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and share its result or exception. With a lock
+    directory, the function also runs under a per-key file lock, so that at
+    most one process at a time works on a key.
+    """
+
+    def __init__(self, lock_dir: Optional[Path] = None):
+        """
+        Initialize single-flight group.
+
+        Args:
+            lock_dir: Directory for per-key lock files (optional)
+        """
+        self.lock_dir = lock_dir
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[_Flight, bool]:
+        """Get the flight for `key` and whether the caller leads it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            del self._flights[key]
+        flight.land()
+
+    def _file_lock(self, key: str) -> Optional[FileLock]:
+        if self.lock_dir is None:
+            return None
+        return FileLock(self.lock_dir / f"{key}.lock")
+
+    @staticmethod
+    def _shared(flight: _Flight) -> Tuple[Any, bool]:
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    def do(self, key: str, func: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Run `func` unless a call with the same key is already in flight.
+
+        Args:
+            key: Key identifying equivalent calls
+            func: Function to run
+
+        Returns:
+            Tuple of the result and whether it was shared from another call
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            flight.done.wait()
+            return self._shared(flight)
+
+        file_lock = self._file_lock(key)
+        try:
+            if file_lock is not None:
+                file_lock.acquire()
+            try:
+                flight.result = func()
+            finally:
+                if file_lock is not None:
+                    file_lock.release()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+        return flight.result, False
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Asynchronously run `func` unless a call with the same key is in flight.
+
+        Args:
+            key: Key identifying equivalent calls
+            func: Coroutine function to run
+
+        Returns:
+            Tuple of the result and whether it was shared from another call
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            await flight.wait()
+            return self._shared(flight)
+
+        file_lock = self._file_lock(key)
+        try:
+            if file_lock is not None:
+                await asyncio.to_thread(file_lock.acquire)
+            try:
+                flight.result = await func()
+            finally:
+                if file_lock is not None:
+                    file_lock.release()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+        return flight.result, False
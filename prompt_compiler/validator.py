@@ -1,4 +1,305 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .exceptions import ValidationError
+from .instrumentation import instrumentation
+
+# Longest check output kept in a failure message
+MAX_OUTPUT_CHARS = 2000
+
+
+class ValidationCheck(ABC):
+    """Base class for checks run on generated code."""
+
+    # Name used in configuration and failure reports
+    name = "check"
+
+    # Whether the check runs the generated tests (and needs them)
+    needs_tests = False
+
+    # Whether the check is cheap enough to run without a worker process
+    lightweight = False
+
+    def __init__(self, timeout: float = 30.0):
+        """
+        Initialize check.
+
+        Args:
+            timeout: Seconds the check may take before it fails
+        """
+        self.timeout = timeout
+
+    @abstractmethod
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        """
+        Run the check.
+
+        Args:
+            workdir: Directory containing the code as `<module_name>.py`
+                and, for checks that need them, the tests as
+                `test_<module_name>.py`
+            module_name: Module name of the generated code
+
+        Returns:
+            Failure message, or None if the check passed
+        """
+        pass
+
+    def _run_command(self, command: List[str], workdir: Path) -> Optional[str]:
+        """Run a command in `workdir`; return its output if it fails."""
+        env = {**os.environ, "PYTHONPATH": str(workdir), "PYTHONDONTWRITEBYTECODE": "1"}
+        try:
+            completed = subprocess.run(
+                command,
+                cwd=workdir,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return f"timed out after {self.timeout:g}s"
+        if completed.returncode == 0:
+            return None
+        output = (completed.stdout + completed.stderr).strip()
+        return output[-MAX_OUTPUT_CHARS:] or f"exited with {completed.returncode}"
+
+
+class SyntaxCheck(ValidationCheck):
+    """Compile the code to bytecode."""
+
+    name = "syntax"
+    lightweight = True
+
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        path = workdir / f"{module_name}.py"
+        try:
+            compile(path.read_text(encoding="utf-8"), path.name, "exec")
+        except (SyntaxError, ValueError) as e:
+            return f"line {getattr(e, 'lineno', '?')}: {getattr(e, 'msg', e)}"
+        return None
+
+
+class ImportCheck(ValidationCheck):
+    """Import the code in a fresh interpreter."""
+
+    name = "import"
+
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        return self._run_command(
+            [sys.executable, "-c", f"import {module_name}"], workdir
+        )
+
+
+class PytestCheck(ValidationCheck):
+    """Run the generated tests against the code with pytest."""
+
+    name = "pytest"
+    needs_tests = True
+
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        return self._run_command(
+            [
+                sys.executable,
+                "-m",
+                "pytest",
+                "-q",
+                "-x",
+                "-p",
+                "no:cacheprovider",
+                f"test_{module_name}.py",
+            ],
+            workdir,
+        )
+
+
+class LintCheck(ValidationCheck):
+    """Run a linter on the code; skipped if the linter is not installed."""
+
+    name = "lint"
+
+    def __init__(
+        self, timeout: float = 30.0, command: Sequence[str] = ("ruff", "check")
+    ):
+        """
+        Initialize lint check.
+
+        Args:
+            timeout: Seconds the check may take before it fails
+            command: Linter command, run with the code file appended
+        """
+        super().__init__(timeout)
+        self.command = list(command)
+
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        if shutil.which(self.command[0]) is None:
+            return None
+        return self._run_command(self.command + [f"{module_name}.py"], workdir)
+
+
+class CommandCheck(ValidationCheck):
+    """Run a command on the code; skipped if the command is not installed."""
+
+    name = "command"
+
+    def __init__(
+        self, command: Sequence[str], timeout: float = 30.0, name: Optional[str] = None
+    ):
+        """
+        Initialize command check.
+
+        Args:
+            command: Command to run; "{module}" in an argument is replaced
+                by the module name, e.g. ["tsc", "--noEmit", "{module}.ts"]
+            timeout: Seconds the check may take before it fails
+            name: Name used in failure reports (default: the command)
+        """
+        super().__init__(timeout)
+        self.command = list(command)
+        self.name = name or self.command[0]
+
+    def run(self, workdir: Path, module_name: str) -> Optional[str]:
+        if shutil.which(self.command[0]) is None:
+            return None
+        return self._run_command(
+            [arg.format(module=module_name) for arg in self.command], workdir
+        )
+
+
+VALIDATION_CHECKS = {
+    check.name: check for check in (SyntaxCheck, ImportCheck, PytestCheck, LintCheck)
+}
+
+
+def module_name_for(name: str) -> str:
+    """Turn a prompt file stem or prompt name into a valid module name."""
+    module_name = re.sub(r"\W", "_", name).lower() or "generated"
+    if module_name[0].isdigit():
+        module_name = f"_{module_name}"
+    return module_name
+
+
+def run_checks(
+    checks: List[ValidationCheck],
+    code: str,
+    tests: Optional[str],
+    module_name: str,
+    extension: str = ".py",
+    test_filename: str = "test_{name}.py",
+) -> Dict[str, str]:
+    """
+    Run checks on generated code in a scratch directory.
+
+    The code is written as `<module_name><extension>` and the tests as
+    `test_filename` formatted with the module name.
+
+    Returns:
+        Failure message by check name; empty if every check passed
+    """
+    failures = {}
+    with tempfile.TemporaryDirectory(prefix="prompt-compiler-") as tmp:
+        workdir = Path(tmp)
+        (workdir / f"{module_name}{extension}").write_text(code, encoding="utf-8")
+        if tests is not None:
+            (workdir / test_filename.format(name=module_name)).write_text(
+                tests, encoding="utf-8"
+            )
+        for check in checks:
+            failure = check.run(workdir, module_name)
+            if failure is not None:
+                failures[check.name] = failure
+    return failures
+
+
 class Validator:
+    """
+    Validate generated code with a pipeline of checks.
+
+    Checks that only compile the code run in the calling thread; the others
+    run in a shared process pool, so files compiled concurrently are
+    validated in parallel.
+    """
+
+    def __init__(
+        self,
+        checks: Optional[List[ValidationCheck]] = None,
+        max_workers: Optional[int] = None,
+        extension: str = ".py",
+        test_filename: str = "test_{name}.py",
+    ):
+        """
+        Initialize validator.
+
+        Args:
+            checks: Checks to run (default: syntax check only)
+            max_workers: Size of the process pool (default: CPU count)
+            extension: File extension of the code
+            test_filename: Test file name, "{name}" is the module name
+        """
+        self.checks = checks if checks is not None else [SyntaxCheck()]
+        self.max_workers = max_workers
+        self.extension = extension
+        self.test_filename = test_filename
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def code_checks(self) -> List[ValidationCheck]:
+        """Checks that run on the code alone."""
+        return [check for check in self.checks if not check.needs_tests]
+
+    @property
+    def test_checks(self) -> List[ValidationCheck]:
+        """Checks that run the generated tests."""
+        return [check for check in self.checks if check.needs_tests]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def check(
+        self,
+        code: str,
+        tests: Optional[str] = None,
+        module_name: str = "generated",
+        checks: Optional[List[ValidationCheck]] = None,
+    ) -> Dict[str, str]:
+        """
+        Run checks on generated code.
+
+        Args:
+            code: Generated code
+            tests: Generated tests, required by checks that run them
+            module_name: Module name the tests import the code as
+            checks: Checks to run (default: all checks that can run)
+
+        Returns:
+            Failure message by check name; empty if every check passed
+        """
+        if checks is None:
+            checks = self.checks if tests is not None else self.code_checks
+        if not checks:
+            return {}
+        args = (checks, code, tests, module_name, self.extension, self.test_filename)
+        with instrumentation.span(
+            "validate", checks=",".join(check.name for check in checks)
+        ):
+            if all(check.lightweight for check in checks):
+                return run_checks(*args)
+            return self._get_pool().submit(run_checks, *args).result()
+
     def validate(self, code: str) -> None:
         """
         Validate generated code.
@@ -7,7 +308,22 @@ class Validator:
             code: Generated code to validate
 
         Raises:
-            ValueError: If code validation fails
+            ValidationError: If code validation fails
         """
-        # TODO: Implement validation logic
-        pass
+        failures = self.check(code)
+        if failures:
+            raise ValidationError(format_failures(failures))
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+def format_failures(failures: Dict[str, str]) -> str:
+    """Describe check failures in one message."""
+    return "; ".join(
+        f"{name} check failed: {message}" for name, message in failures.items()
+    )
@@ -0,0 +1,119 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import watchfiles
+except ImportError:  # optional native (inotify/FSEvents) backend
+    watchfiles = None
+
+
+class PromptWatcher:
+    """
+    Watch prompt files and directories for changes.
+
+    Uses `watchfiles` (inotify, FSEvents, ...) when it is installed and falls
+    back to polling file stats otherwise. Bursts of edits are debounced into
+    a single batch of changed files.
+    """
+
+    def __init__(
+        self,
+        paths: List[Path],
+        interval: float = 0.2,
+        debounce: float = 0.3,
+        pattern: str = "*.prompt",
+        native: bool = True,
+    ):
+        """
+        Initialize prompt watcher.
+
+        Args:
+            paths: Prompt files and directories to watch
+            interval: Seconds between polls when polling
+            debounce: Seconds without further changes before a batch is emitted
+            pattern: Glob pattern for prompt files inside watched directories
+            native: Use watchfiles if available
+        """
+        self.files = {path.resolve() for path in paths if not path.is_dir()}
+        self.dirs = [path.resolve() for path in paths if path.is_dir()]
+        self.interval = interval
+        self.debounce = debounce
+        self.pattern = pattern
+        self.native = native and watchfiles is not None
+        self._snapshot = self.scan()
+
+    def _matches(self, path: Path) -> bool:
+        if path in self.files:
+            return True
+        return path.match(self.pattern) and any(
+            directory in path.parents for directory in self.dirs
+        )
+
+    def scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Stat every watched prompt file."""
+        candidates = set(self.files)
+        for directory in self.dirs:
+            candidates.update(directory.rglob(self.pattern))
+
+        snapshot = {}
+        for path in candidates:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self) -> Set[Path]:
+        """Return prompt files added or modified since the previous poll."""
+        snapshot = self.scan()
+        changed = {
+            path
+            for path, signature in snapshot.items()
+            if self._snapshot.get(path) != signature
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def changes(self, stop: Optional[threading.Event] = None) -> Iterator[List[Path]]:
+        """
+        Yield debounced batches of changed prompt files until `stop` is set.
+
+        Args:
+            stop: Event that ends the iteration when set (optional)
+        """
+        stop = stop or threading.Event()
+        if self.native:
+            yield from self._native_changes(stop)
+            return
+
+        pending: Set[Path] = set()
+        last_change = 0.0
+        while not stop.is_set():
+            changed = self.poll()
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_change = now
+            elif pending and now - last_change >= self.debounce:
+                yield sorted(pending)
+                pending = set()
+            stop.wait(self.interval)
+
+    def _native_changes(self, stop: threading.Event) -> Iterator[List[Path]]:
+        roots = set(self.dirs) | {path.parent for path in self.files}
+        for batch in watchfiles.watch(
+            *roots,
+            debounce=int(self.debounce * 1000),
+            stop_event=stop,
+        ):
+            changed = {
+                Path(path)
+                for change, path in batch
+                if change != watchfiles.Change.deleted
+            }
+            changed = {path for path in changed if self._matches(path)}
+            if changed:
+                yield sorted(changed)
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from prompt_compiler.ai_adapters import AiAdapter
+
+
+class FakeAdapter(AiAdapter):
+    """In-memory adapter that returns a canned response without network access."""
+
+    def __init__(
+        self, response: str = "```python\ndef hello():\n    return 'Hello'\n```"
+    ):
+        self.model = "fake"
+        self.response = response
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches = {}
+        self.batch_polls = 1
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        self.prompts.append(prompt)
+        return self.response
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self.generate(prompt, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    def stream(self, prompt: str, **kwargs):
+        response = self.generate(prompt, **kwargs)
+        for i in range(0, len(response), 3):
+            yield response[i : i + 3]
+
+    def validate_response(self, response: str) -> bool:
+        return bool(response and response.strip())
+
+    def submit_batch(self, requests):
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = {"requests": requests, "polls": 0}
+        return batch_id
+
+    def batch_status(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] > self.batch_polls:
+            return "completed"
+        return "in_progress"
+
+    def batch_results(self, batch_id):
+        return {
+            request["custom_id"]: self.generate(request["prompt"])
+            for request in self.batches[batch_id]["requests"]
+        }
+
+
+@pytest.fixture
+def fake_adapter():
+    return FakeAdapter()
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters import AdapterPool, ClaudeAdapter, GptAdapter
+from prompt_compiler.ai_adapters import gpt_adapter, http_pool
+from prompt_compiler.code_generator import CodeGenerator
+from prompt_compiler.exceptions import AIAdapterError
+from prompt_compiler.utils.rate_limiter import RateLimiter, configure_rate_limits
+from tests.conftest import FakeAdapter
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        message = SimpleNamespace(content="print('hi')")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeMessages:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        return SimpleNamespace(content=[SimpleNamespace(text="print('hi')")])
+
+
+def test_gpt_agenerate_uses_async_client():
+    adapter = GptAdapter(api_key="test-key")
+    completions = FakeCompletions()
+    adapter._async_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=completions)
+    )
+
+    result = asyncio.run(adapter.agenerate("prompt", system_prompt="system"))
+
+    assert result == "print('hi')"
+    assert completions.calls[0]["messages"][0] == {
+        "role": "system",
+        "content": "system",
+    }
+
+
+def test_claude_agenerate_uses_async_client():
+    adapter = ClaudeAdapter(api_key="test-key")
+    messages = FakeMessages()
+    adapter._async_client = SimpleNamespace(messages=messages)
+
+    result = asyncio.run(adapter.agenerate("prompt", system_prompt="system"))
+
+    assert result == "print('hi')"
+    assert messages.calls[0]["system"] == "system"
+
+
+def test_gpt_batch_round_trip():
+    adapter = GptAdapter(api_key="test-key")
+    uploads = []
+    output = (
+        '{"custom_id": "a", "response": {"status_code": 200, "body": '
+        '{"choices": [{"message": {"content": "print(1)"}}]}}}\n'
+        '{"custom_id": "b", "response": {"status_code": 400, "body": "bad"}}\n'
+    )
+    batch = SimpleNamespace(
+        id="batch_1", status="completed", output_file_id="out", error_file_id=None
+    )
+    adapter._client = SimpleNamespace(
+        files=SimpleNamespace(
+            create=lambda **kwargs: uploads.append(kwargs) or SimpleNamespace(id="in"),
+            content=lambda file_id: SimpleNamespace(text=output),
+        ),
+        batches=SimpleNamespace(
+            create=lambda **kwargs: batch, retrieve=lambda batch_id: batch
+        ),
+    )
+
+    batch_id = adapter.submit_batch([{"custom_id": "a", "prompt": "p"}])
+    results = adapter.batch_results(batch_id)
+
+    assert b'"custom_id": "a"' in uploads[0]["file"][1]
+    assert adapter.batch_status(batch_id) == "completed"
+    assert results["a"] == "print(1)"
+    assert isinstance(results["b"], Exception)
+    # Expired and cancelled batches still have the results they finished
+    for status, expected in [("expired", "ended"), ("cancelling", "in_progress")]:
+        batch.status = status
+        assert adapter.batch_status(batch_id) == expected
+
+
+def test_gpt_client_uses_shared_http_client(monkeypatch):
+    http_client = object()
+    created = []
+    monkeypatch.setattr(gpt_adapter, "get_http_client", lambda: http_client)
+    monkeypatch.setattr(openai, "OpenAI", lambda **kwargs: created.append(kwargs))
+
+    GptAdapter(api_key="key-a", organization="org-a").client
+    GptAdapter(api_key="key-b", base_url="https://proxy.example/v1").client
+
+    assert [kwargs["api_key"] for kwargs in created] == ["key-a", "key-b"]
+    assert all(kwargs["http_client"] is http_client for kwargs in created)
+    assert created[0]["organization"] == "org-a"
+    assert created[1]["base_url"] == "https://proxy.example/v1"
+
+
+class _HttpClient:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_reconfiguring_http_pool_keeps_clients_in_use(monkeypatch):
+    client, async_client = _HttpClient(), _HttpClient()
+    loop = asyncio.new_event_loop()
+    monkeypatch.setattr(http_pool, "_client", client)
+    http_pool._async_clients[loop] = async_client
+
+    # Same settings: the shared clients stay shared
+    http_pool.configure_http_pool(None)
+    assert http_pool._client is client
+
+    # A compiler with other settings gets new clients; the old ones stay
+    # open for the adapters of the earlier compiler
+    http_pool.configure_http_pool({"max_connections": 10})
+    assert http_pool._client is None
+    assert not http_pool._async_clients
+    assert not client.closed and not async_client.closed
+
+    http_pool.close_http_clients()
+    http_pool.configure_http_pool(None)
+    loop.close()
+    assert client.closed and async_client.closed
+
+
+def test_adapter_pool_spreads_requests_across_rate_limits(tmp_path):
+    adapters = [FakeAdapter(response=f"```python\nkey = {i}\n```") for i in range(2)]
+    for adapter in adapters:
+        adapter.rate_limiter = RateLimiter(requests_per_minute=1)
+    pool = AdapterPool(adapters)
+
+    first = pool.select("prompt")
+    first.rate_limiter.acquire()
+    other = pool.select("prompt")
+    # The other adapter has room, whichever is next in turn
+    assert other is not first
+    assert pool.select("prompt") is other
+    assert pool.generate("prompt") == other.response
+
+    # With both spent, the adapter whose budget frees up first is chosen
+    other.rate_limiter.acquire()
+    other.rate_limiter._requests.tokens -= 5
+    assert pool.select("prompt") is first
+    # Pooling keys does not change what responses are cached under
+    assert CodeGenerator(pool, cache_dir=tmp_path).context_digest() == (
+        CodeGenerator(adapters[0], cache_dir=tmp_path).context_digest()
+    )
+
+
+def test_api_keys_get_own_rate_limits():
+    args = argparse.Namespace(api_key=None, model="gpt", model_name=None)
+    config = {
+        "api_keys": [
+            "key-a",
+            {
+                "key": "key-b",
+                "organization": "org-b",
+                "rate_limits": {"requests_per_minute": 5},
+            },
+        ]
+    }
+    configure_rate_limits({"gpt-4": {"requests_per_minute": 500}})
+    try:
+        pool = cli.setup_adapter(args, config)
+        single = cli.setup_adapter(
+            argparse.Namespace(**{**vars(args), "api_key": "k"}), config
+        )
+    finally:
+        configure_rate_limits({})
+
+    assert isinstance(pool, AdapterPool)
+    a, b = pool.adapters
+    assert (a.api_key, b.api_key, b.organization) == ("key-a", "key-b", "org-b")
+    assert a.rate_limiter.requests_per_minute == 500
+    assert b.rate_limiter.requests_per_minute == 5
+    assert isinstance(single, GptAdapter) and single.api_key == "k"
+
+
+def test_claude_batch_requires_message_batches_api():
+    adapter = ClaudeAdapter(api_key="test-key")
+    # SDK releases before Message Batches have no messages.batches resource
+    adapter._client = SimpleNamespace(messages=SimpleNamespace(create=None))
+
+    with pytest.raises(AIAdapterError, match="no Message Batches API"):
+        adapter.submit_batch([{"custom_id": "a", "prompt": "p"}])
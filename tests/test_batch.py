@@ -0,0 +1,104 @@
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.batch import BatchRunner
+from prompt_compiler.compiler import Compiler
+
+
+def _write_prompts(tmp_path, names):
+    files = []
+    for name in names:
+        prompt_file = tmp_path / f"{name}.prompt"
+        prompt_file.write_text(f"name: {name}\ndescription: Say hello\n")
+        files.append(prompt_file)
+    return files
+
+
+def _runner(adapter, tmp_path):
+    compiler = Compiler(adapter, cache_dir=tmp_path / ".cache")
+    compiler.complete = lambda prompt_data, code_result, **kwargs: {
+        "code": code_result["code"],
+        "tests": "",
+        "retries": code_result["retries"],
+    }
+    return BatchRunner(
+        compiler, tmp_path / ".cache" / "batch_state.json", sleep=lambda s: None
+    )
+
+
+def test_batch_submits_uncached_prompts_once(fake_adapter, tmp_path):
+    files = _write_prompts(tmp_path, ["a", "b", "c"])
+    runner = _runner(fake_adapter, tmp_path)
+    runner.compiler.compile = None  # batch mode must not compile one by one
+
+    outcomes = runner.run(files)
+
+    assert [error for _, error in outcomes] == [None, None, None]
+    assert all("def hello" in result["code"] for result, _ in outcomes)
+    assert len(fake_adapter.batches) == 1
+    assert len(fake_adapter.batches["batch_0"]["requests"]) == 3
+    assert not runner.state_path.exists()
+
+    # Everything is cached now: nothing is submitted again
+    runner.run(files)
+    assert len(fake_adapter.batches) == 1
+
+
+def test_batch_resumes_after_interruption(fake_adapter, tmp_path):
+    files = _write_prompts(tmp_path, ["a", "b"])
+    runner = _runner(fake_adapter, tmp_path)
+
+    def interrupted(batch_id):
+        raise KeyboardInterrupt
+
+    runner._wait = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(files)
+    assert runner.state_path.exists()
+
+    resumed = _runner(fake_adapter, tmp_path)
+    outcomes = resumed.run(files)
+
+    assert [error for _, error in outcomes] == [None, None]
+    assert list(fake_adapter.batches) == ["batch_0"]
+    assert not resumed.state_path.exists()
+
+
+def test_failed_batch_is_reported_and_resubmitted(fake_adapter, tmp_path):
+    files = _write_prompts(tmp_path, ["a", "b"])
+    runner = _runner(fake_adapter, tmp_path)
+    fake_adapter.batch_status = lambda batch_id: "failed"
+
+    outcomes = runner.run(files)
+
+    assert [error for _, error in outcomes] == ["Batch batch_0 failed"] * 2
+    assert not runner.state_path.exists()
+
+    # The next run submits the prompts again instead of waiting on the
+    # failed batch
+    del fake_adapter.batch_status
+    outcomes = _runner(fake_adapter, tmp_path).run(files)
+    assert [error for _, error in outcomes] == [None, None]
+    assert list(fake_adapter.batches) == ["batch_0", "batch_1"]
+
+
+def test_ended_batch_keeps_finished_responses(fake_adapter, tmp_path):
+    files = _write_prompts(tmp_path, ["a", "b"])
+    runner = _runner(fake_adapter, tmp_path)
+    fake_adapter.batch_status = lambda batch_id: "ended"
+    batch_results = fake_adapter.batch_results
+    fake_adapter.batch_results = lambda batch_id: dict(
+        list(batch_results(batch_id).items())[:1]
+    )
+
+    outcomes = runner.run(files)
+
+    assert outcomes[0][1] is None and "def hello" in outcomes[0][0]["code"]
+    assert outcomes[1] == (None, "No response received from batch")
+    assert not runner.state_path.exists()
+
+
+def test_cli_rejects_batch_with_stream(tmp_path, capsys):
+    files = [str(f) for f in _write_prompts(tmp_path, ["a"])]
+    assert cli.main(files + ["--batch", "--stream"]) == 1
+    assert "--batch" in capsys.readouterr().err
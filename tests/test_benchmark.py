@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters import SimulatedAdapter
+from prompt_compiler.benchmark import latency_summary, run_benchmark
+from prompt_compiler.exceptions import RateLimitError, TransientAIError
+from prompt_compiler.utils.rate_limiter import RateLimiter
+
+
+def test_simulated_adapter_injects_errors():
+    adapter = SimulatedAdapter(
+        error_rate=0.3, rate_limit_rate=0.3, seed=1, rate_limiter=RateLimiter()
+    )
+    outcomes = []
+    for _ in range(200):
+        try:
+            outcomes.append(type(adapter.generate("prompt")))
+        except (RateLimitError, TransientAIError) as e:
+            outcomes.append(type(e))
+
+    assert adapter.calls == 200
+    for kind in (str, RateLimitError, TransientAIError):
+        assert 30 < outcomes.count(kind) < 90
+
+
+def test_simulated_adapter_response_size():
+    adapter = SimulatedAdapter(response_lines=50, rate_limiter=RateLimiter())
+
+    assert len(adapter.generate("prompt").splitlines()) == 52
+    assert "".join(adapter.stream("prompt")) == adapter.generate("prompt")
+    with pytest.raises(ValueError):
+        SimulatedAdapter(distribution="normal")
+
+
+def test_latency_summary():
+    summary = latency_summary([i / 1000 for i in range(1, 101)])
+
+    assert summary["p50"] == pytest.approx(51)
+    assert summary["p99"] == pytest.approx(100)
+    assert summary["max"] == pytest.approx(100)
+
+
+def test_benchmark_compiles_cold_and_warm():
+    results = run_benchmark(
+        files=10,
+        jobs=2,
+        error_rate=0.2,
+        seed=3,
+        config={"retry": {"max_attempts": 20, "base_delay": 0}},
+        startup_runs=1,
+    )
+
+    assert results["cold"]["errors"] == 0
+    assert results["cold"]["retries"] > 0
+    assert results["cold"]["ai_calls"] == 20 + results["cold"]["retries"]
+    assert results["warm"]["ai_calls"] == 0
+    assert results["cache"]["entries"] == 20
+    assert results["formatter_ms"] > 0
+    assert results["startup_ms"] > 0
+
+
+def test_bench_command_saves_results(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    argv = ["bench", "--files", "5", "--no-tests", "--startup-runs", "0"]
+
+    assert cli.main([*argv, "-o", str(output)]) == 0
+
+    assert "Cold:" in capsys.readouterr().out
+    results = json.loads(output.read_text())
+    assert results["parameters"]["files"] == 5
+    assert results["cold"]["ai_calls"] == 5
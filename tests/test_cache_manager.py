@@ -0,0 +1,156 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from prompt_compiler.utils.cache_backends import (
+    JsonFileCacheBackend,
+    SQLiteCacheBackend,
+)
+from prompt_compiler.utils.cache_manager import CacheManager
+
+
+def test_round_trip_and_bulk_lookup(tmp_path):
+    cache = CacheManager(tmp_path)
+    prompts = [{"name": f"P{i}"} for i in range(3)]
+    cache.cache_response(prompts[0], "code 0")
+    cache.cache_response(prompts[2], "code 2")
+
+    assert cache.get_cached_response(prompts[0]) == "code 0"
+    assert cache.get_cached_responses(prompts) == ["code 0", None, "code 2"]
+    assert (tmp_path / "cache.db").exists()
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = CacheManager(tmp_path)
+    key = cache._get_cache_key({"name": "P"})
+    old = (datetime.now() - timedelta(hours=25)).timestamp()
+    cache.backend.set(key, "stale", old)
+
+    assert cache.get_cached_response({"name": "P"}) is None
+
+
+def test_legacy_json_entries_are_migrated(tmp_path):
+    legacy = CacheManager(tmp_path, backend=JsonFileCacheBackend(tmp_path))
+    legacy.cache_response({"name": "P"}, "legacy code")
+    (tmp_path / f"{'0' * 64}.json").write_text("{not json")
+    (tmp_path / "manifest.json").write_text("{}")
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+    cache = CacheManager(tmp_path)
+
+    assert cache.get_cached_response({"name": "P"}) == "legacy code"
+    assert [f.name for f in tmp_path.glob("*.json")] == ["manifest.json"]
+
+
+def test_concurrent_writers_and_readers(tmp_path):
+    cache = CacheManager(tmp_path)
+    other_process = CacheManager(tmp_path)
+
+    def work(i):
+        manager = cache if i % 2 else other_process
+        manager.cache_response({"name": i}, f"code {i}")
+        return manager.get_cached_response({"name": i})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(work, range(100)))
+
+    assert results == [f"code {i}" for i in range(100)]
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = CacheManager(tmp_path, ttl=None, max_entries=2)
+    for i in range(3):
+        cache.backend.set(cache._get_cache_key({"name": i}), f"code {i}", 1000.0 + i)
+    cache.get_cached_response({"name": 0})
+
+    assert cache.gc() == 1
+    assert cache.get_cached_responses([{"name": i} for i in range(3)]) == [
+        "code 0",
+        None,
+        "code 2",
+    ]
+
+
+def test_lfu_eviction_and_byte_limit(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=10, eviction_policy="lfu")
+    for i in range(3):
+        cache.cache_response({"name": i}, "x" * 5)
+    for _ in range(2):
+        cache.get_cached_response({"name": 1})
+    cache.get_cached_response({"name": 2})
+
+    assert cache.gc() == 1
+    assert cache.get_cached_response({"name": 0}) is None
+    assert cache.stats()["bytes"] == 10
+
+
+def test_stats_and_clear(tmp_path):
+    cache = CacheManager(tmp_path)
+    cache.cache_response({"name": "P"}, "code")
+    cache.get_cached_response({"name": "P"})
+    cache.get_cached_response({"name": "Q"})
+    cache.flush()
+
+    stats = CacheManager(tmp_path).stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 4
+    assert stats["hit_rate"] == 0.5
+
+    assert cache.clear() == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_sqlite_backend_buffers_counters_until_a_write(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db")
+    backend.set("a", "code")
+    backend.record_miss()
+    backend.record_hit("a")
+    other_process = SQLiteCacheBackend(tmp_path / "cache.db")
+    assert other_process.stats()["misses"] == 0
+
+    backend.set("b", "code")
+
+    assert other_process.stats()["hits"] == 1
+    assert other_process.stats()["misses"] == 1
+    backend.record_miss()
+    backend.close()
+    assert other_process.stats()["misses"] == 2
+
+
+def test_sqlite_backend_closes_connections_of_all_threads(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(backend.get, ["a", "b", "c", "d"]))
+    connections = list(backend._connections)
+    assert len(connections) > 1
+
+    backend.close()
+
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # The backend opens new connections when used again
+    assert backend.get("a") is None
+
+
+def test_memory_tier_serves_hits_without_backend(tmp_path):
+    cache = CacheManager(tmp_path, memory_max_entries=1)
+    cache.cache_response({"name": "P"}, "code")
+    cache.backend.get = None  # any backend read would now fail
+
+    assert cache.get_cached_response({"name": "P"}) == "code"
+    assert cache._pending_hits == {cache._get_cache_key({"name": "P"}): 1}
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = CacheManager(tmp_path, memory_max_entries=2, memory_max_bytes=8)
+    for i in range(3):
+        cache.cache_response({"name": i}, "abc")
+
+    assert len(cache.memory) == 2
+    cache.cache_response({"name": "big"}, "x" * 9)
+    assert cache.memory.bytes <= 8
+    assert cache.get_cached_response({"name": "big"}) == "x" * 9
@@ -0,0 +1,155 @@
+import threading
+import time
+
+from prompt_compiler import cli
+
+from .conftest import FakeAdapter
+
+
+class SlowCompiler:
+    """Compiler stand-in whose latency is inversely proportional to input order."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.compiled = []
+
+    def generate_code(self, prompt_file, force_rebuild=False):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.05 / (int(prompt_file.stem[1:]) + 1))
+            if prompt_file.stem in self.fail:
+                raise ValueError("boom")
+            self.compiled.append(prompt_file.stem)
+            return {}, {"code": f"# {prompt_file.stem}", "retries": 0}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def complete(self, prompt_data, code_result, force_rebuild=False, module_name=None):
+        return {**code_result, "tests": ""}
+
+    def context_digest(self):
+        return "digest"
+
+    def close(self):
+        pass
+
+
+def _write_prompts(tmp_path, count):
+    files = []
+    for i in range(count):
+        prompt_file = tmp_path / f"p{i}.prompt"
+        prompt_file.write_text("name: P\n")
+        files.append(str(prompt_file))
+    return files
+
+
+def test_parallel_jobs_report_in_input_order(tmp_path, monkeypatch, capsys):
+    compiler = SlowCompiler(fail={"p2"})
+    monkeypatch.setattr(cli, "setup_compiler", lambda args, config: compiler)
+    files = _write_prompts(tmp_path, 6)
+
+    exit_code = cli.main(files + ["-o", str(tmp_path / "out"), "--jobs", "4"])
+
+    captured = capsys.readouterr()
+    assert exit_code == 0
+    assert compiler.max_active > 1
+    assert captured.out.splitlines() == [
+        f"Successfully compiled {f}" for f in files if not f.endswith("p2.prompt")
+    ]
+    assert f"Error compiling {files[2]}: boom" in captured.err
+    assert (tmp_path / "out" / "src" / "p5.py").read_text() == "# p5"
+
+
+def test_jobs_must_be_positive(tmp_path, capsys):
+    files = _write_prompts(tmp_path, 1)
+    assert cli.main(files + ["--jobs", "0"]) == 1
+    assert "--jobs" in capsys.readouterr().err
+
+
+def test_cache_subcommand(tmp_path, capsys):
+    cache_dir = tmp_path / ".cache"
+    cache_args = ["--cache-dir", str(cache_dir), "-c", str(tmp_path / "none.yaml")]
+    cache = cli.setup_cache_manager(
+        cli.create_cache_parser().parse_args(["stats"] + cache_args), {}
+    )
+    cache.cache_response({"name": "P"}, "code")
+    cache.get_cached_response({"name": "P"})
+    cache.close()
+
+    assert cli.main(["cache", "stats"] + cache_args) == 0
+    assert "Hit rate: 100.0%" in capsys.readouterr().out
+
+    assert cli.main(["cache", "clear"] + cache_args) == 0
+    assert "Cleared 1 cache entries" in capsys.readouterr().out
+
+
+def test_incremental_build_skips_unchanged_prompts(tmp_path, monkeypatch, capsys):
+    compiler = SlowCompiler()
+    monkeypatch.setattr(cli, "setup_compiler", lambda args, config: compiler)
+    files = _write_prompts(tmp_path, 3)
+    out = tmp_path / "out"
+    argv = files + ["-o", str(out), "--cache-dir", str(tmp_path / ".cache")]
+
+    assert cli.main(argv + ["--incremental"]) == 0
+    assert sorted(compiler.compiled) == ["p0", "p1", "p2"]
+
+    # Rewritten with identical contents, edited, and output deleted
+    (tmp_path / "p0.prompt").write_text("name: P\n")
+    (tmp_path / "p1.prompt").write_text("name: Changed\n")
+    (out / "tests" / "test_p2.py").unlink()
+    compiler.compiled.clear()
+    capsys.readouterr()
+
+    assert cli.main(argv + ["--incremental"]) == 0
+    assert sorted(compiler.compiled) == ["p1", "p2"]
+    assert f"Up to date: {files[0]}" in capsys.readouterr().out
+
+    compiler.compiled.clear()
+    assert cli.main(argv + ["--incremental", "--force"]) == 0
+    assert len(compiler.compiled) == 3
+
+
+def test_incremental_build_through_real_compiler(tmp_path, monkeypatch, capsys):
+    # The manifest lives in the cache directory, next to what the cache
+    # manager sets up, so use the real setup_compiler
+    adapter = FakeAdapter()
+    monkeypatch.setattr(cli, "setup_adapter", lambda args, config: adapter)
+    files = _write_prompts(tmp_path, 2)
+    cache_dir = tmp_path / ".cache"
+    argv = files + ["-o", str(tmp_path / "out"), "--cache-dir", str(cache_dir)]
+    argv += ["--incremental", "--no-tests"]
+
+    assert cli.main(argv) == 0
+    assert (cache_dir / "manifest.json").exists()
+    requests = len(adapter.prompts)
+    capsys.readouterr()
+
+    assert cli.main(argv) == 0
+    assert (cache_dir / "manifest.json").exists()
+    assert len(adapter.prompts) == requests
+    out = capsys.readouterr().out
+    assert all(f"Up to date: {f}" in out for f in files)
+
+
+def test_output_files_are_named_after_the_module(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "setup_adapter", lambda args, config: FakeAdapter())
+    prompt_file = tmp_path / "my-util.prompt"
+    prompt_file.write_text("name: Util\n")
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("{}\n")
+    out = tmp_path / "out"
+    argv = [str(prompt_file), "-o", str(out), "-c", str(config_file)]
+    argv += ["--cache-dir", str(tmp_path / ".cache")]
+
+    for extra in ([], ["--stream"]):
+        assert cli.main(argv + extra) == 0
+        assert sorted(p.relative_to(out).as_posix() for p in out.rglob("*.py")) == [
+            "src/my_util.py",
+            "tests/test_my_util.py",
+        ]
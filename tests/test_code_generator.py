@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_compiler.ai_adapters import AiAdapter
+from prompt_compiler.code_generator import CodeGenerator
+from prompt_compiler.templates import CodeGenerationTemplate
+
+from .conftest import FakeAdapter
+
+
+def test_agenerate_runs_prompts_concurrently(fake_adapter, tmp_path):
+    generator = CodeGenerator(fake_adapter, cache_dir=tmp_path)
+    prompts = [{"name": f"P{i}", "description": "d"} for i in range(20)]
+
+    async def run():
+        return await asyncio.gather(*(generator.agenerate(p) for p in prompts))
+
+    results = asyncio.run(run())
+
+    assert results == ["def hello():\n    return 'Hello'"] * 20
+    assert fake_adapter.max_in_flight == 20
+
+
+def test_agenerate_falls_back_to_sync_generate(tmp_path):
+    class SyncOnlyAdapter(FakeAdapter):
+        agenerate = AiAdapter.agenerate
+
+    adapter = SyncOnlyAdapter()
+    generator = CodeGenerator(adapter, cache_dir=tmp_path)
+
+    code = asyncio.run(generator.agenerate({"name": "P", "description": "d"}))
+
+    assert code == "def hello():\n    return 'Hello'"
+    assert len(adapter.prompts) == 1
+
+    # Second call is served from cache
+    asyncio.run(generator.agenerate({"name": "P", "description": "d"}))
+    assert len(adapter.prompts) == 1
+
+
+def test_cache_key_covers_generation_context(tmp_path):
+    prompt = {"name": "P", "description": "d"}
+    generator = CodeGenerator(FakeAdapter(), cache_dir=tmp_path)
+    key = generator.cache_key(prompt)
+
+    assert CodeGenerator(FakeAdapter(), cache_dir=tmp_path).cache_key(prompt) == key
+
+    other_model = FakeAdapter()
+    other_model.model = "other"
+    assert CodeGenerator(other_model, cache_dir=tmp_path).cache_key(prompt) != key
+
+    hotter = CodeGenerator(
+        FakeAdapter(), cache_dir=tmp_path, generation_params={"temperature": 1.0}
+    )
+    assert hotter.cache_key(prompt) != key
+
+    class EditedTemplate(CodeGenerationTemplate):
+        def get_template(self):
+            return super().get_template() + "\nBe concise."
+
+    edited = CodeGenerator(FakeAdapter(), cache_dir=tmp_path, template=EditedTemplate())
+    assert edited.cache_key(prompt) != key
+
+
+def test_cache_key_accepts_list_generation_params(tmp_path):
+    prompt = {"name": "P", "description": "d"}
+
+    def key(stop):
+        generator = CodeGenerator(
+            FakeAdapter(), cache_dir=tmp_path, generation_params={"stop": stop}
+        )
+        return generator.cache_key(prompt)
+
+    assert key(["```"]) == key(["```"])
+    assert key(["```"]) != key(["```", "END"])
+
+
+def test_model_switch_does_not_return_stale_code(tmp_path):
+    prompt = {"name": "P", "description": "d"}
+    CodeGenerator(FakeAdapter(), cache_dir=tmp_path).generate(prompt)
+
+    other_model = FakeAdapter("```python\nx = 1\n```")
+    other_model.model = "other"
+
+    assert CodeGenerator(other_model, cache_dir=tmp_path).generate(prompt) == "x = 1"
+
+
+def test_generate_stream_emits_code_before_caching(fake_adapter, tmp_path):
+    generator = CodeGenerator(fake_adapter, cache_dir=tmp_path)
+    prompt = {"name": "P", "description": "d"}
+    streamed = []
+
+    def on_code(code):
+        streamed.append(code)
+        assert generator.cache_manager.lookup(generator.cache_key(prompt)) is None
+
+    result = generator.generate_stream(prompt, on_code)
+
+    assert "".join(streamed) == "def hello():\n    return 'Hello'\n"
+    assert result["code"] == "def hello():\n    return 'Hello'"
+    assert generator.generate(prompt) == result["code"]
+    assert len(fake_adapter.prompts) == 1
+
+
+class SlowAdapter(FakeAdapter):
+    def generate(self, prompt: str, **kwargs) -> str:
+        time.sleep(0.05)
+        return super().generate(prompt, **kwargs)
+
+
+def test_identical_concurrent_generations_are_coalesced(tmp_path):
+    adapter = SlowAdapter()
+    generator = CodeGenerator(adapter, cache_dir=tmp_path)
+    prompt = {"name": "Common", "description": "shared utility"}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: generator.generate_result(prompt), range(8))
+        )
+
+    assert len(adapter.prompts) == 1
+    assert {result["code"] for result in results} == {
+        "def hello():\n    return 'Hello'"
+    }
+    assert sum(not result.get("coalesced") for result in results) >= 1
+
+
+def test_coalesced_async_waiters_do_not_hold_executor_threads(tmp_path):
+    # Sync-only adapters generate in the default executor, which waiters
+    # for the same prompt must leave free
+    class SyncOnlyAdapter(SlowAdapter):
+        agenerate = AiAdapter.agenerate
+
+    adapter = SyncOnlyAdapter()
+    generator = CodeGenerator(adapter, cache_dir=tmp_path)
+    prompt = {"name": "Common", "description": "shared utility"}
+
+    async def run():
+        return await asyncio.gather(*(generator.agenerate(prompt) for _ in range(16)))
+
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=2))
+    try:
+        results = loop.run_until_complete(asyncio.wait_for(run(), timeout=5))
+    finally:
+        loop.close()
+
+    assert len(adapter.prompts) == 1
+    assert results == ["def hello():\n    return 'Hello'"] * 16
+
+
+def test_generations_are_coalesced_across_processes(tmp_path):
+    # Separate generators share only the cache directory, like two processes
+    adapter = SlowAdapter()
+    generators = [CodeGenerator(adapter, cache_dir=tmp_path) for _ in range(4)]
+    prompt = {"name": "Common", "description": "shared utility"}
+    barrier = threading.Barrier(len(generators))
+
+    def run(generator):
+        barrier.wait()
+        return generator.generate_result(prompt)
+
+    with ThreadPoolExecutor(max_workers=len(generators)) as executor:
+        results = list(executor.map(run, generators))
+
+    assert len(adapter.prompts) == 1
+    assert sum(result["cached"] for result in results) == len(generators) - 1
+    assert not list((tmp_path / "locks").iterdir())
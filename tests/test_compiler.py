@@ -1,14 +1,13 @@
 from pathlib import Path
-import pytest
 from prompt_compiler.compiler import Compiler
 
 
-def test_compiler_initialization():
-    compiler = Compiler()
+def test_compiler_initialization(fake_adapter, tmp_path):
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
     assert compiler is not None
 
 
-def test_compile_example_prompt(tmp_path):
+def test_compile_example_prompt(fake_adapter, tmp_path):
     # Create a temporary prompt file
     prompt_content = """
     name: Test
@@ -21,8 +20,39 @@ def test_compile_example_prompt(tmp_path):
     prompt_file.write_text(prompt_content)
 
     # Compile the prompt
-    compiler = Compiler()
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
     result = compiler.compile(prompt_file)
 
     assert "code" in result
     assert "tests" in result
+    assert result["tests"] == "def hello():\n    return 'Hello'"
+
+
+def test_tests_are_generated_with_test_template_and_cached(fake_adapter, tmp_path):
+    prompt_file = tmp_path / "test.prompt"
+    prompt_file.write_text("name: Test\ndescription: Test prompt\n")
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
+
+    compiler.compile(prompt_file)
+    compiler.compile(prompt_file)
+
+    assert len(fake_adapter.prompts) == 2
+    assert "Generate test cases" in fake_adapter.prompts[1]
+    assert "def hello():" in fake_adapter.prompts[1]
+
+
+def test_compile_without_tests(fake_adapter, tmp_path):
+    prompt_file = tmp_path / "test.prompt"
+    prompt_file.write_text("name: Test\ndescription: Test prompt\n")
+    compiler = Compiler(
+        fake_adapter, cache_dir=tmp_path / ".cache", generate_tests=False
+    )
+
+    result = compiler.compile(prompt_file)
+
+    assert result["tests"] is None
+    assert len(fake_adapter.prompts) == 1
+    assert (
+        compiler.context_digest()
+        != Compiler(fake_adapter, cache_dir=tmp_path / ".cache").context_digest()
+    )
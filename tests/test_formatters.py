@@ -0,0 +1,71 @@
+from prompt_compiler.formatters import PythonFormatter, StreamingCodeExtractor
+
+
+def feed_all(extractor, response, size):
+    code = []
+    for i in range(0, len(response), size):
+        code.append(extractor.feed(response[i : i + size]))
+    code.append(extractor.finish())
+    return code
+
+
+def test_streaming_extractor_releases_complete_lines():
+    extractor = StreamingCodeExtractor()
+    response = "Here you go:\n```python\ndef f():\n    return 1\n```\nEnjoy!"
+
+    pieces = feed_all(extractor, response, 5)
+
+    assert "".join(pieces) == "def f():\n    return 1\n"
+    assert [p for p in pieces if p] == ["def f():\n", "    return 1\n"]
+    assert extractor.response == response
+
+
+def test_streaming_extractor_skips_other_languages_and_falls_back():
+    extractor = StreamingCodeExtractor()
+    assert "".join(feed_all(extractor, "```js\nx\n```\n", 4)) == "```js\nx\n```\n"
+
+    extractor = StreamingCodeExtractor()
+    assert "".join(feed_all(extractor, "print(1)", 3)) == "print(1)"
+
+
+def test_python_formatter_keeps_nesting():
+    response = (
+        "Sure:\n```python\nclass A:\n    def f(self, x):\n        if x:\n"
+        "            return 1\n        return 2   \n\n\n\n\ndef g():\n"
+        "    return A().f(0)\n```\n"
+    )
+
+    code = PythonFormatter().format(response)
+
+    assert code == (
+        "class A:\n    def f(self, x):\n        if x:\n            return 1\n"
+        "        return 2\n\n\ndef g():\n    return A().f(0)"
+    )
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["g"]() == 2
+
+
+def test_python_formatter_picks_block_by_language_tag():
+    response = (
+        "Install it:\n```bash\npip install x\n```\n"
+        "Then:\n  ```py title=x.py\n  x = 1\n  ```\n"
+        "Output:\n```\n1\n```\n"
+    )
+
+    assert PythonFormatter().format(response) == "x = 1"
+    assert PythonFormatter().format("```\ny = 2\n```") == "y = 2"
+
+
+def test_python_formatter_leaves_syntax_errors_to_the_validator():
+    assert PythonFormatter().format("```python\ndef f(:\n```") == "def f(:"
+
+
+def test_python_formatter_handles_large_responses():
+    body = "\n".join(f"def f{i}(x):\n    return x + {i}\n" for i in range(5000))
+    response = "Text ``` inline\n```python\n" + body + "\n```\nDone."
+
+    code = PythonFormatter().format(response)
+
+    assert code.startswith("def f0(x):\n    return x + 0\n\ndef f1")
+    assert code.endswith("return x + 4999")
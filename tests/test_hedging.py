@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters import AiAdapter, HedgedAdapter, SimulatedAdapter
+from prompt_compiler.exceptions import AIAdapterError, TransientAIError
+from prompt_compiler.utils.latency import LatencyHistogram, get_latency_histogram
+from prompt_compiler.utils.rate_limiter import RateLimiter
+
+
+class ScriptedAdapter(AiAdapter):
+    """Adapter answering with its model name after a delay, or raising."""
+
+    def __init__(self, model, delay=0.0, error=None):
+        self.model = model
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    def generate(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.model
+
+    async def agenerate(self, prompt, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.model
+
+    def stream(self, prompt, **kwargs):
+        if self.error:
+            raise self.error
+        yield from self.model
+
+    def validate_response(self, response):
+        return bool(response)
+
+
+def _simulated(model, latency):
+    return SimulatedAdapter(latency=latency, model=model, rate_limiter=RateLimiter())
+
+
+def test_slow_request_is_hedged():
+    slow, fast = _simulated("hedge-slow", 1.0), _simulated("hedge-fast", 0.0)
+    hedged = HedgedAdapter([slow, fast], initial_delay=0.05)
+
+    start = time.monotonic()
+    response = hedged.generate("prompt")
+
+    assert time.monotonic() - start < 0.5
+    assert "def generated_" in response
+    assert (slow.calls, fast.calls) == (1, 1)
+    assert get_latency_histogram("hedge-fast").total == 1
+
+
+def test_losing_request_does_not_delay_exit():
+    script = (
+        "from prompt_compiler.ai_adapters import HedgedAdapter, SimulatedAdapter\n"
+        "from prompt_compiler.utils.rate_limiter import RateLimiter\n"
+        "adapters = [\n"
+        "    SimulatedAdapter(latency=t, model=m, rate_limiter=RateLimiter())\n"
+        "    for m, t in (('exit-slow', 60.0), ('exit-fast', 0.0))\n"
+        "]\n"
+        "HedgedAdapter(adapters, initial_delay=0.05).generate('prompt')\n"
+    )
+
+    # The slow request is still running when the script ends
+    subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).resolve().parents[1],
+        check=True,
+        timeout=30,
+    )
+
+
+def test_async_hedge_cancels_the_loser():
+    slow = ScriptedAdapter("async-slow", delay=2.0)
+    fast = ScriptedAdapter("async-fast", delay=0.01)
+    hedged = HedgedAdapter([slow, fast], initial_delay=0.05)
+
+    assert asyncio.run(hedged.agenerate("prompt")) == "async-fast"
+    assert slow.cancelled
+
+
+def test_hard_errors_fall_back_in_order():
+    rejected = ScriptedAdapter("rejected", error=AIAdapterError("bad key", "rejected"))
+    hedged = HedgedAdapter([rejected, ScriptedAdapter("fallback")])
+
+    assert hedged.generate("prompt") == "fallback"
+    assert asyncio.run(hedged.agenerate("prompt")) == "fallback"
+    assert "".join(hedged.stream("prompt")) == "fallback"
+
+    # Retrying is left to the retry policy for transient errors
+    flaky = ScriptedAdapter("flaky", error=TransientAIError("503", "flaky"))
+    with pytest.raises(TransientAIError):
+        HedgedAdapter([flaky, ScriptedAdapter("unused")]).generate("prompt")
+
+
+def test_hedge_delay_follows_latency_percentile():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) is None
+    for _ in range(95):
+        histogram.record(0.1)
+    for _ in range(5):
+        histogram.record(5.0)
+
+    assert 0.1 <= histogram.percentile(95) < 0.125
+    assert 5.0 <= histogram.percentile(99) < 6.25
+
+    hedged = HedgedAdapter([ScriptedAdapter("percentile-model")], min_samples=10)
+    assert hedged.hedge_delay(hedged.adapters[0]) == hedged.initial_delay
+    for _ in range(10):
+        get_latency_histogram("percentile-model").record(0.5)
+    assert 0.5 <= hedged.hedge_delay(hedged.adapters[0]) < 0.625
+
+
+def test_cli_sets_up_fallback_providers():
+    args = argparse.Namespace(api_key="gpt-key", model="gpt", model_name=None)
+    config = {
+        "hedging": {
+            "percentile": 99,
+            "fallbacks": [
+                {
+                    "model": "claude",
+                    "model_name": "claude-3-haiku-20240307",
+                    "api_key": "claude-key",
+                }
+            ],
+        }
+    }
+
+    adapter = cli.setup_adapter(args, config)
+
+    assert isinstance(adapter, HedgedAdapter)
+    assert [a.model for a in adapter.adapters] == ["gpt-4", "claude-3-haiku-20240307"]
+    assert adapter.adapters[1].api_key == "claude-key"
+    assert adapter.percentile == 99
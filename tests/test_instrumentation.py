@@ -0,0 +1,125 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters import GptAdapter
+from prompt_compiler.compiler import Compiler
+from prompt_compiler.instrumentation import (
+    Instrumentation,
+    JsonLinesExporter,
+    OpenTelemetryExporter,
+    format_summary,
+    instrumentation,
+)
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_instrumentation_records_nothing():
+    disabled = Instrumentation()
+    events = []
+
+    with disabled.span("a"):
+        disabled.count("b")
+        disabled.record_usage("gpt-4", 10, 10)
+
+    assert disabled.span("a") is disabled.span("b")
+    assert disabled.summary() == {"spans": {}, "counters": {}, "usage": {}}
+    disabled.add_hook(events.append)
+    assert disabled.enabled
+
+
+def test_compile_stages_are_timed(fake_adapter, tmp_path, instrumented):
+    prompt_file = tmp_path / "test.prompt"
+    prompt_file.write_text("name: Test\ndescription: Test prompt\n")
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
+
+    compiler.compile(prompt_file)
+    compiler.compile(prompt_file)
+    summary = instrumented.summary()
+
+    for stage in ("read_prompt", "render_template", "ai_request", "format"):
+        assert summary["spans"][stage]["count"] >= 1
+    assert summary["spans"]["generate_tests"]["count"] == 2
+    assert summary["spans"]["ai_request"]["count"] == 2
+    assert summary["counters"]["cache_misses"] == 2
+    assert summary["counters"]["cache_hits"] == 2
+    assert "Cache: 2 hits, 2 misses (50.0% hit rate)" in format_summary(summary)
+
+
+def test_usage_and_cost(instrumented):
+    adapter = GptAdapter(api_key="test-key")
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+    message = SimpleNamespace(content="print('hi')")
+
+    async def create(**params):
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    adapter._async_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    asyncio.run(adapter.agenerate("prompt"))
+    instrumented.record_usage("unknown-model", 1, 1)
+
+    usage = instrumented.summary()["usage"]
+    assert usage["gpt-4"] == {
+        "requests": 1,
+        "input_tokens": 1000,
+        "output_tokens": 500,
+        "cost": pytest.approx(0.06),
+    }
+    assert usage["unknown-model"]["cost"] is None
+
+
+def test_exporters(tmp_path):
+    events = Instrumentation()
+    exporter = JsonLinesExporter(tmp_path / "trace.jsonl")
+    spans = []
+    tracer = SimpleNamespace(
+        start_span=lambda name, start_time, attributes: SimpleNamespace(
+            end=lambda end_time: spans.append((name, end_time - start_time, attributes))
+        )
+    )
+    events.add_hook(exporter)
+    events.add_hook(OpenTelemetryExporter(tracer))
+
+    with events.span("render_template", language="python"):
+        pass
+    events.count("retries", 2)
+    exporter.close()
+
+    lines = [json.loads(line) for line in exporter.path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["render_template", "retries"]
+    assert lines[0]["language"] == "python"
+    assert spans[0][0] == "render_template" and spans[0][1] >= 0
+    assert spans[1] == ("retries", 0, {"value": 2})
+
+
+def test_cli_stats_report(fake_adapter, tmp_path, monkeypatch, capsys):
+    prompt_file = tmp_path / "hello.prompt"
+    prompt_file.write_text("name: Hello\ndescription: Say hello\n")
+    trace_file = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(
+        cli,
+        "setup_compiler",
+        lambda args, config: Compiler(fake_adapter, cache_dir=tmp_path / ".cache"),
+    )
+
+    argv = [str(prompt_file), "-o", str(tmp_path / "out"), "--stats"]
+    assert cli.main(argv + ["--trace-file", str(trace_file)]) == 0
+
+    output = capsys.readouterr().out
+    assert "ai_request" in output
+    assert "write_output" in output
+    assert trace_file.read_text().count("\n") > 5
+    assert not instrumentation.enabled
@@ -0,0 +1,77 @@
+import importlib.metadata
+
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.compiler import Compiler
+from prompt_compiler.exceptions import PromptCompilerError
+from prompt_compiler.formatters import FencedCodeFormatter, PythonFormatter
+from prompt_compiler.languages import (
+    Language,
+    LanguageRegistry,
+    get_language,
+)
+from prompt_compiler.validator import Validator
+
+
+def test_languages_by_name_and_alias():
+    assert get_language(None).name == "python"
+    assert get_language("TS") is get_language("typescript")
+    assert isinstance(get_language("py").formatter(), PythonFormatter)
+    assert isinstance(get_language("go").formatter(), FencedCodeFormatter)
+    assert get_language("go").formatter() is get_language("go").formatter()
+
+
+def test_unknown_language(monkeypatch):
+    monkeypatch.setattr(importlib.metadata, "entry_points", lambda group: [])
+    with pytest.raises(PromptCompilerError, match="Unsupported language: cobol"):
+        LanguageRegistry().get("cobol")
+
+
+def test_languages_from_entry_points(monkeypatch):
+    rust = Language(
+        "rust",
+        ".rs",
+        "{name}_test.rs",
+        lambda language: FencedCodeFormatter(language.tags),
+        lambda language: Validator([]),
+    )
+
+    class EntryPoint:
+        def load(self):
+            return rust
+
+    monkeypatch.setattr(
+        importlib.metadata, "entry_points", lambda group: [EntryPoint()]
+    )
+    registry = LanguageRegistry()
+
+    assert registry.get("rust") is rust
+
+
+def test_fenced_formatter_extracts_tagged_block():
+    formatter = FencedCodeFormatter(["typescript", "ts"])
+    response = "Here:\n```ts\nexport const x = 1;\n```\n```python\nx = 2\n```"
+
+    assert formatter.format(response) == "export const x = 1;"
+
+
+def test_typescript_prompt_writes_typescript_files(fake_adapter, tmp_path):
+    fake_adapter.response = (
+        "```typescript\nexport function hello(): string {\n  return 'Hello';\n}\n```"
+    )
+    prompt_file = tmp_path / "hello.prompt"
+    prompt_file.write_text("name: Hello\ndescription: Say hello\nlanguage: ts\n")
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
+
+    result = compiler.compile(prompt_file)
+    outputs = cli.process_output(result, tmp_path / "out", "split", prompt_file)
+
+    assert result["language"] == "typescript"
+    assert result["code"].startswith("export function hello()")
+    assert "Framework: jest" in fake_adapter.prompts[1]
+    assert "hello.ts" in fake_adapter.prompts[1]
+    assert [path.relative_to(tmp_path / "out").as_posix() for path in outputs] == [
+        "src/hello.ts",
+        "tests/hello.test.ts",
+    ]
@@ -0,0 +1,27 @@
+import threading
+
+from prompt_compiler.utils.pipeline import run_pipeline
+
+
+def test_stages_overlap_and_results_keep_input_order():
+    next_started = threading.Event()
+    overlapped = []
+
+    def first(item):
+        if item == 1:
+            next_started.set()
+        if item == 2:
+            raise ValueError("boom")
+        return item * 10
+
+    def second(item, value):
+        if item == 0:
+            # Item 1's first stage runs while item 0 is in the second stage
+            overlapped.append(next_started.wait(timeout=1))
+        return value + 1
+
+    outcomes = list(run_pipeline(range(4), first, second, workers=1))
+
+    assert overlapped == [True]
+    assert [result for result, _ in outcomes] == [1, 11, None, 31]
+    assert str(outcomes[2][1]) == "boom"
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from prompt_compiler.exceptions import RateLimitError
+from prompt_compiler.utils.rate_limiter import (
+    RateLimiter,
+    configure_rate_limits,
+    get_rate_limiter,
+)
+
+
+def test_non_blocking_limiter_raises_with_retry_after():
+    limiter = RateLimiter(requests_per_minute=2, block=False, model="m")
+    limiter.acquire()
+    limiter.acquire()
+
+    with pytest.raises(RateLimitError) as exc_info:
+        limiter.acquire()
+
+    assert exc_info.value.retry_after == 30
+
+
+def test_blocking_limiter_waits_for_slot_across_threads():
+    # Burst of 2, then one request every 50ms
+    limiter = RateLimiter(requests_per_minute=2, block=True)
+    limiter._requests.refill_rate = 20
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.08)
+
+
+def test_token_budget_waits_in_event_loop():
+    limiter = RateLimiter(tokens_per_minute=100, block=True)
+    limiter._tokens.refill_rate = 1000
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.aacquire(tokens=50) for _ in range(4)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) == pytest.approx(0.1, abs=0.05)
+
+
+def test_refunded_tokens_admit_requests_again():
+    limiter = RateLimiter(tokens_per_minute=1000, block=False)
+    limiter.acquire(tokens=1000)
+    with pytest.raises(RateLimitError):
+        limiter.acquire(tokens=500)
+
+    limiter.refund(800)
+    limiter.acquire(tokens=500)
+    # Refunds never raise the budget over its capacity
+    limiter.refund(5000)
+    assert limiter._tokens.tokens == 1000
+
+
+def test_rate_limiters_are_shared_per_model():
+    configure_rate_limits({"gpt-4": {"requests_per_minute": 500}})
+    try:
+        assert get_rate_limiter("gpt-4") is get_rate_limiter("gpt-4")
+        assert get_rate_limiter("gpt-4").requests_per_minute == 500
+        assert get_rate_limiter("other").requests_per_minute == 50
+    finally:
+        configure_rate_limits({})
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from prompt_compiler.exceptions import (
+    AIAdapterError,
+    RateLimitError,
+    TransientAIError,
+)
+from prompt_compiler.utils.retry import RetryPolicy, parse_retry_after
+
+
+def flaky(errors, result="ok"):
+    """Return a callable raising each of `errors` once, then returning `result`."""
+    errors = list(errors)
+
+    def func():
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return func
+
+
+def test_retries_transient_errors_and_counts_them():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    func = flaky([TransientAIError("503", "m"), RateLimitError("m")])
+
+    assert policy.call(func) == ("ok", 2)
+
+
+def test_fatal_errors_are_not_retried():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.001)
+    func = flaky([AIAdapterError("bad request", "m")])
+
+    with pytest.raises(AIAdapterError):
+        policy.call(func)
+
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=2, base_delay=0.001)
+    func = flaky([TransientAIError("503", "m")] * 2)
+
+    with pytest.raises(TransientAIError):
+        policy.call(func)
+
+
+def test_retry_after_is_honored_within_deadline():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, jitter=False)
+    assert policy.compute_delay(1, RateLimitError("m", retry_after=7)) == 7
+
+    policy.deadline = 1
+    func = flaky([RateLimitError("m", retry_after=7)])
+    with pytest.raises(RateLimitError):
+        policy.call(func)
+
+
+def test_async_retries():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    func = flaky([TransientAIError("timeout", "m")])
+
+    async def call():
+        return func()
+
+    assert asyncio.run(policy.acall(call)) == ("ok", 1)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "3"}) == 3
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert parse_retry_after(None) is None
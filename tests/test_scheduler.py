@@ -0,0 +1,92 @@
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters import SimulatedAdapter
+from prompt_compiler.code_generator import CodeGenerator
+from prompt_compiler.compiler import Compiler
+from prompt_compiler.exceptions import PromptCompilerError
+from prompt_compiler.utils.pipeline import run_pipeline
+from prompt_compiler.utils.rate_limiter import RateLimiter
+from prompt_compiler.utils.scheduler import (
+    TokenEstimator,
+    largest_first,
+    load_tokenizer,
+)
+
+SMALL = {"name": "Add", "description": "Add two numbers"}
+LARGE = {
+    "name": "Parser",
+    "description": "Parse a configuration language " * 40,
+    "requirements": ["Support nested sections " * 10, "Report line numbers " * 10],
+}
+
+
+def test_expected_output_grows_with_specification():
+    estimator = TokenEstimator()
+
+    tests_prompt = {**SMALL, "code": "x = 1\n" * 100}
+    assert estimator.expected_output_tokens(
+        tests_prompt
+    ) > estimator.expected_output_tokens(SMALL)
+    assert estimator.expected_output_tokens(LARGE) > estimator.expected_output_tokens(
+        SMALL
+    )
+
+
+def test_requests_reserve_max_tokens_and_refund_unused(tmp_path):
+    adapter = SimulatedAdapter(
+        rate_limiter=RateLimiter(tokens_per_minute=10000), response_lines=1
+    )
+    generator = CodeGenerator(adapter, cache_dir=tmp_path)
+    reserved = []
+    acquire = adapter.rate_limiter.acquire
+    adapter.rate_limiter.acquire = lambda tokens: (
+        reserved.append(tokens) or acquire(tokens)
+    )
+
+    generator.generate(SMALL)
+
+    # The full max_tokens is reserved, as providers count it, and the part
+    # the response did not use is refunded afterwards
+    assert reserved[0] > 2000
+    used = 10000 - adapter.rate_limiter._tokens.tokens
+    assert used < 500
+
+
+def test_pipeline_starts_items_in_given_order():
+    started = []
+
+    outcomes = run_pipeline(
+        ["a", "b", "c"],
+        lambda item: started.append(item) or item,
+        lambda item, value: value.upper(),
+        order=largest_first([1, 3, 2]),
+    )
+
+    assert [result for result, _ in outcomes] == ["A", "B", "C"]
+    assert started == ["b", "c", "a"]
+
+
+def test_prompt_files_scheduled_largest_first(fake_adapter, tmp_path):
+    small = tmp_path / "small.prompt"
+    small.write_text("name: Add\ndescription: Add two numbers\n")
+    large = tmp_path / "large.prompt"
+    large.write_text(
+        "name: Parser\ndescription: " + "Parse a configuration language " * 20
+    )
+    broken = tmp_path / "broken.prompt"
+    broken.write_text("description: [unclosed\n")
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
+
+    prompt_data, order = cli.schedule_prompt_files(
+        compiler, [small, broken, large], TokenEstimator()
+    )
+
+    assert order == [2, 0, 1]
+    assert set(prompt_data) == {small, large}
+
+
+def test_unknown_tokenizer():
+    assert load_tokenizer("heuristic")("abcdefgh") == 3
+    with pytest.raises(PromptCompilerError, match="Unknown tokenizer"):
+        load_tokenizer("words")
@@ -0,0 +1,172 @@
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from prompt_compiler import cli
+from prompt_compiler.compiler import Compiler
+from prompt_compiler.exceptions import PromptCompilerError, ValidationError
+from prompt_compiler.server import (
+    CompileClient,
+    CompileServer,
+    read_token_file,
+    write_token_file,
+)
+
+
+@pytest.fixture
+def server(fake_adapter, tmp_path):
+    compiler = Compiler(fake_adapter, cache_dir=tmp_path / ".cache")
+    server = CompileServer(compiler, port=0)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    compiler.close()
+
+
+def _client(server):
+    return CompileClient(server.url, server.token)
+
+
+def _post(server, path, body, headers):
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    try:
+        connection.request("POST", path, json.dumps(body), headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def _prompt(tmp_path, name="hello"):
+    prompt_file = tmp_path / f"{name}.prompt"
+    prompt_file.write_text(f"name: {name}\ndescription: Say hello\n")
+    return prompt_file
+
+
+def test_client_runs_both_stages_on_server(server, tmp_path):
+    client = _client(server)
+    prompt_file = _prompt(tmp_path)
+
+    prompt_data, code_result = client.generate_code(prompt_file)
+    result = client.complete(prompt_data, code_result, module_name="hello")
+
+    assert code_result["code"] == "def hello():\n    return 'Hello'"
+    assert result["tests"] == code_result["code"]
+    assert client.context_digest() == server.compiler.context_digest()
+    assert client.stats()["misses"] == 2
+
+
+def test_client_streams_code(server, tmp_path):
+    client = _client(server)
+    chunks = []
+
+    _, code_result = client.generate_code(_prompt(tmp_path), on_code=chunks.append)
+
+    assert len(chunks) > 1
+    assert code_result["code"] == "def hello():\n    return 'Hello'"
+
+
+def test_concurrent_clients_share_generations(server, fake_adapter, tmp_path):
+    prompt_file = _prompt(tmp_path)
+    started = threading.Event()
+    release = threading.Event()
+    generate = fake_adapter.generate
+
+    def slow_generate(prompt, **kwargs):
+        started.set()
+        release.wait(5)
+        return generate(prompt, **kwargs)
+
+    fake_adapter.generate = slow_generate
+    with ThreadPoolExecutor(4) as pool:
+        futures = [
+            pool.submit(_client(server).generate_code, prompt_file) for _ in range(4)
+        ]
+        started.wait(5)
+        release.set()
+        results = [future.result()[1] for future in futures]
+
+    assert len(fake_adapter.prompts) == 1
+    assert {result["code"] for result in results} == {
+        "def hello():\n    return 'Hello'"
+    }
+
+
+def test_errors_keep_their_type(server, fake_adapter, tmp_path):
+    fake_adapter.response = "```python\n```"
+    server.compiler.code_generator.retry_policy.max_attempts = 1
+
+    with pytest.raises(ValidationError):
+        _client(server).generate_code(_prompt(tmp_path))
+
+
+def test_requests_need_token_json_and_local_host(server, fake_adapter):
+    token = {"Authorization": f"Bearer {server.token}"}
+    body = {"prompt": {"name": "hello", "description": "d"}}
+
+    with pytest.raises(PromptCompilerError, match="server token"):
+        CompileClient(server.url, "wrong").context_digest()
+    assert _client(server).context_digest() == server.compiler.context_digest()
+    # A cross-origin form or fetch without preflight sends text/plain
+    status, _ = _post(
+        server, "/generate", body, {**token, "Content-Type": "text/plain"}
+    )
+    assert status == 415
+    # DNS rebinding points a foreign name at the loopback address
+    headers = {**token, "Content-Type": "application/json", "Host": "evil.test"}
+    assert _post(server, "/generate", body, headers)[0] == 403
+    assert fake_adapter.prompts == []
+
+
+def test_token_file_is_private(tmp_path):
+    token_file = tmp_path / ".cache" / "server.token"
+    write_token_file(token_file, "secret")
+
+    assert token_file.stat().st_mode & 0o777 == 0o600
+    assert read_token_file(token_file) == "secret"
+    assert read_token_file(tmp_path / "missing") is None
+
+
+def test_complete_only_validates_server_generated_code(server, fake_adapter, tmp_path):
+    client = _client(server)
+    prompt_data, code_result = client.generate_code(_prompt(tmp_path))
+    headers = {
+        "Authorization": f"Bearer {server.token}",
+        "Content-Type": "application/json",
+    }
+    injected = {"code": "import os\nos.system('touch pwned')", "retries": 0}
+
+    status, body = _post(
+        server,
+        "/complete",
+        {"prompt": prompt_data, "code_result": injected, "module_name": "hello"},
+        headers,
+    )
+
+    assert status == 200
+    assert body["result"]["code"] == code_result["code"]
+    assert len(fake_adapter.prompts) == 2  # the code and its tests
+
+
+def test_unreachable_server(tmp_path):
+    with pytest.raises(PromptCompilerError, match="Cannot reach"):
+        CompileClient("http://127.0.0.1:9").context_digest()
+
+
+def test_cli_compiles_on_server(server, tmp_path, capsys):
+    prompt_file = _prompt(tmp_path)
+    argv = [str(prompt_file), "-o", str(tmp_path / "out"), "--server", server.url]
+    argv += ["--server-token", server.token]
+
+    assert cli.main(argv + ["--stream"]) == 0
+
+    assert "Successfully compiled" in capsys.readouterr().out
+    assert (tmp_path / "out" / "src" / "hello.py").read_text() == (
+        "def hello():\n    return 'Hello'"
+    )
+    assert (tmp_path / "out" / "tests" / "test_hello.py").exists()
@@ -0,0 +1,94 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from prompt_compiler import cli
+from prompt_compiler.ai_adapters.gpt_adapter import GptAdapter
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules a CLI run must not import unless it calls the API or renders a prompt
+HEAVY_MODULES = ["anthropic", "jinja2", "openai"]
+
+# Modules only some runs need, which `import prompt_compiler.cli` must not
+# load either
+DEFERRED_MODULES = HEAVY_MODULES + [
+    "httpx",
+    "prompt_compiler.ai_adapters.claude_adapter",
+    "prompt_compiler.ai_adapters.gpt_adapter",
+    "prompt_compiler.batch",
+    "prompt_compiler.benchmark",
+    "prompt_compiler.server",
+    "prompt_compiler.watcher",
+]
+
+
+def _run_python(code, cwd=ROOT):
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env={"PYTHONPATH": str(ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def _loaded_modules_after(statement, modules=HEAVY_MODULES):
+    return _run_python(
+        "import json, sys\n"
+        f"{statement}\n"
+        f"print(json.dumps([m for m in {modules!r} if m in sys.modules]))"
+    )
+
+
+def test_cli_import_does_not_load_sdks_or_templates():
+    assert _loaded_modules_after("import prompt_compiler.cli") == []
+    assert (
+        _loaded_modules_after("from prompt_compiler.ai_adapters import GptAdapter")
+        == []
+    )
+
+
+def test_cli_import_defers_optional_modules():
+    # What keeps startup fast, checked without timing it
+    assert _loaded_modules_after("import prompt_compiler.cli", DEFERRED_MODULES) == []
+
+
+def test_cached_run_does_not_load_sdks(tmp_path, monkeypatch):
+    prompt_file = tmp_path / "hello.prompt"
+    prompt_file.write_text("name: Hello\ndescription: Say hello\n")
+    argv = [
+        str(prompt_file),
+        "-o",
+        str(tmp_path / "out"),
+        "--cache-dir",
+        str(tmp_path / ".cache"),
+        "--config",
+        str(tmp_path / "prompt-compiler.yaml"),
+        "--api-key",
+        "test",
+        "--model",
+        "gpt",
+    ]
+    response = SimpleNamespace(
+        choices=[
+            SimpleNamespace(message=SimpleNamespace(content="```python\nx = 1\n```"))
+        ]
+    )
+    client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **kwargs: response)
+        )
+    )
+    monkeypatch.setattr(GptAdapter, "client", property(lambda self: client))
+    assert cli.main(argv) == 0
+
+    loaded = _loaded_modules_after(
+        f"from prompt_compiler import cli\nassert cli.main({argv!r}) == 0"
+    )
+
+    assert loaded == []
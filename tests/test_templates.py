@@ -0,0 +1,42 @@
+import pytest
+
+from prompt_compiler.exceptions import PromptCompilerError
+from prompt_compiler.templates import (
+    CodeGenerationTemplate,
+    TemplateLoader,
+    compile_template,
+)
+from prompt_compiler.templates import base_template
+
+
+def test_templates_are_compiled_once(monkeypatch):
+    template = CodeGenerationTemplate()
+    template.render({"name": "A", "description": "d"})
+
+    def fail(source):
+        raise AssertionError("template recompiled")
+
+    monkeypatch.setattr(base_template.get_environment(), "from_string", fail)
+    rendered = CodeGenerationTemplate().render({"name": "B", "description": "d"})
+
+    assert "Name: B" in rendered
+    assert compile_template(template.get_template()) is compile_template(
+        template.get_template()
+    )
+
+
+def test_loader_renders_files_with_bytecode_cache(tmp_path):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "code.j2").write_text("Write {{ name }}")
+    cache_dir = tmp_path / "bytecode"
+
+    template = TemplateLoader(template_dir, cache_dir).load("code.j2", "system")
+
+    assert template.render({"name": "hello"}) == "Write hello"
+    assert template.get_template() == "Write {{ name }}"
+    assert template.get_system_prompt() == "system"
+    assert list(cache_dir.iterdir())
+
+    with pytest.raises(PromptCompilerError):
+        TemplateLoader(template_dir).load("missing.j2", "system")
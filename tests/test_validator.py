@@ -0,0 +1,131 @@
+import pytest
+
+from prompt_compiler.compiler import Compiler
+from prompt_compiler.exceptions import ValidationError
+from prompt_compiler.validator import (
+    ImportCheck,
+    PytestCheck,
+    SyntaxCheck,
+    Validator,
+    module_name_for,
+)
+
+from .conftest import FakeAdapter
+
+
+class SequenceAdapter(FakeAdapter):
+    """Adapter returning its responses in turn, repeating the last one."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        self.prompts.append(prompt)
+        return self.responses[min(len(self.prompts), len(self.responses)) - 1]
+
+
+def test_checks_report_failures_by_name():
+    validator = Validator([SyntaxCheck(), ImportCheck(timeout=5)], max_workers=2)
+    try:
+        assert validator.check("x = 1\n") == {}
+        failures = validator.check("raise RuntimeError('boom')\n")
+        assert list(failures) == ["import"]
+        assert "RuntimeError: boom" in failures["import"]
+        assert list(validator.check("def f(:\n")) == ["syntax", "import"]
+    finally:
+        validator.close()
+
+
+def test_checks_time_out():
+    validator = Validator([ImportCheck(timeout=0.5)])
+    try:
+        failures = validator.check("import time\ntime.sleep(10)\n")
+    finally:
+        validator.close()
+    assert failures == {"import": "timed out after 0.5s"}
+
+
+def test_pytest_check_runs_generated_tests():
+    validator = Validator([PytestCheck(timeout=30)])
+    code = "def add(a, b):\n    return a + b\n"
+    passing = "from calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+    failing = passing.replace("== 3", "== 4")
+    try:
+        assert validator.check(code, module_name="calc") == {}
+        assert validator.check(code, passing, "calc") == {}
+        assert "assert 3 == 4" in validator.check(code, failing, "calc")["pytest"]
+    finally:
+        validator.close()
+
+
+def test_failed_validation_regenerates_with_feedback(tmp_path):
+    adapter = SequenceAdapter(
+        ["```python\nraise RuntimeError('boom')\n```", "```python\nok = True\n```"]
+    )
+    prompt_file = tmp_path / "my-util.prompt"
+    prompt_file.write_text("name: Util\ndescription: d\n")
+    compiler = Compiler(
+        adapter,
+        cache_dir=tmp_path / ".cache",
+        generate_tests=False,
+        validator=Validator([ImportCheck(timeout=5)]),
+        regenerate_attempts=1,
+    )
+
+    result = compiler.compile(prompt_file)
+
+    assert result["code"] == "ok = True"
+    assert result["regenerations"] == 1
+    assert "failed the import check" in adapter.prompts[1]
+    # The working code now answers the original prompt
+    assert compiler.compile(prompt_file)["code"] == "ok = True"
+    assert len(adapter.prompts) == 2
+    compiler.close()
+
+
+def test_syntax_errors_are_regenerated(tmp_path):
+    adapter = SequenceAdapter(["```python\ndef f(:\n```", "```python\nok = True\n```"])
+    prompt_file = tmp_path / "util.prompt"
+    prompt_file.write_text("name: Util\ndescription: d\n")
+    compiler = Compiler(
+        adapter,
+        cache_dir=tmp_path / ".cache",
+        generate_tests=False,
+        regenerate_attempts=2,
+    )
+
+    result = compiler.compile(prompt_file)
+
+    assert result["code"] == "ok = True"
+    assert result["regenerations"] == 1
+    assert "failed the syntax check" in adapter.prompts[1]
+    compiler.close()
+
+
+def test_regeneration_budget_is_bounded(tmp_path):
+    adapter = SequenceAdapter(["```python\nraise RuntimeError('boom')\n```"])
+    prompt_file = tmp_path / "util.prompt"
+    prompt_file.write_text("name: Util\ndescription: d\n")
+    compiler = Compiler(
+        adapter,
+        cache_dir=tmp_path / ".cache",
+        generate_tests=False,
+        validator=Validator([ImportCheck(timeout=5)]),
+        regenerate_attempts=2,
+    )
+
+    with pytest.raises(ValidationError, match="import check failed"):
+        compiler.compile(prompt_file)
+    assert len(adapter.prompts) == 3
+
+    # The broken code is not served from the cache
+    with pytest.raises(ValidationError):
+        compiler.compile(prompt_file)
+    assert len(adapter.prompts) == 6
+    compiler.close()
+
+
+def test_module_name_for():
+    assert module_name_for("my-util") == "my_util"
+    assert module_name_for("2fa") == "_2fa"
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from prompt_compiler.watcher import PromptWatcher
+
+
+def test_poll_reports_added_and_modified_prompts(tmp_path):
+    (tmp_path / "a.prompt").write_text("name: A\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+    watcher = PromptWatcher([tmp_path], native=False)
+
+    assert watcher.poll() == set()
+
+    (tmp_path / "a.prompt").write_text("name: A2\n")
+    (tmp_path / "b.prompt").write_text("name: B\n")
+    (tmp_path / "notes.txt").write_text("still ignored")
+
+    assert watcher.poll() == {
+        (tmp_path / "a.prompt").resolve(),
+        (tmp_path / "b.prompt").resolve(),
+    }
+
+
+def test_changes_debounces_bursts_of_edits(tmp_path):
+    prompt_file = tmp_path / "a.prompt"
+    prompt_file.write_text("name: A\n")
+    watcher = PromptWatcher([prompt_file], interval=0.01, debounce=0.1, native=False)
+    stop = threading.Event()
+    batches = []
+
+    def consume():
+        for batch in watcher.changes(stop):
+            batches.append(batch)
+            stop.set()
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    for i in range(5):
+        prompt_file.write_text(f"name: A{i}\n" + "#" * i)
+        time.sleep(0.02)
+    thread.join(timeout=2)
+    stop.set()
+
+    assert batches == [[prompt_file.resolve()]]